@@ -1,9 +1,87 @@
 # Fichier: applications/patients/models.py
+import math
+import uuid
+
 from django.db import models
+from django.db.models import Case, Count, Q, Value, When
+from django.db.models.functions import ExtractYear
 from django.utils import timezone
 from django.urls import reverse
 from applications.utilisateurs.models import Utilisateur
 
+# Tranches d'âge des statistiques : (âge minimum, libellé), par âge croissant
+TRANCHES_AGE = [
+    (0, '0-4 ans'),
+    (5, '5-14 ans'),
+    (15, '15-24 ans'),
+    (25, '25-44 ans'),
+    (45, '45-64 ans'),
+    (65, '65 ans et plus'),
+]
+TRANCHE_INCONNUE = 'inconnu'
+
+def date_naissance_limite(age, reference):
+    """Dernière date de naissance donnant au moins `age` ans à la date de référence
+    (un 29 février devient un 28 février les années non bissextiles)"""
+    try:
+        return reference.replace(year=reference.year - age)
+    except ValueError:
+        return reference.replace(year=reference.year - age, day=28)
+
+class PatientQuerySet(models.QuerySet):
+    """Requêtes sur l'âge calculé par la base, sans charger les patients"""
+    
+    def avec_age(self, reference=None):
+        """Annote `age` (en années révolues, NULL sans date de naissance)"""
+        reference = reference or timezone.localdate()
+        anniversaire_a_venir = (
+            Q(date_naissance__month__gt=reference.month)
+            | Q(date_naissance__month=reference.month, date_naissance__day__gt=reference.day)
+        )
+        return self.annotate(age=(
+            Value(reference.year) - ExtractYear('date_naissance')
+            - Case(When(anniversaire_a_venir, then=Value(1)), default=Value(0))
+        ))
+    
+    def age_entre(self, minimum=None, maximum=None, reference=None):
+        """Patients âgés de `minimum` à `maximum` ans inclus ; traduit en intervalle de
+        date_naissance pour utiliser l'index"""
+        reference = reference or timezone.localdate()
+        queryset = self
+        if minimum is not None:
+            queryset = queryset.filter(date_naissance__lte=date_naissance_limite(minimum, reference))
+        if maximum is not None:
+            queryset = queryset.filter(date_naissance__gt=date_naissance_limite(maximum + 1, reference))
+        return queryset
+    
+    def par_age(self, decroissant=False):
+        """Tri par âge (sur date_naissance, donc par l'index) ; sans date en dernier"""
+        if decroissant:
+            return self.order_by(models.F('date_naissance').asc(nulls_last=True), 'pk')
+        return self.order_by(models.F('date_naissance').desc(nulls_last=True), 'pk')
+    
+    def histogramme_ages(self, tranches=None, par=None, reference=None):
+        """Nombre de patients par tranche d'âge en une requête ; avec `par` (ex. 'sexe'),
+        une ligne par valeur de ce champ (pyramide des âges)"""
+        tranches = tranches or TRANCHES_AGE
+        reference = reference or timezone.localdate()
+        agregats = {}
+        for index, (minimum, libelle) in enumerate(tranches):
+            condition = Q(date_naissance__lte=date_naissance_limite(minimum, reference))
+            if index + 1 < len(tranches):
+                condition &= Q(date_naissance__gt=date_naissance_limite(tranches[index + 1][0], reference))
+            agregats[libelle] = Count('pk', filter=condition)
+        agregats[TRANCHE_INCONNUE] = Count('pk', filter=Q(date_naissance__isnull=True))
+        if par is None:
+            return self.order_by().aggregate(**agregats)
+        return list(self.order_by(par).values(par).annotate(**agregats))
+
+class PatientsActifsManager(models.Manager.from_queryset(PatientQuerySet)):
+    """Patients non désactivés (index (est_actif, date_enregistrement))"""
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(est_actif=True)
+
 class Patient(models.Model):
     """Modèle représentant un patient du centre de santé"""
     SEXES = (
@@ -33,8 +111,14 @@ class Patient(models.Model):
     personne_contact = models.CharField(max_length=100, blank=True, null=True)
     telephone_contact = models.CharField(max_length=20, blank=True, null=True)
     date_enregistrement = models.DateTimeField(auto_now_add=True)
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
     photo = models.ImageField(upload_to='photos_patients/', null=True, blank=True)
     est_actif = models.BooleanField(default=True)
+    # Renouvelé à chaque modification du dossier complet : clé du cache (voir chargement.py)
+    version_dossier = models.UUIDField(default=uuid.uuid4, editable=False)
+    
+    objects = PatientQuerySet.as_manager()
+    actifs = PatientsActifsManager()
     
     def __str__(self):
         return f"{self.prenom} {self.nom} ({self.numero_dossier})"
@@ -55,6 +139,12 @@ class Patient(models.Model):
         indexes = [
             models.Index(fields=['numero_dossier']),
             models.Index(fields=['nom', 'prenom']),
+            models.Index(fields=['date_naissance']),
+            # Listes de patients actifs triées par date d'enregistrement (InnoDB ajoute l'id,
+            # ce qui couvre aussi le départage de la pagination par curseur)
+            models.Index(fields=['est_actif', 'date_enregistrement']),
+            # Synchronisation des sites distants par curseur (date_mise_a_jour, id)
+            models.Index(fields=['date_mise_a_jour', 'id']),
         ]
 
 class DossierMedical(models.Model):
@@ -70,6 +160,11 @@ class DossierMedical(models.Model):
     
     def __str__(self):
         return f"Dossier médical de {self.patient}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_mise_a_jour', 'id']),
+        ]
 
 class AntecedentMedical(models.Model):
     """Modèle pour les antécédents médicaux spécifiques"""
@@ -87,9 +182,15 @@ class AntecedentMedical(models.Model):
     date_debut = models.DateField(null=True, blank=True)
     date_fin = models.DateField(null=True, blank=True)
     traitement = models.TextField(blank=True, null=True)
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.get_type_antecedent_display()} - {self.dossier.patient}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_mise_a_jour', 'id']),
+        ]
 
 class DocumentMedical(models.Model):
     """Documents médicaux associés au dossier d'un patient"""
@@ -112,9 +213,140 @@ class DocumentMedical(models.Model):
     def __str__(self):
         return f"{self.titre} - {self.dossier.patient}"
 
+class TeleversementDocument(models.Model):
+    """Téléversement en plusieurs parties d'un document médical (voir televersement.py)"""
+    STATUTS = (
+        ('en_cours', 'En cours'),
+        ('en_traitement', 'En traitement'),
+        ('termine', 'Terminé'),
+        ('erreur', 'Erreur'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dossier = models.ForeignKey(DossierMedical, on_delete=models.CASCADE, related_name='televersements')
+    auteur = models.ForeignKey(Utilisateur, on_delete=models.SET_NULL, null=True, related_name='televersements')
+    titre = models.CharField(max_length=255)
+    type_document = models.CharField(max_length=20, choices=DocumentMedical.TYPES)
+    description = models.TextField(blank=True, null=True)
+    nom_fichier = models.CharField(max_length=255)
+    taille_totale = models.BigIntegerField()
+    taille_partie = models.PositiveIntegerField()
+    somme_controle = models.CharField(max_length=64, blank=True)  # SHA-256 attendu (hexadécimal)
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_cours')
+    message_erreur = models.TextField(blank=True, null=True)
+    document = models.ForeignKey(DocumentMedical, on_delete=models.SET_NULL, null=True, blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.get_statut_display()})"
+    
+    def nombre_parties(self):
+        """Nombre de parties attendues (au moins une, même pour un fichier vide)"""
+        return max(1, math.ceil(self.taille_totale / self.taille_partie))
+    
+    def taille_attendue(self, numero):
+        """Taille en octets de la partie `numero` (la dernière peut être plus courte)"""
+        if numero < self.nombre_parties() - 1:
+            return self.taille_partie
+        return self.taille_totale - self.taille_partie * (self.nombre_parties() - 1)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'date_mise_a_jour']),
+        ]
+
+class CompteurDossier(models.Model):
+    """Dernier numéro de dossier réservé, par année"""
+    cle = models.CharField(max_length=20, unique=True)
+    dernier_numero = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.cle} : {self.dernier_numero}"
+
+class CleRecherchePatient(models.Model):
+    """Clé normalisée (mot ou trigramme) de l'index de recherche des patients"""
+    NATURES = (
+        ('mot', 'Mot'),
+        ('trigramme', 'Trigramme'),
+    )
+    
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='cles_recherche')
+    nature = models.CharField(max_length=10, choices=NATURES)
+    cle = models.CharField(max_length=100)
+    
+    class Meta:
+        # Index couvrant : préfixes et trigrammes sont résolus sans lire la table
+        indexes = [
+            models.Index(fields=['nature', 'cle', 'patient']),
+        ]
+
+class TermeClinique(models.Model):
+    """Terme racinisé d'un champ clinique d'un patient (index plein texte, voir recherche_clinique.py)"""
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='termes_cliniques')
+    champ = models.CharField(max_length=30)
+    terme = models.CharField(max_length=60)
+    poids = models.FloatField()  # 1 + log(occurrences du terme dans le champ)
+    
+    class Meta:
+        # Index couvrant : une recherche est résolue sans lire la table
+        indexes = [
+            models.Index(fields=['terme', 'champ', 'patient', 'poids']),
+        ]
+
+class SuppressionSynchronisee(models.Model):
+    """Trace d'une suppression, transmise aux sites distants par la synchronisation"""
+    MODELES = (
+        ('patient', 'Patient'),
+        ('dossier', 'Dossier médical'),
+        ('antecedent', 'Antécédent médical'),
+    )
+    
+    modele = models.CharField(max_length=20, choices=MODELES)
+    objet_id = models.BigIntegerField()
+    date_suppression = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.modele} {self.objet_id} supprimé le {self.date_suppression:%d/%m/%Y %H:%M}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_suppression', 'id']),
+        ]
+
+class DoublonPatient(models.Model):
+    """Paire de patients susceptibles d'être la même personne, à examiner (voir doublons.py)"""
+    STATUTS = (
+        ('en_attente', 'En attente'),
+        ('fusionne', 'Fusionné'),
+        ('rejete', 'Rejeté'),
+    )
+    
+    patient_a = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='doublons_a')
+    patient_b = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='doublons_b')
+    score = models.FloatField()
+    raisons = models.CharField(max_length=255, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente')
+    date_detection = models.DateTimeField(auto_now_add=True)
+    date_decision = models.DateTimeField(null=True, blank=True)
+    decideur = models.ForeignKey(Utilisateur, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    def __str__(self):
+        return f"{self.patient_a_id} / {self.patient_b_id} ({self.score:.2f})"
+    
+    class Meta:
+        ordering = ['-score']
+        unique_together = ('patient_a', 'patient_b')
+        indexes = [
+            models.Index(fields=['statut', 'score']),
+        ]
+
 # Fichier: applications/patients/forms.py
+import os
+
 from django import forms
-from .models import Patient, DossierMedical, AntecedentMedical, DocumentMedical
+from .models import Patient, DossierMedical, AntecedentMedical, DocumentMedical, TeleversementDocument
+from .recherche import rechercher_patients
 
 class PatientForm(forms.ModelForm):
     """Formulaire de création/modification d'un patient"""
@@ -176,6 +408,31 @@ class DocumentMedicalForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
         }
 
+class TeleversementDocumentForm(forms.ModelForm):
+    """Métadonnées d'un document médical envoyé en plusieurs parties"""
+    class Meta:
+        model = TeleversementDocument
+        fields = ['titre', 'type_document', 'description', 'nom_fichier', 'taille_totale', 'somme_controle']
+    
+    def clean_nom_fichier(self):
+        # Seul le nom de base est conservé : pas de chemin fourni par le client
+        nom = os.path.basename(self.cleaned_data['nom_fichier'].replace('\\', '/'))
+        if not nom:
+            raise forms.ValidationError("Nom de fichier invalide")
+        return nom
+    
+    def clean_taille_totale(self):
+        taille = self.cleaned_data['taille_totale']
+        if taille < 0:
+            raise forms.ValidationError("Taille invalide")
+        return taille
+    
+    def clean_somme_controle(self):
+        somme = self.cleaned_data['somme_controle'].strip().lower()
+        if somme and (len(somme) != 64 or any(c not in '0123456789abcdef' for c in somme)):
+            raise forms.ValidationError("Somme de contrôle SHA-256 invalide")
+        return somme
+
 class RecherchePatientForm(forms.Form):
     """Formulaire de recherche de patients"""
     terme = forms.CharField(
@@ -186,22 +443,2427 @@ class RecherchePatientForm(forms.Form):
             'placeholder': 'Rechercher par nom, prénom ou numéro de dossier'
         })
     )
+    
+    def rechercher(self, queryset=None, limite=50):
+        """Patients correspondant au terme saisi, les plus pertinents d'abord (formulaire validé)"""
+        return rechercher_patients(self.cleaned_data.get('terme'), limite, queryset)
+
+# Fichier: applications/patients/apps.py
+from django.apps import AppConfig
+
+class PatientsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'applications.patients'
+
+    def ready(self):
+        # Enregistre les récepteurs de signaux (index de recherche, ...)
+        from . import signals  # noqa: F401
+
+# Fichier: applications/patients/signals.py
+import uuid
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from applications.utilisateurs.miniatures import planifier_miniatures
+
+from .chargement import invalider_dossier_patient
+from .models import Patient, DossierMedical, AntecedentMedical, DocumentMedical, SuppressionSynchronisee
+from .numerotation import attribuer_numero_dossier
+from .recherche import CHAMPS_INDEXES, indexer_patient
+from .recherche_clinique import indexer_clinique
+
+@receiver(pre_save, sender=Patient)
+def attribuer_numero_patient(sender, instance, raw=False, **kwargs):
+    """Attribue un numéro de dossier aux nouveaux patients qui n'en ont pas"""
+    if not raw and not instance.numero_dossier:
+        instance.numero_dossier = attribuer_numero_dossier()
+
+@receiver(pre_save, sender=Patient)
+def renouveler_version_dossier(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Un save() complet écrit une version neuve plutôt que celle lue au chargement"""
+    if not raw and update_fields is None:
+        instance.version_dossier = uuid.uuid4()
+
+@receiver(post_save, sender=Patient)
+def indexer_patient_enregistre(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Maintient l'index de recherche à jour après chaque enregistrement d'un patient"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(CHAMPS_INDEXES):
+        return
+    indexer_patient(instance)
+
+@receiver(post_save, sender=Patient)
+def generer_miniatures_patient(sender, instance, raw=False, **kwargs):
+    """Prépare les miniatures de la photo du patient en arrière-plan"""
+    if not raw and instance.photo:
+        planifier_miniatures(instance.photo.name)
+
+def _patient_concerne(instance, origin=None):
+    """Identifiant du patient auquel se rattache une instance des modèles patients"""
+    if isinstance(instance, Patient):
+        return instance.pk
+    if isinstance(instance, DossierMedical):
+        return instance.patient_id
+    if type(instance).dossier.is_cached(instance):
+        return instance.dossier.patient_id
+    # Suppression de plusieurs lignes : une requête par dossier, pas par ligne
+    correspondances = getattr(origin, '_patients_par_dossier', None) if origin is not None else None
+    if correspondances is None:
+        correspondances = {}
+        if origin is not None:
+            origin._patients_par_dossier = correspondances
+    if instance.dossier_id not in correspondances:
+        correspondances[instance.dossier_id] = (
+            DossierMedical.objects.filter(pk=instance.dossier_id).values_list('patient_id', flat=True).first()
+        )
+    return correspondances[instance.dossier_id]
+
+def _supprime_en_cascade(instance, origin):
+    """Vrai si l'instance disparaît avec son patient ou son dossier : le signal de ce
+    parent suffit (ou plus rien n'est à mettre à jour)"""
+    if origin is None or origin is instance:
+        return False
+    modele = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return modele is Patient or (modele is DossierMedical and not isinstance(instance, DossierMedical))
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=DossierMedical)
+@receiver(post_save, sender=AntecedentMedical)
+@receiver(post_save, sender=DocumentMedical)
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=DossierMedical)
+@receiver(post_delete, sender=AntecedentMedical)
+@receiver(post_delete, sender=DocumentMedical)
+def invalider_cache_dossier(sender, instance, raw=False, signal=None, update_fields=None, origin=None, **kwargs):
+    """Invalide le dossier en cache après validation de la transaction"""
+    if raw:
+        return
+    if sender is Patient:
+        # save() complet : renouveler_version_dossier a déjà écrit une version neuve ;
+        # patient supprimé : plus rien à invalider
+        if signal is post_delete or update_fields is None:
+            return
+    elif _supprime_en_cascade(instance, origin):
+        return
+    patient_id = _patient_concerne(instance, origin)
+    if patient_id is not None:
+        # Après validation : un autre processus ne doit pas remettre en cache l'ancien état
+        transaction.on_commit(lambda: invalider_dossier_patient(patient_id))
+
+@receiver(post_save, sender=DossierMedical)
+@receiver(post_save, sender=AntecedentMedical)
+@receiver(post_delete, sender=DossierMedical)
+@receiver(post_delete, sender=AntecedentMedical)
+def indexer_textes_cliniques(sender, instance, raw=False, origin=None, **kwargs):
+    """Maintient l'index plein texte clinique du patient après validation de la transaction"""
+    if raw or _supprime_en_cascade(instance, origin):
+        return
+    patient_id = _patient_concerne(instance, origin)
+    if patient_id is not None:
+        transaction.on_commit(lambda: indexer_clinique([patient_id]))
+
+MODELES_SYNCHRONISES = {Patient: 'patient', DossierMedical: 'dossier', AntecedentMedical: 'antecedent'}
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=DossierMedical)
+@receiver(post_delete, sender=AntecedentMedical)
+def tracer_suppression(sender, instance, **kwargs):
+    """Laisse une trace de la suppression pour les sites synchronisés (dans la même transaction)"""
+    SuppressionSynchronisee.objects.create(modele=MODELES_SYNCHRONISES[sender], objet_id=instance.pk)
+
+# Fichier: applications/patients/recherche.py
+import math
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Patient, CleRecherchePatient
+
+# Index de recherche des patients : chaque patient est décomposé en mots et en trigrammes
+# normalisés (minuscules, sans accents) stockés dans CleRecherchePatient. Les recherches par
+# préfixe et approximatives deviennent des parcours d'index au lieu de LIKE '%...%'.
+CHAMPS_INDEXES = ('nom', 'prenom', 'numero_dossier')
+LONGUEUR_MIN_PREFIXE = 2
+SEUIL_SIMILARITE = 0.4
+BORDURE = '$'
+
+def plier(texte):
+    """Minuscules sans accents ni ponctuation : 'Kabongô-Mbuyi' devient 'kabongo mbuyi'"""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    return re.sub(r'[^a-z0-9]+', ' ', texte.lower()).strip()
+
+def mots(texte):
+    return plier(texte).split()
+
+def trigrammes(mot):
+    """Trigrammes d'un mot bordé ('$$kab', '$ka', ...), comme pg_trgm"""
+    borde = f'{BORDURE}{BORDURE}{mot}{BORDURE}'
+    return {borde[i:i + 3] for i in range(len(borde) - 2)}
+
+def cles_patient(patient):
+    """Ensemble des (nature, clé) indexées pour un patient"""
+    mots_patient = set(mots(f'{patient.nom} {patient.prenom}'))
+    cles = {('mot', mot[:100]) for mot in mots_patient}
+    for mot in mots_patient:
+        cles.update(('trigramme', trigramme) for trigramme in trigrammes(mot))
+    return cles
+
+def indexer_patient(patient):
+    """Reconstruit les clés de recherche d'un patient"""
+    with transaction.atomic():
+        CleRecherchePatient.objects.filter(patient=patient).delete()
+        CleRecherchePatient.objects.bulk_create([
+            CleRecherchePatient(patient=patient, nature=nature, cle=cle)
+            for nature, cle in cles_patient(patient)
+        ])
+
+def indexer_patients(patients):
+    """Reconstruit les clés de recherche d'un lot de patients en trois requêtes"""
+    patients = list(patients)
+    with transaction.atomic():
+        CleRecherchePatient.objects.filter(patient__in=patients).delete()
+        CleRecherchePatient.objects.bulk_create([
+            CleRecherchePatient(patient=patient, nature=nature, cle=cle)
+            for patient in patients
+            for nature, cle in cles_patient(patient)
+        ], batch_size=1000)
+    return len(patients)
+
+def _scores_prefixes(mots_requete, limite):
+    """Patients dont un mot commence par un mot de la requête ; score de 1 à 2"""
+    mots_prefixes = [mot for mot in mots_requete if len(mot) >= LONGUEUR_MIN_PREFIXE]
+    if not mots_prefixes:
+        return {}
+    condition = Q()
+    for mot in mots_prefixes:
+        condition |= Q(cle__startswith=mot)
+    lignes = (
+        CleRecherchePatient.objects.filter(condition, nature='mot')
+        .values('patient').annotate(nombre=Count('id')).order_by('-nombre')[:limite]
+    )
+    return {
+        ligne['patient']: 1 + min(ligne['nombre'], len(mots_prefixes)) / len(mots_prefixes)
+        for ligne in lignes
+    }
+
+def _scores_approches(mots_requete, limite):
+    """Patients partageant assez de trigrammes avec la requête ; score de 0 à 1"""
+    trigrammes_requete = set()
+    for mot in mots_requete:
+        trigrammes_requete |= trigrammes(mot)
+    minimum = math.ceil(len(trigrammes_requete) * SEUIL_SIMILARITE)
+    lignes = (
+        CleRecherchePatient.objects.filter(nature='trigramme', cle__in=trigrammes_requete)
+        .values('patient').annotate(nombre=Count('id'))
+        .filter(nombre__gte=minimum).order_by('-nombre')[:limite]
+    )
+    return {ligne['patient']: ligne['nombre'] / len(trigrammes_requete) for ligne in lignes}
+
+def rechercher_patients(terme, limite=20, queryset=None):
+    """Patients correspondant au terme (numéro de dossier, préfixe ou orthographe approchée),
+    classés par pertinence décroissante"""
+    if queryset is None:
+        queryset = Patient.objects.all()
+    terme = (terme or '').strip()
+    mots_requete = mots(terme)
+    if not mots_requete:
+        return []
+
+    # Marge pour les candidats écartés ensuite par le queryset (patients inactifs, ...)
+    candidats = limite * 5
+    scores = {}
+
+    # Numéro de dossier : préfixe exact sur l'index unique
+    if any(caractere.isdigit() for caractere in terme):
+        for pk in Patient.objects.filter(numero_dossier__istartswith=terme).values_list('pk', flat=True)[:candidats]:
+            scores[pk] = 3
+
+    for pk, score in _scores_prefixes(mots_requete, candidats).items():
+        scores[pk] = max(scores.get(pk, 0), score)
+
+    # La recherche approchée n'est utile que si les préfixes ne suffisent pas
+    if len(scores) < limite:
+        for pk, score in _scores_approches(mots_requete, candidats).items():
+            scores[pk] = max(scores.get(pk, 0), score)
+
+    patients = list(queryset.filter(pk__in=scores))
+    patients.sort(key=lambda patient: (-scores[patient.pk], patient.nom, patient.prenom))
+    return patients[:limite]
+
+# Fichier: applications/patients/recherche_clinique.py
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Sum, Value, When
+
+from applications.utilisateurs.pagination import estimer_nombre
+
+from .models import Patient, DossierMedical, AntecedentMedical, TermeClinique
+from .recherche import plier
+
+# Recherche plein texte dans les textes cliniques (allergies, maladies, traitements, notes,
+# antécédents). Chaque texte est découpé en termes pliés (sans accents) et racinisés
+# ('pénicillines' et 'Pénicilline' donnent 'penicillin') stockés par patient et par champ
+# dans TermeClinique, avec un poids 1 + log(fréquence). Une recherche ne lit que les lignes
+# des termes demandés ; le score d'un patient est la somme des poids pondérés par l'IDF.
+CHAMPS_DOSSIER = ('antecedents_medicaux', 'allergies', 'maladies_chroniques', 'traitements_en_cours',
+                  'notes_importantes')
+CHAMPS_ANTECEDENT = ('description', 'traitement')
+CHAMPS_CLINIQUES = CHAMPS_DOSSIER + tuple(f'antecedent_{champ}' for champ in CHAMPS_ANTECEDENT)
+
+# Champs consultables par rôle ; les rôles absents n'ont pas accès à la recherche clinique
+CHAMPS_PAR_ROLE = {
+    'admin': CHAMPS_CLINIQUES,
+    'directeur': CHAMPS_CLINIQUES,
+    'medecin': CHAMPS_CLINIQUES,
+    'infirmier_titulaire': CHAMPS_CLINIQUES,
+    'infirmier': CHAMPS_CLINIQUES,
+    'sage_femme': CHAMPS_CLINIQUES,
+    'pharmacien': ('allergies', 'maladies_chroniques', 'traitements_en_cours', 'antecedent_traitement'),
+    'technicien_labo': ('allergies',),
+}
+
+LONGUEUR_MAX_TERME = 60
+MOTS_VIDES = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'elle', 'en', 'et', 'il', 'la',
+    'le', 'les', 'leur', 'lui', 'mais', 'ne', 'ni', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui',
+    'sa', 'se', 'ses', 'son', 'sous', 'sur', 'un', 'une', 'l', 'd', 'j', 'n', 's', 'y', 'est', 'sont',
+}
+# Suffixes retirés (racinisation légère du français), du plus long au plus court
+SUFFIXES = (
+    'issements', 'issement', 'atrices', 'ations', 'atrice', 'ateurs', 'ements', 'ation', 'ateur',
+    'ement', 'iques', 'ismes', 'istes', 'ique', 'isme', 'iste', 'euses', 'euse', 'eux', 'ies',
+    'ie', 'es', 'e', 's', 'x',
+)
+LONGUEUR_MIN_RACINE = 4
+
+def raciner(mot):
+    """Racine d'un mot plié : 'diabetique' et 'diabete' donnent 'diabet'"""
+    if mot.isdigit():
+        return mot
+    for suffixe in SUFFIXES:
+        if mot.endswith(suffixe) and len(mot) - len(suffixe) >= LONGUEUR_MIN_RACINE:
+            return mot[:-len(suffixe)]
+    return mot
+
+def termes(texte):
+    """Termes indexés d'un texte, dans l'ordre, doublons compris"""
+    return [
+        raciner(mot)[:LONGUEUR_MAX_TERME]
+        for mot in plier(texte).split()
+        if mot not in MOTS_VIDES and len(mot) > 1
+    ]
+
+def champs_autorises(user):
+    return CHAMPS_PAR_ROLE.get(getattr(user, 'role', None), ())
+
+def peut_rechercher_clinique(user):
+    """Vérifie si l'utilisateur a accès à au moins un champ clinique"""
+    return bool(champs_autorises(user))
+
+def indexer_clinique(patient_ids):
+    """Reconstruit les termes cliniques des patients donnés ; retourne le nombre de termes"""
+    patient_ids = list(patient_ids)
+    frequences = defaultdict(Counter)  # (patient, champ) -> {terme: occurrences}
+    dossiers = {}
+    for valeurs in DossierMedical.objects.filter(patient_id__in=patient_ids).values('pk', 'patient_id', *CHAMPS_DOSSIER):
+        dossiers[valeurs['pk']] = valeurs['patient_id']
+        for champ in CHAMPS_DOSSIER:
+            frequences[valeurs['patient_id'], champ].update(termes(valeurs[champ]))
+    antecedents = AntecedentMedical.objects.filter(dossier_id__in=dossiers).values_list('dossier_id', *CHAMPS_ANTECEDENT)
+    for dossier_id, *textes in antecedents:
+        for champ, texte in zip(CHAMPS_ANTECEDENT, textes):
+            frequences[dossiers[dossier_id], f'antecedent_{champ}'].update(termes(texte))
+
+    lignes = [
+        TermeClinique(patient_id=patient_id, champ=champ, terme=terme, poids=1 + math.log(occurrences))
+        for (patient_id, champ), compteur in frequences.items()
+        for terme, occurrences in compteur.items()
+    ]
+    with transaction.atomic():
+        TermeClinique.objects.filter(patient_id__in=patient_ids).delete()
+        TermeClinique.objects.bulk_create(lignes, batch_size=2000)
+    return len(lignes)
+
+def rechercher_clinique(texte, champs=CHAMPS_CLINIQUES, limite=50):
+    """Patients actifs dont les champs `champs` contiennent tous les termes de `texte`, par
+    score décroissant : liste de {'patient', 'score', 'champs'} (champs où un terme figure)"""
+    termes_requete = sorted(set(termes(texte)))
+    if not termes_requete or not champs:
+        return []
+    lignes = TermeClinique.objects.filter(terme__in=termes_requete, champ__in=champs)
+    frequences_documents = dict(
+        lignes.order_by().values('terme').annotate(nombre=Count('patient', distinct=True)).values_list('terme', 'nombre')
+    )
+    if len(frequences_documents) < len(termes_requete):
+        return []
+
+    nombre_patients = max(estimer_nombre(Patient.objects.all())[0], 1)
+    idf = {terme: math.log(1 + nombre_patients / nombre) for terme, nombre in frequences_documents.items()}
+    score = Sum(Case(
+        *[When(terme=terme, then=ExpressionWrapper(F('poids') * Value(poids), output_field=FloatField()))
+          for terme, poids in idf.items()],
+        output_field=FloatField(),
+    ))
+    classement = list(
+        lignes.filter(patient__est_actif=True).order_by().values('patient')
+        .annotate(termes_trouves=Count('terme', distinct=True), score=score)
+        .filter(termes_trouves=len(termes_requete))
+        .order_by('-score', 'patient')
+        .values_list('patient', 'score')[:limite]
+    )
+
+    identifiants = [patient_id for patient_id, _ in classement]
+    champs_trouves = defaultdict(set)
+    for patient_id, champ in lignes.filter(patient_id__in=identifiants).values_list('patient_id', 'champ'):
+        champs_trouves[patient_id].add(champ)
+    patients = Patient.objects.in_bulk(identifiants)
+    return [
+        {'patient': patients[patient_id], 'score': round(score, 3), 'champs': sorted(champs_trouves[patient_id])}
+        for patient_id, score in classement
+    ]
+
+# Fichier: applications/patients/numerotation.py
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from centre_sante.bd.routage import ALIAS_NUMEROTATION
+
+from .models import CompteurDossier
+
+# Attribution des numéros de dossier : un compteur par année, incrémenté atomiquement
+# (UPDATE ... SET dernier_numero = dernier_numero + n). Chaque processus réserve un bloc
+# de numéros et le distribue en mémoire ; la ligne du compteur n'est verrouillée
+# qu'une fois par bloc, et seulement le temps de l'UPDATE : la réservation passe par la
+# connexion dédiée ALIAS_NUMEROTATION, indépendante de la transaction de l'appelant.
+# Les numéros réservés ne sont jamais rendus (arrêt du processus, transaction de
+# l'appelant annulée) : la numérotation est unique et croissante par bloc, pas sans trous.
+CONFIGURATION_PAR_DEFAUT = {
+    'FORMAT': 'SOS-{annee}-{numero:06d}',
+    'TAILLE_BLOC': 20,
+}
+
+def get_configuration():
+    """Retourne la configuration de la numérotation fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'NUMERO_DOSSIER', {}))
+    return configuration
+
+def _creer_compteur(cle):
+    try:
+        with transaction.atomic(using=ALIAS_NUMEROTATION):
+            CompteurDossier.objects.using(ALIAS_NUMEROTATION).create(cle=cle)
+    except IntegrityError:
+        pass  # Créé entre-temps par un autre poste
+
+def reserver_bloc(cle, taille):
+    """Réserve atomiquement `taille` numéros consécutifs ; retourne (premier, dernier).
+    Validé aussitôt, quelle que soit la transaction en cours sur 'default'."""
+    compteurs = CompteurDossier.objects.using(ALIAS_NUMEROTATION).filter(cle=cle)
+    with transaction.atomic(using=ALIAS_NUMEROTATION):
+        if not compteurs.update(dernier_numero=F('dernier_numero') + taille):
+            _creer_compteur(cle)
+            compteurs.update(dernier_numero=F('dernier_numero') + taille)
+        # La transaction voit sa propre mise à jour, quelles que soient les écritures concurrentes
+        dernier = compteurs.values_list('dernier_numero', flat=True).get()
+    return dernier - taille + 1, dernier
+
+class AllocateurNumeroDossier:
+    """Distribue les numéros de dossier à partir de blocs réservés par processus"""
+
+    def __init__(self, taille_bloc=None, format_numero=None):
+        configuration = get_configuration()
+        self.taille_bloc = taille_bloc or configuration['TAILLE_BLOC']
+        self.format_numero = format_numero or configuration['FORMAT']
+        # Protège seulement les blocs en mémoire : jamais tenu pendant un accès à la base
+        self._verrou = threading.Lock()
+        self._pid = os.getpid()
+        self._blocs = {}  # cle -> liste de [prochain numéro, dernier numéro]
+
+    def _formater(self, cle, numero):
+        return self.format_numero.format(annee=cle, numero=numero)
+
+    def _prendre(self, cle):
+        """Numéro suivant des blocs en mémoire, ou None (à appeler sous self._verrou)"""
+        # Un processus issu d'un fork ne doit pas réutiliser les blocs de son parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._blocs = {}
+        blocs = self._blocs.get(cle, [])
+        while blocs:
+            bloc = blocs[0]
+            if bloc[0] <= bloc[1]:
+                bloc[0] += 1
+                return bloc[0] - 1
+            blocs.pop(0)
+        return None
+
+    def attribuer(self, annee=None):
+        """Retourne un nouveau numéro de dossier unique"""
+        cle = str(annee or timezone.localdate().year)
+        with self._verrou:
+            numero = self._prendre(cle)
+        if numero is not None:
+            return self._formater(cle, numero)
+
+        # Réservation hors verrou : les autres threads continuent de puiser dans leurs blocs
+        premier, dernier = reserver_bloc(cle, self.taille_bloc)
+        if premier < dernier:
+            with self._verrou:
+                if self._pid == os.getpid():
+                    self._blocs.setdefault(cle, []).append([premier + 1, dernier])
+        return self._formater(cle, premier)
+
+    def attribuer_plusieurs(self, nombre, annee=None):
+        """Retourne `nombre` numéros consécutifs réservés en une seule opération (imports)"""
+        if nombre <= 0:
+            return []
+        cle = str(annee or timezone.localdate().year)
+        premier, dernier = reserver_bloc(cle, nombre)
+        return [self._formater(cle, numero) for numero in range(premier, dernier + 1)]
+
+allocateur = AllocateurNumeroDossier()
+
+def attribuer_numero_dossier(annee=None):
+    """Retourne un nouveau numéro de dossier unique (ex. SOS-2024-000123)"""
+    return allocateur.attribuer(annee)
+
+# Fichier: applications/patients/management/commands/bench_numero_dossier.py
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from applications.patients.models import CompteurDossier
+from applications.patients.numerotation import AllocateurNumeroDossier
+
+class Command(BaseCommand):
+    help = "Mesure le débit de l'attribution des numéros de dossier sous concurrence et vérifie l'absence de doublons"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help="Nombre de postes simulés en parallèle")
+        parser.add_argument('--numeros', type=int, default=500, help="Numéros attribués par poste")
+        parser.add_argument('--taille-bloc', type=int, default=20, help="Taille des blocs réservés")
+        parser.add_argument('--processus-distincts', action='store_true',
+                            help="Un allocateur par thread, comme des workers distincts")
+
+    def handle(self, *args, **options):
+        # Compteur dédié, supprimé à la fin, pour ne pas consommer de vrais numéros
+        cle = f"bench{int(time.time()) % 100000}"
+        allocateur_partage = AllocateurNumeroDossier(taille_bloc=options['taille_bloc'], format_numero='{annee}-{numero}')
+        resultats = []
+        erreurs = []
+        verrou = threading.Lock()
+        depart = threading.Barrier(options['threads'])
+
+        def poste():
+            allocateur = allocateur_partage
+            if options['processus_distincts']:
+                allocateur = AllocateurNumeroDossier(taille_bloc=options['taille_bloc'], format_numero='{annee}-{numero}')
+            numeros = []
+            try:
+                depart.wait()
+                for _ in range(options['numeros']):
+                    numeros.append(allocateur.attribuer(cle))
+            except Exception as exc:
+                erreurs.append(exc)
+            finally:
+                connections.close_all()
+            with verrou:
+                resultats.extend(numeros)
+
+        threads = [threading.Thread(target=poste) for _ in range(options['threads'])]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+        CompteurDossier.objects.filter(cle=cle).delete()
+
+        if erreurs:
+            raise CommandError(f"{len(erreurs)} poste(s) en erreur : {erreurs[0]!r}")
+        doublons = len(resultats) - len(set(resultats))
+        self.stdout.write(f"Postes : {options['threads']}, numéros attribués : {len(resultats)}, "
+                          f"taille de bloc : {options['taille_bloc']}")
+        self.stdout.write(f"Durée : {duree:.3f} s, débit : {len(resultats) / duree:.0f} numéros/s")
+        if doublons:
+            raise CommandError(f"{doublons} doublon(s) détecté(s)")
+        self.stdout.write(self.style.SUCCESS("Aucun doublon."))
+
+# Fichier: applications/patients/chargement.py
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import Patient, AntecedentMedical, DocumentMedical
+
+# Chargement complet d'un patient en un nombre fixe de requêtes :
+#   1. Patient + DossierMedical (select_related)
+#   2. Antécédents du dossier
+#   3. Documents du dossier + auteur (select_related)
+# Le préchargement renseigne aussi antecedent.dossier et dossier.patient : les __str__
+# des antécédents et documents ne déclenchent donc aucune requête supplémentaire.
+# Le résultat est mis en cache sous une clé contenant Patient.version_dossier ; toute
+# modification d'un des quatre modèles renouvelle cette version (voir signals.py).
+# La version est lue en base (une requête par clé primaire) : l'invalidation est vue de
+# tous les processus, même avec un cache propre à chaque processus (LocMemCache).
+# Une version n'est jamais réutilisée : un save() complet en écrit une neuve au lieu de
+# réécrire celle lue au chargement, qui ferait resservir une entrée obsolète.
+
+def _version(patient_id):
+    version = Patient.objects.filter(pk=patient_id).values_list('version_dossier', flat=True).first()
+    if version is None:
+        raise Patient.DoesNotExist(f"Patient {patient_id} introuvable")
+    return version
+
+def invalider_dossier_patient(patient_id):
+    """Rend obsolète l'entrée en cache du patient dans tous les processus"""
+    Patient.objects.filter(pk=patient_id).update(version_dossier=uuid.uuid4())
+
+def requete_dossier_patient():
+    """Queryset de Patient préchargeant dossier, antécédents et documents avec auteur"""
+    return Patient.objects.select_related('dossier_medical').prefetch_related(
+        Prefetch('dossier_medical__antecedents',
+                 queryset=AntecedentMedical.objects.order_by('-date_debut', '-pk')),
+        Prefetch('dossier_medical__documents',
+                 queryset=DocumentMedical.objects.select_related('auteur').order_by('-date_ajout')),
+    )
+
+def charger_dossier_patient(pk, utiliser_cache=True):
+    """Retourne le patient complet (ou lève Patient.DoesNotExist) ; depuis le cache, une
+    seule requête (la version)"""
+    if not utiliser_cache:
+        return requete_dossier_patient().get(pk=pk)
+
+    cle = f'dossier_patient:{pk}:{_version(pk).hex}'
+    patient = cache.get(cle)
+    if patient is None:
+        patient = requete_dossier_patient().get(pk=pk)
+        cache.set(cle, patient, getattr(settings, 'CACHE_DOSSIER_PATIENT_DUREE', 300))
+    return patient
+
+# Fichier: applications/patients/televersement.py
+import hashlib
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_GET, require_POST
+
+from .forms import TeleversementDocumentForm
+from .models import DocumentMedical, Patient, TeleversementDocument
+from .telechargement import peut_consulter_documents
+
+logger = logging.getLogger(__name__)
+
+# Téléversement par parties des documents médicaux :
+#   1. POST  <pk>/dossier/document/televersement/         -> crée le téléversement
+#   2. POST  televersements/<id>/partie/<numero>/          -> envoie une partie (corps brut)
+#   3. GET   televersements/<id>/                          -> parties reçues (pour reprendre)
+#   4. POST  televersements/<id>/terminer/                 -> assemblage en arrière-plan
+# Les parties sont écrites sous MEDIA_ROOT/<REPERTOIRE>/<id>/ ; l'assemblage, la
+# vérification SHA-256 et les traitements configurés tournent dans un pool de threads.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLE_PARTIE': 5 * 1024 * 1024,
+    'TAILLE_MAX': 200 * 1024 * 1024,
+    'EXPIRATION_HEURES': 24,
+    'DELAI_ASSEMBLAGE_MINUTES': 30,  # Au-delà, un assemblage « en traitement » est abandonné
+    'REPERTOIRE': 'televersements',
+    'TRAVAILLEURS': 2,
+    'TRAITEMENTS': [],  # Chemins pointés de fonctions appelées avec le DocumentMedical créé
+}
+TAILLE_BLOC = 64 * 1024
+
+def get_configuration():
+    """Retourne la configuration des téléversements fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'TELEVERSEMENT_DOCUMENTS', {}))
+    return configuration
+
+_executeur = None
+
+def get_executeur():
+    """Pool de threads des traitements de téléversement, créé à la première utilisation"""
+    global _executeur
+    if _executeur is None:
+        _executeur = ThreadPoolExecutor(
+            max_workers=get_configuration()['TRAVAILLEURS'], thread_name_prefix='televersement'
+        )
+    return _executeur
+
+def repertoire_televersement(televersement):
+    return os.path.join(settings.MEDIA_ROOT, get_configuration()['REPERTOIRE'], str(televersement.pk))
+
+def chemin_partie(televersement, numero):
+    return os.path.join(repertoire_televersement(televersement), f'{numero:06d}.part')
+
+def parties_recues(televersement):
+    """Numéros des parties complètement reçues"""
+    repertoire = repertoire_televersement(televersement)
+    if not os.path.isdir(repertoire):
+        return []
+    return sorted(int(nom[:-len('.part')]) for nom in os.listdir(repertoire) if nom.endswith('.part'))
+
+def ecrire_partie(televersement, numero, flux, longueur):
+    """Écrit une partie depuis le flux de la requête, sans la charger en mémoire.
+    L'écriture passe par un fichier temporaire : une partie renvoyée remplace l'ancienne."""
+    os.makedirs(repertoire_televersement(televersement), exist_ok=True)
+    chemin = chemin_partie(televersement, numero)
+    temporaire = f'{chemin}.tmp'
+    recus = 0
+    with open(temporaire, 'wb') as fichier:
+        while recus < longueur:
+            bloc = flux.read(min(TAILLE_BLOC, longueur - recus))
+            if not bloc:
+                break
+            fichier.write(bloc)
+            recus += len(bloc)
+    if recus != longueur:
+        os.remove(temporaire)
+        raise ValueError(f"Partie {numero} incomplète : {recus} octet(s) reçu(s) sur {longueur}")
+    os.replace(temporaire, chemin)
+
+def supprimer_parties(televersement):
+    shutil.rmtree(repertoire_televersement(televersement), ignore_errors=True)
+
+def assembler_televersement(televersement_id):
+    """Assemble les parties, vérifie la somme de contrôle et crée le DocumentMedical.
+    Exécuté hors du thread de la requête."""
+    close_old_connections()
+    chemin_assemble = None
+    try:
+        televersement = TeleversementDocument.objects.select_related('dossier').get(pk=televersement_id)
+        repertoire = repertoire_televersement(televersement)
+        chemin_assemble = os.path.join(repertoire, 'assemble.tmp')
+        empreinte = hashlib.sha256()
+        with open(chemin_assemble, 'wb') as destination:
+            for numero in range(televersement.nombre_parties()):
+                with open(chemin_partie(televersement, numero), 'rb') as partie:
+                    for bloc in iter(lambda: partie.read(TAILLE_BLOC), b''):
+                        empreinte.update(bloc)
+                        destination.write(bloc)
+
+        if televersement.somme_controle and empreinte.hexdigest() != televersement.somme_controle.lower():
+            raise ValueError("La somme de contrôle SHA-256 ne correspond pas au fichier reçu")
+
+        with transaction.atomic():
+            document = DocumentMedical(
+                dossier=televersement.dossier,
+                titre=televersement.titre,
+                type_document=televersement.type_document,
+                description=televersement.description,
+                auteur_id=televersement.auteur_id,
+            )
+            with open(chemin_assemble, 'rb') as contenu:
+                document.fichier.save(televersement.nom_fichier, File(contenu), save=False)
+            document.save()
+            televersement.document = document
+            televersement.statut = 'termine'
+            televersement.save(update_fields=['document', 'statut', 'date_mise_a_jour'])
+
+        for chemin_traitement in get_configuration()['TRAITEMENTS']:
+            try:
+                import_string(chemin_traitement)(document)
+            except Exception:
+                logger.exception("Échec du traitement %s pour le document %s", chemin_traitement, document.pk)
+        supprimer_parties(televersement)
+    except Exception as exc:
+        logger.exception("Échec de l'assemblage du téléversement %s", televersement_id)
+        TeleversementDocument.objects.filter(pk=televersement_id).update(
+            statut='erreur', message_erreur=str(exc), date_mise_a_jour=timezone.now()
+        )
+        if chemin_assemble and os.path.exists(chemin_assemble):
+            os.remove(chemin_assemble)
+    finally:
+        close_old_connections()
+
+def nettoyer_televersements(maintenant=None):
+    """Supprime les téléversements inachevés expirés et leurs parties ; retourne leur nombre.
+    Ceux en cours d'assemblage sont conservés : assembler_televersement lit leurs parties.
+    Un assemblage bloqué au-delà de DELAI_ASSEMBLAGE_MINUTES (processus arrêté, pool
+    saturé) passe en erreur ; ses parties expirent ensuite comme les autres."""
+    maintenant = maintenant or timezone.now()
+    configuration = get_configuration()
+    bloques = TeleversementDocument.objects.filter(
+        statut='en_traitement',
+        date_mise_a_jour__lt=maintenant - timedelta(minutes=configuration['DELAI_ASSEMBLAGE_MINUTES']))
+    abandonnes = bloques.update(
+        statut='erreur', message_erreur="Assemblage interrompu, veuillez renvoyer le document",
+        date_mise_a_jour=maintenant)
+    if abandonnes:
+        logger.warning("%d assemblage(s) de téléversement abandonné(s) après expiration du délai", abandonnes)
+    limite = maintenant - timedelta(hours=configuration['EXPIRATION_HEURES'])
+    expires = TeleversementDocument.objects.filter(date_mise_a_jour__lt=limite).exclude(
+        statut__in=['termine', 'en_traitement'])
+    nombre = 0
+    for televersement in expires.iterator():
+        supprimer_parties(televersement)
+        televersement.delete()
+        nombre += 1
+    return nombre
+
+def _etat(televersement):
+    return {
+        'id': str(televersement.pk),
+        'statut': televersement.statut,
+        'taille_partie': televersement.taille_partie,
+        'nombre_parties': televersement.nombre_parties(),
+        'parties_recues': parties_recues(televersement) if televersement.statut == 'en_cours' else [],
+        'document': televersement.document_id,
+        'message_erreur': televersement.message_erreur,
+    }
+
+def _televersement_de(request, televersement_id):
+    """Téléversement appartenant à l'utilisateur courant, ou 404"""
+    return get_object_or_404(TeleversementDocument, pk=televersement_id, auteur=request.user)
+
+@login_required
+@user_passes_test(peut_consulter_documents)
+@require_POST
+def demarrer_televersement(request, pk):
+    """Crée un téléversement par parties pour le dossier du patient"""
+    patient = get_object_or_404(Patient.objects.select_related('dossier_medical'), pk=pk)
+    dossier = getattr(patient, 'dossier_medical', None)
+    if dossier is None:
+        raise Http404("Ce patient n'a pas de dossier médical")
+
+    form = TeleversementDocumentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'erreurs': form.errors}, status=400)
+    if form.cleaned_data['taille_totale'] > get_configuration()['TAILLE_MAX']:
+        return JsonResponse({'erreurs': {'taille_totale': ["Fichier trop volumineux"]}}, status=413)
+
+    televersement = form.save(commit=False)
+    televersement.dossier = dossier
+    televersement.auteur = request.user
+    televersement.taille_partie = get_configuration()['TAILLE_PARTIE']
+    televersement.save()
+    return JsonResponse(_etat(televersement), status=201)
+
+@login_required
+@require_GET
+def etat_televersement(request, televersement_id):
+    """État d'un téléversement : parties déjà reçues, statut de l'assemblage"""
+    return JsonResponse(_etat(_televersement_de(request, televersement_id)))
+
+@login_required
+@require_POST
+def envoyer_partie(request, televersement_id, numero):
+    """Reçoit une partie (corps brut de la requête)"""
+    televersement = _televersement_de(request, televersement_id)
+    if televersement.statut != 'en_cours':
+        return JsonResponse({'erreur': "Téléversement déjà terminé"}, status=409)
+    if numero >= televersement.nombre_parties():
+        return JsonResponse({'erreur': "Numéro de partie hors limites"}, status=400)
+
+    attendu = televersement.taille_attendue(numero)
+    try:
+        longueur = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        longueur = 0
+    if longueur != attendu:
+        return JsonResponse({'erreur': f"La partie {numero} doit faire {attendu} octet(s)"}, status=400)
+
+    try:
+        ecrire_partie(televersement, numero, request, longueur)
+    except ValueError as exc:
+        return JsonResponse({'erreur': str(exc)}, status=400)
+    # Repousse l'expiration tant que le client envoie des parties
+    TeleversementDocument.objects.filter(pk=televersement.pk).update(date_mise_a_jour=timezone.now())
+    return JsonResponse({'partie': numero, 'recue': True})
+
+@login_required
+@require_POST
+def terminer_televersement(request, televersement_id):
+    """Lance l'assemblage en arrière-plan une fois toutes les parties reçues"""
+    televersement = _televersement_de(request, televersement_id)
+    if televersement.statut != 'en_cours':
+        return JsonResponse(_etat(televersement))
+
+    manquantes = sorted(set(range(televersement.nombre_parties())) - set(parties_recues(televersement)))
+    if manquantes:
+        return JsonResponse({'erreur': "Parties manquantes", 'parties_manquantes': manquantes}, status=409)
+
+    # Passage atomique en traitement : un double appel ne lance qu'un assemblage
+    if TeleversementDocument.objects.filter(pk=televersement.pk, statut='en_cours').update(
+            statut='en_traitement', date_mise_a_jour=timezone.now()):
+        transaction.on_commit(lambda: get_executeur().submit(assembler_televersement, televersement.pk))
+    televersement.refresh_from_db()
+    return JsonResponse(_etat(televersement), status=202)
+
+# Fichier: applications/patients/api.py
+import hashlib
+import json
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .models import Patient
+from .recherche import rechercher_patients
+from .recherche_clinique import champs_autorises, peut_rechercher_clinique, rechercher_clinique
+from .synchronisation import lot_synchronisation
+
+ROLES_ACCES_PATIENTS = ['admin', 'directeur', 'infirmier_titulaire', 'medecin', 'receptionniste']
+
+def peut_consulter_patients(user):
+    """Vérifie si l'utilisateur a accès aux dossiers des patients"""
+    return user.role in ROLES_ACCES_PATIENTS
+
+@login_required
+@user_passes_test(peut_consulter_patients)
+def autocompletion_patients(request):
+    """Suggestions de patients (JSON) pour la saisie à l'accueil"""
+    terme = request.GET.get('q', '').strip()
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 10)), 50))
+    except ValueError:
+        limite = 10
+
+    patients = []
+    if len(terme) >= 2:
+        patients = rechercher_patients(terme, limite, Patient.actifs.all())
+
+    return JsonResponse({
+        'resultats': [
+            {
+                'id': patient.pk,
+                'numero_dossier': patient.numero_dossier,
+                'nom': patient.nom,
+                'prenom': patient.prenom,
+                'date_naissance': patient.date_naissance.isoformat() if patient.date_naissance else None,
+                'url': patient.get_absolute_url(),
+            }
+            for patient in patients
+        ]
+    })
+
+@login_required
+@user_passes_test(peut_rechercher_clinique)
+def recherche_clinique(request):
+    """Patients dont les textes cliniques visibles par le rôle contiennent les termes (JSON)"""
+    terme = request.GET.get('q', '').strip()
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 50)), 200))
+    except ValueError:
+        limite = 50
+
+    resultats = rechercher_clinique(terme, champs_autorises(request.user), limite) if terme else []
+    return JsonResponse({
+        'resultats': [
+            {
+                'id': resultat['patient'].pk,
+                'numero_dossier': resultat['patient'].numero_dossier,
+                'nom': resultat['patient'].nom,
+                'prenom': resultat['patient'].prenom,
+                'score': resultat['score'],
+                'champs': resultat['champs'],
+                'url': resultat['patient'].get_absolute_url(),
+            }
+            for resultat in resultats
+        ]
+    })
+
+@gzip_page
+@require_GET
+@login_required
+@user_passes_test(peut_consulter_patients)
+def synchronisation_patients(request):
+    """Modifications depuis le curseur du site distant (JSON compressé, ETag)
+
+    Le site rappelle avec le `curseur` reçu tant que `complet` est faux ; une fois à jour,
+    il peut interroger avec If-None-Match et recevra 304 tant que rien n'a changé."""
+    try:
+        lot = lot_synchronisation(request.GET.get('curseur'))
+    except signing.BadSignature:
+        return HttpResponseBadRequest("Curseur de synchronisation invalide")
+
+    contenu = json.dumps(lot, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = quote_etag(hashlib.sha256(contenu).hexdigest()[:32])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(contenu, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+# Fichier: applications/patients/synchronisation.py
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Patient, DossierMedical, AntecedentMedical, SuppressionSynchronisee
+
+# Synchronisation incrémentale des sites distants. Chaque flux est parcouru par curseur
+# (date de modification, id) ; le curseur de tous les flux est renvoyé signé au client,
+# qui le rappelle tant que le lot n'est pas complet. Un patient désactivé est transmis
+# avec est_actif à faux ; les suppressions passent par SuppressionSynchronisee.
+# Les lignes modifiées dans les dernières secondes (MARGE_SECONDES) sont différées :
+# une transaction encore ouverte peut valider une date antérieure au curseur.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLE_LOT': 500,      # Lignes par flux et par réponse
+    'MARGE_SECONDES': 5,
+}
+
+SEL_CURSEUR = 'patients.synchronisation'
+
+# Flux : (modèle, champ de date, colonnes transmises)
+FLUX = {
+    'patients': (Patient, 'date_mise_a_jour', (
+        'id', 'numero_dossier', 'nom', 'prenom', 'date_naissance', 'sexe', 'adresse', 'telephone',
+        'email', 'groupe_sanguin', 'profession', 'personne_contact', 'telephone_contact', 'est_actif',
+    )),
+    'dossiers': (DossierMedical, 'date_mise_a_jour', (
+        'id', 'patient_id', 'antecedents_medicaux', 'allergies', 'maladies_chroniques',
+        'traitements_en_cours', 'notes_importantes',
+    )),
+    'antecedents': (AntecedentMedical, 'date_mise_a_jour', (
+        'id', 'dossier_id', 'type_antecedent', 'description', 'date_debut', 'date_fin', 'traitement',
+    )),
+    'suppressions': (SuppressionSynchronisee, 'date_suppression', ('modele', 'objet_id')),
+}
+
+def get_configuration():
+    """Retourne la configuration de la synchronisation fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'SYNCHRONISATION', {}))
+    return configuration
+
+def lire_curseur(jeton):
+    """Positions {flux: (date, id)} du jeton signé ; lève signing.BadSignature s'il est altéré"""
+    if not jeton:
+        return {}
+    positions = signing.loads(jeton, salt=SEL_CURSEUR)
+    return {
+        flux: (datetime.datetime.fromisoformat(date), identifiant)
+        for flux, (date, identifiant) in positions.items() if flux in FLUX
+    }
+
+def signer_curseur(positions):
+    return signing.dumps(
+        {flux: (date.isoformat(), identifiant) for flux, (date, identifiant) in positions.items()},
+        salt=SEL_CURSEUR, compress=True,
+    )
+
+def lot_synchronisation(jeton=None):
+    """Lot suivant à partir du curseur : colonnes et lignes par flux, nouveau curseur, `complet`"""
+    configuration = get_configuration()
+    taille = configuration['TAILLE_LOT']
+    positions = lire_curseur(jeton)
+    borne = timezone.now() - datetime.timedelta(seconds=configuration['MARGE_SECONDES'])
+
+    flux_modifies = {}
+    complet = True
+    for nom, (modele, champ_date, colonnes) in FLUX.items():
+        queryset = modele.objects.filter(**{f'{champ_date}__lte': borne})
+        if nom in positions:
+            date, identifiant = positions[nom]
+            queryset = queryset.filter(Q(**{f'{champ_date}__gt': date}) | Q(**{champ_date: date, 'pk__gt': identifiant}))
+        lignes = list(queryset.order_by(champ_date, 'pk').values_list(champ_date, 'pk', *colonnes)[:taille + 1])
+        if len(lignes) > taille:
+            complet = False
+            lignes = lignes[:taille]
+        if lignes:
+            positions[nom] = lignes[-1][:2]
+            flux_modifies[nom] = {
+                'colonnes': colonnes,
+                'lignes': [ligne[2:] for ligne in lignes],
+            }
+    return {
+        'curseur': signer_curseur(positions),
+        'complet': complet,
+        'flux': flux_modifies,
+    }
+
+# Fichier: applications/patients/telechargement.py
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .models import DocumentMedical
+
+# Téléchargement des documents médicaux : lecture en flux par blocs (jamais de fichier
+# entier en mémoire), requêtes partielles (Range) et conditionnelles (ETag,
+# If-Modified-Since). Avec ENVOI_PAR_SERVEUR, le fichier est délégué à Nginx
+# (X-Accel-Redirect) ou Apache/lighttpd (X-Sendfile) après la vérification des droits.
+ROLES_ACCES_DOCUMENTS = ['admin', 'directeur', 'infirmier_titulaire', 'medecin',
+                         'infirmier', 'sage_femme', 'technicien_labo']
+TAILLE_BLOC = 64 * 1024
+PLAGE_OCTETS = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def peut_consulter_documents(user):
+    """Vérifie si l'utilisateur a accès aux documents médicaux"""
+    return user.role in ROLES_ACCES_DOCUMENTS
+
+def _plage_demandee(entete, taille):
+    """Retourne (début, fin incluse) pour une plage unique, None pour le fichier entier,
+    ou False si la plage n'est pas satisfiable"""
+    correspondance = PLAGE_OCTETS.match(entete.strip()) if entete else None
+    if not correspondance or correspondance.groups() == ('', '') or taille == 0:
+        # Absente, multiple, mal formée ou fichier vide : on répond avec le fichier entier
+        return None
+    debut, fin = correspondance.groups()
+    if debut == '':
+        # Suffixe : les N derniers octets
+        longueur = int(fin)
+        if longueur == 0:
+            return False
+        return max(taille - longueur, 0), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+def _lire_plage(fichier, debut, longueur):
+    """Générateur de blocs d'au plus TAILLE_BLOC octets sur [début, début + longueur["""
+    try:
+        fichier.seek(debut)
+        restant = longueur
+        while restant > 0:
+            bloc = fichier.read(min(TAILLE_BLOC, restant))
+            if not bloc:
+                break
+            restant -= len(bloc)
+            yield bloc
+    finally:
+        fichier.close()
+
+def _envoi_par_serveur(document, nom_fichier):
+    """Réponse vide déléguant l'envoi au serveur frontal, ou None si non configuré"""
+    configuration = getattr(settings, 'DOCUMENTS_MEDICAUX', {})
+    mode = configuration.get('ENVOI_PAR_SERVEUR')
+    if not mode:
+        return None
+    response = HttpResponse(content_type=mimetypes.guess_type(nom_fichier)[0] or 'application/octet-stream')
+    if mode == 'x-accel-redirect':
+        prefixe = configuration.get('PREFIXE_INTERNE', '/media-protege/')
+        response['X-Accel-Redirect'] = prefixe.rstrip('/') + '/' + document.fichier.name
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = document.fichier.path
+    else:
+        raise ValueError(f"Mode d'envoi inconnu : {mode}")
+    response['Content-Disposition'] = f'inline; filename="{nom_fichier}"'
+    return response
+
+@login_required
+@user_passes_test(peut_consulter_documents)
+def telecharger_document(request, pk):
+    """Envoie le fichier d'un document médical en flux, avec prise en charge de Range"""
+    document = get_object_or_404(DocumentMedical, pk=pk)
+    if not document.fichier:
+        raise Http404("Ce document n'a pas de fichier")
+    nom_fichier = os.path.basename(document.fichier.name)
+
+    response = _envoi_par_serveur(document, nom_fichier)
+    if response is not None:
+        return response
+
+    stockage = document.fichier.storage
+    try:
+        taille = stockage.size(document.fichier.name)
+        date_modification = stockage.get_modified_time(document.fichier.name).timestamp()
+    except FileNotFoundError:
+        raise Http404("Fichier introuvable")
+    etag = quote_etag(f'{document.pk}-{taille:x}-{int(date_modification):x}')
+
+    # 304 Not Modified / 412 Precondition Failed selon If-None-Match, If-Modified-Since, ...
+    response = get_conditional_response(request, etag=etag, last_modified=int(date_modification))
+    if response is not None:
+        return response
+
+    plage = _plage_demandee(request.META.get('HTTP_RANGE'), taille)
+    # If-Range : la plage n'est valable que si le fichier n'a pas changé
+    si_plage = request.META.get('HTTP_IF_RANGE')
+    if plage and si_plage and si_plage != etag:
+        date_si_plage = parse_http_date_safe(si_plage)
+        if date_si_plage is None or date_si_plage < int(date_modification):
+            plage = None
+
+    type_contenu = mimetypes.guess_type(nom_fichier)[0] or 'application/octet-stream'
+    if plage is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{taille}'
+    elif plage is None:
+        response = FileResponse(document.fichier.open('rb'), content_type=type_contenu, filename=nom_fichier)
+    else:
+        debut, fin = plage
+        longueur = fin - debut + 1
+        response = StreamingHttpResponse(
+            _lire_plage(document.fichier.open('rb'), debut, longueur),
+            status=206, content_type=type_contenu,
+        )
+        response['Content-Length'] = str(longueur)
+        response['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+        response['Content-Disposition'] = f'inline; filename="{nom_fichier}"'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(date_modification)
+    # Documents médicaux : jamais dans un cache partagé
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Fichier: applications/patients/management/commands/indexer_patients.py
+from django.core.management.base import BaseCommand
+
+from applications.patients.models import Patient
+from applications.patients.recherche import indexer_patients
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des patients (mots et trigrammes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=1000, help="Nombre de patients par transaction")
+
+    def handle(self, *args, **options):
+        taille_lot = options['taille_lot']
+        dernier_pk = 0
+        total = 0
+        while True:
+            lot = list(
+                Patient.objects.filter(pk__gt=dernier_pk).order_by('pk')
+                .only('pk', 'nom', 'prenom', 'numero_dossier')[:taille_lot]
+            )
+            if not lot:
+                break
+            total += indexer_patients(lot)
+            dernier_pk = lot[-1].pk
+            self.stdout.write(f"{total} patient(s) indexé(s)...")
+        self.stdout.write(self.style.SUCCESS(f"Index de recherche reconstruit pour {total} patient(s)."))
+
+# Fichier: applications/patients/management/commands/indexer_recherche_clinique.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.patients.models import Patient
+from applications.patients.recherche_clinique import indexer_clinique
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index plein texte des textes cliniques et mesure le débit d'indexation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=1000, help="Nombre de patients par transaction")
+
+    def handle(self, *args, **options):
+        taille_lot = options['taille_lot']
+        dernier_pk = 0
+        patients = termes = 0
+        debut = time.perf_counter()
+        while True:
+            lot = list(Patient.objects.filter(pk__gt=dernier_pk).order_by('pk').values_list('pk', flat=True)[:taille_lot])
+            if not lot:
+                break
+            termes += indexer_clinique(lot)
+            patients += len(lot)
+            dernier_pk = lot[-1]
+            duree = time.perf_counter() - debut
+            self.stdout.write(f"{patients} patient(s) indexé(s), {patients / duree:.0f} patients/s...")
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"Index clinique reconstruit : {patients} patient(s), {termes} terme(s) en {duree:.1f} s "
+            f"({patients / max(duree, 1e-9):.0f} patients/s, {termes / max(duree, 1e-9):.0f} termes/s)"
+        ))
+
+# Fichier: applications/patients/management/commands/bench_recherche_clinique.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from applications.patients.models import Patient
+from applications.patients.recherche_clinique import CHAMPS_ANTECEDENT, CHAMPS_DOSSIER, rechercher_clinique, termes
+
+REQUETES = ['pénicilline', 'diabète', 'hypertension artérielle', 'drépanocytose', 'asthme']
+
+class Command(BaseCommand):
+    help = "Compare la latence de la recherche clinique indexée à un balayage LIKE '%...%'"
+
+    def add_arguments(self, parser):
+        parser.add_argument('requetes', nargs='*', help="Textes recherchés (par défaut : quelques pathologies)")
+        parser.add_argument('--repetitions', type=int, default=20, help="Mesures par requête")
+        parser.add_argument('--limite', type=int, default=50)
+        parser.add_argument('--sans-like', action='store_true', help="Ne mesure pas le balayage LIKE (grosses tables)")
+
+    def mesurer(self, operation, repetitions):
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            resultat = operation()
+            durees.append(time.perf_counter() - debut)
+        durees.sort()
+        return durees[len(durees) // 2] * 1000, durees[min(len(durees) - 1, int(len(durees) * 0.95))] * 1000, resultat
+
+    def balayage_like(self, texte, limite):
+        """Référence : chaque mot doit figurer dans l'un des champs (LIKE sur tous les TextField)"""
+        condition = Q()
+        for mot in texte.split():
+            champs = [f'dossier_medical__{champ}' for champ in CHAMPS_DOSSIER]
+            champs += [f'dossier_medical__antecedents__{champ}' for champ in CHAMPS_ANTECEDENT]
+            mot_q = Q()
+            for champ in champs:
+                mot_q |= Q(**{f'{champ}__icontains': mot})
+            condition &= mot_q
+        return list(Patient.actifs.filter(condition).values_list('pk', flat=True).distinct()[:limite])
+
+    def handle(self, *args, **options):
+        repetitions = max(1, options['repetitions'])
+        for texte in options['requetes'] or REQUETES:
+            mediane, p95, resultats = self.mesurer(lambda: rechercher_clinique(texte, limite=options['limite']), repetitions)
+            self.stdout.write(f"« {texte} » ({' '.join(termes(texte))}) : index {mediane:.1f} ms "
+                              f"(p95 {p95:.1f} ms), {len(resultats)} patient(s)")
+            if not options['sans_like']:
+                mediane, p95, resultats = self.mesurer(lambda: self.balayage_like(texte, options['limite']), repetitions)
+                self.stdout.write(f"    LIKE : {mediane:.1f} ms (p95 {p95:.1f} ms), {len(resultats)} patient(s)")
+
+# Fichier: applications/patients/management/commands/mesurer_dossier_patient.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from applications.patients.chargement import charger_dossier_patient, invalider_dossier_patient
+from applications.patients.models import Patient
+
+class Command(BaseCommand):
+    help = "Compte les requêtes nécessaires pour charger et afficher le dossier complet d'un patient"
+
+    def add_arguments(self, parser):
+        parser.add_argument('patient_id', type=int)
+
+    def _afficher(self, patient):
+        # Reproduit le rendu d'une page : tous les __str__ sont évalués
+        str(patient)
+        dossier = getattr(patient, 'dossier_medical', None)
+        if dossier is None:
+            return 0, 0
+        antecedents = [str(antecedent) for antecedent in dossier.antecedents.all()]
+        documents = [f"{document} {document.auteur}" for document in dossier.documents.all()]
+        return len(antecedents), len(documents)
+
+    def handle(self, *args, **options):
+        pk = options['patient_id']
+        invalider_dossier_patient(pk)
+        for libelle in ('cache froid', 'cache chaud'):
+            with CaptureQueriesContext(connection) as requetes:
+                try:
+                    patient = charger_dossier_patient(pk)
+                except Patient.DoesNotExist:
+                    raise CommandError(f"Patient {pk} introuvable")
+                nombre_antecedents, nombre_documents = self._afficher(patient)
+            self.stdout.write(f"{libelle} : {len(requetes)} requête(s) pour "
+                              f"{nombre_antecedents} antécédent(s) et {nombre_documents} document(s)")
+
+# Fichier: applications/patients/management/commands/nettoyer_televersements.py
+from django.core.management.base import BaseCommand
+
+from applications.patients.televersement import nettoyer_televersements
+
+class Command(BaseCommand):
+    help = "Supprime les téléversements de documents inachevés et expirés"
+
+    def handle(self, *args, **options):
+        nombre = nettoyer_televersements()
+        self.stdout.write(self.style.SUCCESS(f"{nombre} téléversement(s) expiré(s) supprimé(s)."))
+
+# Fichier: applications/patients/import_export.py
+import csv
+import datetime
+import io
+import itertools
+
+from django.conf import settings
+from django.db import transaction
+
+from applications.utilisateurs.pagination import parcourir_par_lots
+
+from .forms import PatientForm, DossierMedicalForm
+from .models import Patient, DossierMedical
+from .numerotation import allocateur
+from .recherche import indexer_patients
+from .recherche_clinique import indexer_clinique
+
+# Import et export en masse des patients et de leur dossier médical (reprise des fiches
+# d'un autre centre). Le fichier est lu en flux et traité par lots : chaque ligne est
+# validée avec les règles de PatientForm et DossierMedicalForm, les numéros de dossier
+# d'un lot sont réservés en une fois, puis le lot est inséré par bulk_create dans sa
+# propre transaction. Les lignes rejetées sont écrites dans un rapport d'erreurs CSV.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLE_LOT': 500,
+    'TAILLE_MAX_ADMIN': 2 * 1024 * 1024,  # Octets ; au-delà, commande importer_patients
+}
+
+CHAMPS_PATIENT = [champ for champ in PatientForm.Meta.fields if champ != 'photo']
+CHAMPS_DOSSIER = list(DossierMedicalForm.Meta.fields)
+COLONNES_IMPORT = CHAMPS_PATIENT + CHAMPS_DOSSIER
+COLONNES_EXPORT = ['numero_dossier'] + CHAMPS_PATIENT + ['est_actif', 'date_enregistrement'] + CHAMPS_DOSSIER
+
+def get_configuration():
+    """Retourne la configuration de l'import fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'IMPORT_PATIENTS', {}))
+    return configuration
+
+def format_fichier(nom):
+    """'csv' ou 'xlsx' selon l'extension du fichier"""
+    return 'xlsx' if nom.lower().endswith('.xlsx') else 'csv'
+
+def _texte_cellule(valeur):
+    """Valeur d'une cellule XLSX telle qu'elle serait saisie dans le formulaire"""
+    if valeur is None:
+        return ''
+    if isinstance(valeur, datetime.datetime):
+        return valeur.date().isoformat()
+    if isinstance(valeur, datetime.date):
+        return valeur.isoformat()
+    if isinstance(valeur, float) and valeur.is_integer():
+        return str(int(valeur))  # Numéros de téléphone lus comme nombres
+    return str(valeur)
+
+def _lignes_csv(fichier):
+    if isinstance(fichier.read(0), bytes):
+        fichier = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    # Séparateur deviné sur l'en-tête : les tableurs français exportent avec ';'
+    entete = fichier.readline()
+    separateur = ';' if entete.count(';') > entete.count(',') else ','
+    yield from csv.reader(itertools.chain([entete], fichier), delimiter=separateur)
+
+def _lignes_xlsx(fichier):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("L'import XLSX nécessite le paquet openpyxl")
+    classeur = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        for ligne in classeur.active.iter_rows(values_only=True):
+            yield [_texte_cellule(valeur) for valeur in ligne]
+    finally:
+        classeur.close()
+
+def lire_lignes(fichier, format_fichier='csv'):
+    """Itère sur les lignes (numéro de ligne, dict colonne -> texte) d'un fichier CSV ou XLSX"""
+    lignes = _lignes_xlsx(fichier) if format_fichier == 'xlsx' else _lignes_csv(fichier)
+    entetes = [str(entete or '').strip().lower() for entete in next(lignes, [])]
+    manquantes = {'nom', 'prenom', 'sexe'} - set(entetes)
+    if manquantes:
+        raise ValueError(f"Colonnes obligatoires absentes : {', '.join(sorted(manquantes))}")
+    for numero, ligne in enumerate(lignes, start=2):
+        if not any(str(valeur).strip() for valeur in ligne):
+            continue
+        yield numero, {entete: str(valeur).strip() for entete, valeur in zip(entetes, ligne) if entete}
+
+def valider_ligne(valeurs):
+    """Retourne (patient, dossier, None) si la ligne est valide, sinon (None, None, erreurs)"""
+    donnees = {champ: valeurs.get(champ, '') for champ in COLONNES_IMPORT}
+    donnees['groupe_sanguin'] = donnees['groupe_sanguin'] or 'Inconnu'
+    formulaire_patient = PatientForm(data=donnees)
+    formulaire_dossier = DossierMedicalForm(data=donnees)
+    erreurs = []
+    for formulaire in (formulaire_patient, formulaire_dossier):
+        if not formulaire.is_valid():
+            for champ, messages in formulaire.errors.items():
+                erreurs.extend(f"{champ} : {message}" for message in messages)
+    if erreurs:
+        return None, None, erreurs
+    # save(commit=False) construit les instances sans requête
+    return formulaire_patient.save(commit=False), formulaire_dossier.save(commit=False), None
+
+def inserer_lot(patients, dossiers, annee=None):
+    """Insère un lot de patients valides avec leurs dossiers ; retourne le nombre inséré"""
+    numeros = allocateur.attribuer_plusieurs(len(patients), annee)
+    for patient, numero in zip(patients, numeros):
+        patient.numero_dossier = numero
+    with transaction.atomic():
+        Patient.objects.bulk_create(patients)
+        # MySQL ne renvoie pas les clés créées par bulk_create : relecture par numéro
+        cles = dict(Patient.objects.filter(numero_dossier__in=numeros).values_list('numero_dossier', 'pk'))
+        for patient, dossier in zip(patients, dossiers):
+            patient.pk = cles[patient.numero_dossier]
+            dossier.patient = patient
+        DossierMedical.objects.bulk_create(dossiers)
+        # bulk_create n'émet pas post_save : index de recherche mis à jour ici
+        indexer_patients(patients)
+        indexer_clinique([patient.pk for patient in patients])
+    return len(patients)
+
+def importer_patients(fichier, format_fichier='csv', rapport_erreurs=None, taille_lot=None, verification=False):
+    """Importe un fichier de patients par lots ; les lignes rejetées sont écrites dans
+    `rapport_erreurs` (fichier texte ouvert) s'il est fourni. Retourne les compteurs."""
+    taille_lot = taille_lot or get_configuration()['TAILLE_LOT']
+    lignes = lire_lignes(fichier, format_fichier)
+    redacteur = None
+    if rapport_erreurs is not None:
+        redacteur = csv.writer(rapport_erreurs)
+        redacteur.writerow(['ligne', 'erreurs'] + COLONNES_IMPORT)
+    compteurs = {'lues': 0, 'importees': 0, 'rejetees': 0}
+
+    while True:
+        lot = list(itertools.islice(lignes, taille_lot))
+        if not lot:
+            return compteurs
+        patients, dossiers = [], []
+        for numero, valeurs in lot:
+            patient, dossier, erreurs = valider_ligne(valeurs)
+            if erreurs:
+                compteurs['rejetees'] += 1
+                if redacteur is not None:
+                    redacteur.writerow([numero, ' | '.join(erreurs)] + [valeurs.get(champ, '') for champ in COLONNES_IMPORT])
+            else:
+                patients.append(patient)
+                dossiers.append(dossier)
+        compteurs['lues'] += len(lot)
+        if patients and not verification:
+            compteurs['importees'] += inserer_lot(patients, dossiers)
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : retourne la ligne au lieu de l'écrire"""
+    def write(self, valeur):
+        return valeur
+
+def _valeur_export(patient, champ):
+    if champ in CHAMPS_DOSSIER:
+        dossier = getattr(patient, 'dossier_medical', None)
+        valeur = getattr(dossier, champ) if dossier is not None else None
+    else:
+        valeur = getattr(patient, champ)
+    if isinstance(valeur, (datetime.date, datetime.datetime)):
+        return valeur.isoformat()
+    return '' if valeur is None else valeur
+
+def lignes_export_patients(queryset=None, taille_lot=2000):
+    """Lignes CSV (texte) des patients et de leur dossier, lues par lots bornés"""
+    if queryset is None:
+        queryset = Patient.objects.all()
+    patients = parcourir_par_lots(queryset.select_related('dossier_medical'), 'date_enregistrement', taille_lot)
+    redacteur = csv.writer(_Echo())
+    yield redacteur.writerow(COLONNES_EXPORT)
+    for patient in patients:
+        yield redacteur.writerow([_valeur_export(patient, champ) for champ in COLONNES_EXPORT])
+
+# Fichier: applications/patients/admin.py
+import io
+
+from django import forms
+from django.contrib import admin
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import path
+from django.utils import timezone
+
+from .doublons import fusionner_patients
+from .import_export import format_fichier, get_configuration, importer_patients, lignes_export_patients
+from .models import Patient, DoublonPatient
+
+class ImportPatientsForm(forms.Form):
+    """Fichier CSV ou XLSX de patients à importer, importé pendant la requête : sa taille
+    est bornée, les gros fichiers passent par la commande importer_patients"""
+    fichier = forms.FileField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taille_max = get_configuration()['TAILLE_MAX_ADMIN']
+        self.fields['fichier'].help_text = (
+            f"Colonnes : nom, prenom, sexe, puis les autres champs du patient et du dossier. "
+            f"{self.taille_max // 1024} Ko au plus ; pour un fichier plus volumineux, utiliser "
+            f"« python manage.py importer_patients <fichier> »."
+        )
+
+    def clean_fichier(self):
+        fichier = self.cleaned_data['fichier']
+        if fichier.size > self.taille_max:
+            raise forms.ValidationError(
+                f"Fichier trop volumineux pour l'administration ({fichier.size // 1024} Ko) : "
+                f"utiliser la commande « python manage.py importer_patients »."
+            )
+        return fichier
+
+@admin.register(Patient)
+class PatientAdmin(admin.ModelAdmin):
+    list_display = ('numero_dossier', 'nom', 'prenom', 'date_naissance', 'sexe', 'est_actif')
+    list_filter = ('est_actif', 'sexe')
+    search_fields = ('numero_dossier', 'nom', 'prenom')
+    actions = ['exporter_csv']
+    change_list_template = 'admin/patients/patient/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('importer/', self.admin_site.admin_view(self.importer), name='patients_patient_importer'),
+        ] + super().get_urls()
+
+    @admin.action(description="Exporter les patients sélectionnés (CSV)")
+    def exporter_csv(self, request, queryset):
+        response = StreamingHttpResponse(lignes_export_patients(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="patients_{timezone.now():%Y%m%d_%H%M}.csv"'
+        return response
+
+    def importer(self, request):
+        """Import d'un fichier de patients ; renvoie le rapport d'erreurs s'il y a des rejets"""
+        if not self.has_add_permission(request):
+            return redirect('admin:patients_patient_changelist')
+        formulaire = ImportPatientsForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and formulaire.is_valid():
+            fichier = formulaire.cleaned_data['fichier']
+            rapport = io.StringIO()
+            try:
+                compteurs = importer_patients(fichier.file, format_fichier(fichier.name), rapport)
+            except ValueError as erreur:
+                formulaire.add_error('fichier', str(erreur))
+            else:
+                self.message_user(request, f"{compteurs['importees']} patient(s) importé(s), "
+                                           f"{compteurs['rejetees']} ligne(s) rejetée(s)")
+                if compteurs['rejetees']:
+                    response = HttpResponse(rapport.getvalue(), content_type='text/csv; charset=utf-8')
+                    response['Content-Disposition'] = 'attachment; filename="erreurs_import_patients.csv"'
+                    return response
+                return redirect('admin:patients_patient_changelist')
+        return render(request, 'admin/patients/patient/importer.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Importer des patients",
+            'formulaire': formulaire,
+        })
+
+@admin.register(DoublonPatient)
+class DoublonPatientAdmin(admin.ModelAdmin):
+    list_display = ('patient_a', 'patient_b', 'score', 'raisons', 'statut', 'date_detection')
+    list_filter = ('statut',)
+    list_select_related = ('patient_a', 'patient_b')
+    raw_id_fields = ('patient_a', 'patient_b', 'decideur')
+    actions = ['fusionner_dans_a', 'fusionner_dans_b', 'rejeter']
+
+    def _fusionner(self, request, queryset, conserver_a):
+        fusions = 0
+        for doublon in queryset.filter(statut='en_attente'):
+            conserve, supprime = (doublon.patient_a_id, doublon.patient_b_id) if conserver_a \
+                else (doublon.patient_b_id, doublon.patient_a_id)
+            try:
+                fusionner_patients(conserve, supprime, request.user)
+            except Patient.DoesNotExist:
+                continue
+            fusions += 1
+        self.message_user(request, f"{fusions} fusion(s) effectuée(s)")
+
+    @admin.action(description="Fusionner en conservant le patient A")
+    def fusionner_dans_a(self, request, queryset):
+        self._fusionner(request, queryset, conserver_a=True)
+
+    @admin.action(description="Fusionner en conservant le patient B")
+    def fusionner_dans_b(self, request, queryset):
+        self._fusionner(request, queryset, conserver_a=False)
+
+    @admin.action(description="Rejeter (patients distincts)")
+    def rejeter(self, request, queryset):
+        nombre = queryset.filter(statut='en_attente').update(
+            statut='rejete', date_decision=timezone.now(), decideur=request.user)
+        self.message_user(request, f"{nombre} paire(s) rejetée(s)")
+
+# Fichier: applications/patients/management/commands/importer_patients.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.patients.import_export import format_fichier, importer_patients
+
+class Command(BaseCommand):
+    help = "Importe des patients et leur dossier médical depuis un fichier CSV ou XLSX, par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier CSV (séparateur , ou ;) ou XLSX")
+        parser.add_argument('--rapport-erreurs', default=None,
+                            help="Fichier CSV des lignes rejetées (par défaut : <fichier>.erreurs.csv)")
+        parser.add_argument('--taille-lot', type=int, default=None, help="Lignes validées et insérées par transaction")
+        parser.add_argument('--verification', action='store_true', help="Valide le fichier sans rien insérer")
+
+    def handle(self, *args, **options):
+        chemin_rapport = options['rapport_erreurs'] or f"{options['fichier']}.erreurs.csv"
+        debut = time.perf_counter()
+        try:
+            with open(options['fichier'], 'rb') as fichier, \
+                    open(chemin_rapport, 'w', encoding='utf-8', newline='') as rapport:
+                compteurs = importer_patients(fichier, format_fichier(options['fichier']), rapport,
+                                              options['taille_lot'], options['verification'])
+        except (OSError, ValueError) as erreur:
+            raise CommandError(str(erreur))
+        duree = time.perf_counter() - debut
+
+        self.stdout.write(f"Lignes lues : {compteurs['lues']}, importées : {compteurs['importees']}, "
+                          f"rejetées : {compteurs['rejetees']} ({duree:.1f} s, "
+                          f"{compteurs['lues'] / duree if duree else 0:.0f} lignes/s)")
+        if compteurs['rejetees']:
+            self.stdout.write(self.style.WARNING(f"Rapport d'erreurs : {chemin_rapport}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucune ligne rejetée."))
+
+# Fichier: applications/patients/management/commands/exporter_patients.py
+from django.core.management.base import BaseCommand
+
+from applications.patients.import_export import lignes_export_patients
+from applications.patients.models import Patient
+
+class Command(BaseCommand):
+    help = "Exporte les patients et leur dossier médical en CSV, par lots bornés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier CSV produit")
+        parser.add_argument('--actifs', action='store_true', help="Uniquement les patients actifs")
+
+    def handle(self, *args, **options):
+        patients = Patient.objects.all()
+        if options['actifs']:
+            patients = Patient.actifs.all()
+        nombre = -1  # Ligne d'en-tête
+        with open(options['fichier'], 'w', encoding='utf-8', newline='') as fichier:
+            for ligne in lignes_export_patients(patients):
+                fichier.write(ligne)
+                nombre += 1
+        self.stdout.write(self.style.SUCCESS(f"{nombre} patient(s) exporté(s) dans {options['fichier']}"))
+
+# Fichier: applications/patients/liste.py
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.shortcuts import render
+
+from applications.utilisateurs.pagination import estimer_nombre, paginer_par_curseur
+
+from .api import peut_consulter_patients
+from .forms import RecherchePatientForm
+from .models import Patient
+
+# Liste des patients actifs : page lue par curseur sur l'index (est_actif,
+# date_enregistrement) et total estimé, au lieu d'OFFSET et d'un COUNT(*) exact
+TAILLE_PAGE = 50
+COLONNES_LISTE = ('numero_dossier', 'nom', 'prenom', 'date_naissance', 'sexe', 'telephone', 'date_enregistrement')
+
+@login_required
+@user_passes_test(peut_consulter_patients)
+def liste_patients(request):
+    """Liste paginée des patients actifs, ou résultats de recherche"""
+    formulaire = RecherchePatientForm(request.GET or None)
+    curseur_suivant = None
+    if formulaire.is_valid() and formulaire.cleaned_data.get('terme'):
+        patients = formulaire.rechercher(Patient.actifs.only(*COLONNES_LISTE), TAILLE_PAGE)
+        nombre, estimation = len(patients), False
+    else:
+        patients, curseur_suivant = paginer_par_curseur(
+            Patient.actifs.only(*COLONNES_LISTE), 'date_enregistrement', request.GET.get('curseur'), TAILLE_PAGE
+        )
+        nombre, estimation = estimer_nombre(Patient.actifs.all())
+
+    return render(request, 'patients/liste_patients.html', {
+        'formulaire': formulaire,
+        'patients': patients,
+        'curseur_suivant': curseur_suivant,
+        'est_premiere_page': not request.GET.get('curseur'),
+        'nombre': nombre,
+        'estimation': estimation,
+    })
+
+# Fichier: applications/patients/management/commands/bench_liste_patients.py
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from applications.patients.models import Patient
+from applications.utilisateurs.pagination import encoder_curseur, estimer_nombre, paginer_par_curseur
+
+PREFIXE = 'BENCH-'
+TAILLE_PAGE = 50
+
+class Command(BaseCommand):
+    help = ("Compare OFFSET + COUNT(*) et curseur + estimation pour la liste des patients actifs "
+            "(crée les patients fictifs manquants, préfixe BENCH-)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1_000_000, help="Patients fictifs visés")
+        parser.add_argument('--inactifs', type=float, default=0.1, help="Proportion de patients désactivés")
+        parser.add_argument('--repetitions', type=int, default=5, help="Mesures par opération (médiane)")
+        parser.add_argument('--nettoyer', action='store_true', help="Supprime les patients fictifs à la fin")
+
+    def handle(self, *args, **options):
+        self.creer_patients(options['patients'], options['inactifs'])
+        actifs = Patient.actifs.only('numero_dossier', 'nom', 'prenom', 'date_enregistrement')
+        nombre_actifs = Patient.actifs.count()
+        profondeur = max(0, nombre_actifs - TAILLE_PAGE) // 2
+        # Position du curseur au milieu de la liste (calculée hors mesure)
+        milieu = actifs.order_by('-date_enregistrement', '-pk')[profondeur]
+        curseur = encoder_curseur(milieu.date_enregistrement, milieu.pk)
+
+        mesures = [
+            ("COUNT(*) exact", lambda: Patient.actifs.count()),
+            ("Nombre estimé", lambda: estimer_nombre(Patient.actifs.all())),
+            ("OFFSET, première page", lambda: list(actifs[:TAILLE_PAGE])),
+            (f"OFFSET, page au rang {profondeur}", lambda: list(actifs[profondeur:profondeur + TAILLE_PAGE])),
+            ("Curseur, première page", lambda: paginer_par_curseur(actifs, 'date_enregistrement', None, TAILLE_PAGE)),
+            (f"Curseur, page au rang {profondeur}",
+             lambda: paginer_par_curseur(actifs, 'date_enregistrement', curseur, TAILLE_PAGE)),
+        ]
+        self.stdout.write(f"Patients actifs : {nombre_actifs}")
+        for libelle, operation in mesures:
+            durees = []
+            for _ in range(options['repetitions']):
+                debut = time.perf_counter()
+                operation()
+                durees.append(time.perf_counter() - debut)
+            durees.sort()
+            self.stdout.write(f"{libelle} : {durees[len(durees) // 2] * 1000:.1f} ms")
+
+        if options['nettoyer']:
+            # Ni dossier ni clé de recherche (bulk_create) : suppression directe, sans collecte
+            supprimes = Patient.objects.filter(numero_dossier__startswith=PREFIXE)._raw_delete(connection.alias)
+            self.stdout.write(f"{supprimes} patient(s) fictif(s) supprimé(s)")
+
+    def creer_patients(self, nombre, proportion_inactifs, taille_lot=5000):
+        existants = Patient.objects.filter(numero_dossier__startswith=PREFIXE).count()
+        if existants >= nombre:
+            return
+        self.stdout.write(f"Création de {nombre - existants} patients fictifs...")
+        maintenant = timezone.now()
+        for debut in range(existants, nombre, taille_lot):
+            patients = [
+                Patient(
+                    numero_dossier=f'{PREFIXE}{numero:08d}',
+                    nom=f'Nom{numero % 5000}',
+                    prenom=f'Prenom{numero % 700}',
+                    date_naissance=datetime.date(1940, 1, 1) + datetime.timedelta(days=random.randint(0, 30000)),
+                    sexe=random.choice('MF'),
+                    est_actif=random.random() >= proportion_inactifs,
+                )
+                for numero in range(debut, min(debut + taille_lot, nombre))
+            ]
+            Patient.objects.bulk_create(patients)
+            # auto_now_add date tout le lot de l'insertion : une date tirée sur dix ans par lot
+            Patient.objects.filter(numero_dossier__in=[patient.numero_dossier for patient in patients]).update(
+                date_enregistrement=maintenant - datetime.timedelta(seconds=random.randint(0, 315_360_000))
+            )
+
+# Fichier: applications/patients/similarite.py
+# Score de similarité de deux fiches patient. Ce module n'importe pas Django : il est
+# exécuté dans les processus du pool de détection des doublons, qui reçoivent des
+# fiches déjà normalisées (nom et prénom pliés, année et date ISO, téléphone réduit).
+
+POIDS = {
+    'nom': 0.35,
+    'prenom': 0.25,
+    'naissance': 0.25,
+    'telephone': 0.15,
+}
+
+def jaro_winkler(a, b):
+    """Similarité de Jaro-Winkler entre deux chaînes (0 à 1)"""
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+    portee = max(len(a), len(b)) // 2 - 1
+    correspondances_a = [False] * len(a)
+    correspondances_b = [False] * len(b)
+    communs = 0
+    for i, caractere in enumerate(a):
+        for j in range(max(0, i - portee), min(len(b), i + portee + 1)):
+            if not correspondances_b[j] and b[j] == caractere:
+                correspondances_a[i] = correspondances_b[j] = True
+                communs += 1
+                break
+    if not communs:
+        return 0.0
+    transpositions = 0
+    j = 0
+    for i, caractere in enumerate(a):
+        if correspondances_a[i]:
+            while not correspondances_b[j]:
+                j += 1
+            if caractere != b[j]:
+                transpositions += 1
+            j += 1
+    jaro = (communs / len(a) + communs / len(b) + (communs - transpositions / 2) / communs) / 3
+    prefixe = 0
+    for caractere_a, caractere_b in zip(a[:4], b[:4]):
+        if caractere_a != caractere_b:
+            break
+        prefixe += 1
+    return jaro + prefixe * 0.1 * (1 - jaro)
+
+def score_paire(fiche_a, fiche_b):
+    """Retourne (score, raisons) pour deux fiches (nom, prénom, date ISO, téléphone, sexe)"""
+    nom_a, prenom_a, naissance_a, telephone_a, sexe_a = fiche_a
+    nom_b, prenom_b, naissance_b, telephone_b, sexe_b = fiche_b
+    # Nom et prénom inversés à la saisie : on garde la meilleure des deux lectures
+    noms = max(
+        (jaro_winkler(nom_a, nom_b), jaro_winkler(prenom_a, prenom_b)),
+        (jaro_winkler(nom_a, prenom_b), jaro_winkler(prenom_a, nom_b)),
+        key=sum,
+    )
+    score = POIDS['nom'] * noms[0] + POIDS['prenom'] * noms[1]
+    raisons = [f"noms {sum(noms) / 2:.2f}"]
+
+    if naissance_a and naissance_b:
+        if naissance_a == naissance_b:
+            score += POIDS['naissance']
+            raisons.append("même date de naissance")
+        elif naissance_a[:4] == naissance_b[:4]:
+            score += POIDS['naissance'] * 0.4
+            raisons.append("même année de naissance")
+        else:
+            score -= POIDS['naissance']
+    else:
+        # Date absente sur une fiche : ni preuve ni contre-indication
+        score += POIDS['naissance'] * 0.3
+
+    if telephone_a and telephone_a == telephone_b:
+        score += POIDS['telephone']
+        raisons.append("même téléphone")
+    if sexe_a != sexe_b:
+        score -= 0.1
+        raisons.append("sexes différents")
+    return round(score, 4), ', '.join(raisons)
+
+def scorer_lot(paires, fiches, seuil):
+    """Scores des paires (pk_a, pk_b) d'un lot ; seules celles au-dessus du seuil sont rendues"""
+    resultats = []
+    for pk_a, pk_b in paires:
+        score, raisons = score_paire(fiches[pk_a], fiches[pk_b])
+        if score >= seuil:
+            resultats.append((pk_a, pk_b, score, raisons))
+    return resultats
+
+# Fichier: applications/patients/doublons.py
+import itertools
+import multiprocessing
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .chargement import invalider_dossier_patient
+from .models import Patient, DossierMedical, AntecedentMedical, DocumentMedical, TeleversementDocument, DoublonPatient
+from .recherche import indexer_patient, plier
+from .recherche_clinique import indexer_clinique
+from .similarite import scorer_lot
+
+# Détection des doublons de patients sans comparaison de toutes les paires : chaque
+# patient reçoit quelques clés de blocage (codes phonétiques du nom et du prénom, année
+# de naissance, téléphone normalisé) et seuls les patients partageant une clé sont
+# comparés. Les paires candidates sont notées par lots dans un pool de processus
+# (similarite.py) et celles au-dessus du seuil sont écrites dans DoublonPatient.
+CONFIGURATION_PAR_DEFAUT = {
+    'SEUIL': 0.8,
+    'TAILLE_BLOC_MAX': 200,     # Au-delà, comparaison par fenêtre glissante dans le bloc
+    'FENETRE': 20,
+    'TAILLE_LOT': 20000,        # Paires notées par tâche du pool
+    'TRAVAILLEURS': 4,
+}
+
+# Réécritures phonétiques appliquées dans l'ordre (graphies fréquentes à l'accueil)
+REGLES_PHONETIQUES = [
+    ('sch', 's'), ('tch', 's'), ('tsh', 's'), ('ch', 's'), ('sh', 's'), ('ph', 'f'), ('qu', 'k'),
+    ('ck', 'k'), ('gn', 'n'), ('th', 't'), ('ou', 'u'), ('w', 'v'), ('y', 'i'), ('z', 's'),
+    ('c', 'k'), ('q', 'k'), ('x', 'ks'), ('h', ''),
+]
+VOYELLES = set('aeiou')
+
+def get_configuration():
+    """Retourne la configuration de la détection fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'DOUBLONS_PATIENTS', {}))
+    return configuration
+
+def code_phonetique(texte, longueur=6):
+    """Code phonétique du premier mot : 'Tshibangu' et 'Chibango' donnent 'sbng'"""
+    mots = plier(texte).split()
+    if not mots:
+        return ''
+    mot = mots[0]
+    for graphie, son in REGLES_PHONETIQUES:
+        mot = mot.replace(graphie, son)
+    if not mot:
+        return ''
+    # Première lettre conservée, voyelles suivantes retirées, lettres répétées fusionnées
+    code = mot[0]
+    for lettre in mot[1:]:
+        if lettre not in VOYELLES and lettre != code[-1]:
+            code += lettre
+    return code[:longueur]
+
+def normaliser_telephone(telephone):
+    """Neuf derniers chiffres : '+243 81 234 5678' et '0812345678' coïncident"""
+    chiffres = re.sub(r'\D', '', telephone or '')
+    return chiffres[-9:] if len(chiffres) >= 9 else ''
+
+def cles_blocage(nom, prenom, date_naissance, telephone):
+    code_nom, code_prenom = code_phonetique(nom), code_phonetique(prenom)
+    annee = str(date_naissance.year) if date_naissance else ''
+    cles = []
+    if code_nom and code_prenom:
+        # Ordre indifférent : nom et prénom inversés tombent dans le même bloc
+        cles.append('np:' + '|'.join(sorted((code_nom, code_prenom))))
+    if annee and code_nom:
+        cles.append(f'na:{code_nom}|{annee}')
+    if annee and code_prenom:
+        cles.append(f'pa:{code_prenom}|{annee}')
+    if telephone:
+        cles.append(f't:{telephone}')
+    return cles
+
+def charger_fiches(queryset=None, taille_lot=5000):
+    """Fiches normalisées {pk: (nom, prénom, date ISO, téléphone, sexe)} et blocs {clé: [pk]}"""
+    if queryset is None:
+        queryset = Patient.actifs.all()
+    fiches = {}
+    blocs = defaultdict(list)
+    dernier = 0
+    colonnes = ('pk', 'nom', 'prenom', 'date_naissance', 'telephone', 'sexe')
+    while True:
+        lignes = list(queryset.filter(pk__gt=dernier).order_by('pk').values_list(*colonnes)[:taille_lot])
+        if not lignes:
+            return fiches, blocs
+        for pk, nom, prenom, date_naissance, telephone, sexe in lignes:
+            telephone = normaliser_telephone(telephone)
+            fiches[pk] = (plier(nom), plier(prenom), date_naissance.isoformat() if date_naissance else '',
+                          telephone, sexe)
+            for cle in cles_blocage(nom, prenom, date_naissance, telephone):
+                blocs[cle].append(pk)
+        dernier = lignes[-1][0]
+
+def paires_candidates(fiches, blocs, taille_bloc_max, fenetre):
+    """Ensemble des paires (pk plus petit, pk plus grand) partageant au moins un bloc"""
+    paires = set()
+    for membres in blocs.values():
+        if len(membres) < 2:
+            continue
+        if len(membres) <= taille_bloc_max:
+            paires.update(itertools.combinations(sorted(membres), 2))
+            continue
+        # Bloc trop grand (nom très courant) : voisins proches dans l'ordre alphabétique
+        membres = sorted(membres, key=lambda pk: (fiches[pk][0], fiches[pk][1], fiches[pk][2]))
+        for index, pk in enumerate(membres):
+            for voisin in membres[index + 1:index + 1 + fenetre]:
+                paires.add((min(pk, voisin), max(pk, voisin)))
+    return paires
+
+def detecter_doublons(queryset=None, seuil=None, travailleurs=None):
+    """Écrit les paires probables dans DoublonPatient ; retourne (paires comparées, paires retenues)"""
+    configuration = get_configuration()
+    seuil = configuration['SEUIL'] if seuil is None else seuil
+    travailleurs = travailleurs or configuration['TRAVAILLEURS']
+    fiches, blocs = charger_fiches(queryset)
+    paires = sorted(paires_candidates(fiches, blocs, configuration['TAILLE_BLOC_MAX'], configuration['FENETRE']))
+
+    lots = [paires[debut:debut + configuration['TAILLE_LOT']]
+            for debut in range(0, len(paires), configuration['TAILLE_LOT'])]
+    retenues = 0
+    with ProcessPoolExecutor(max_workers=travailleurs, mp_context=multiprocessing.get_context('spawn')) as pool:
+        taches = [
+            pool.submit(scorer_lot, lot, {pk: fiches[pk] for paire in lot for pk in paire}, seuil)
+            for lot in lots
+        ]
+        for tache in taches:
+            resultats = tache.result()
+            # Les paires déjà en table (en attente, rejetées, fusionnées) ne sont ni
+            # reproposées ni comptées ; ignore_conflicts couvre une détection concurrente
+            existantes = set(DoublonPatient.objects.filter(
+                patient_a_id__in={pk_a for pk_a, _, _, _ in resultats},
+                patient_b_id__in={pk_b for _, pk_b, _, _ in resultats},
+            ).values_list('patient_a_id', 'patient_b_id')) if resultats else set()
+            nouvelles = [
+                DoublonPatient(patient_a_id=pk_a, patient_b_id=pk_b, score=score, raisons=raisons[:255])
+                for pk_a, pk_b, score, raisons in resultats if (pk_a, pk_b) not in existantes
+            ]
+            DoublonPatient.objects.bulk_create(nouvelles, ignore_conflicts=True, batch_size=1000)
+            retenues += len(nouvelles)
+    return len(paires), retenues
+
+CHAMPS_COMPLETES = ('date_naissance', 'adresse', 'telephone', 'email', 'profession',
+                    'personne_contact', 'telephone_contact', 'photo')
+CHAMPS_TEXTE_DOSSIER = ('antecedents_medicaux', 'allergies', 'maladies_chroniques',
+                        'traitements_en_cours', 'notes_importantes')
+
+def fusionner_patients(conserve_id, doublon_id, decideur=None):
+    """Rattache au patient conservé le dossier, les antécédents et les documents du doublon,
+    complète ses champs vides, puis désactive le doublon ; le tout en une transaction.
+    Le doublon n'est pas supprimé : les autres modules peuvent encore le référencer."""
+    if conserve_id == doublon_id:
+        raise ValueError("Un patient ne peut pas être fusionné avec lui-même")
+    with transaction.atomic():
+        # Verrouillage dans l'ordre des clés : deux fusions croisées ne s'interbloquent pas
+        patients = {patient.pk: patient for patient in
+                    Patient.objects.select_for_update().filter(pk__in=[conserve_id, doublon_id]).order_by('pk')}
+        if len(patients) < 2:
+            raise Patient.DoesNotExist("Patient à fusionner introuvable")
+        conserve, doublon = patients[conserve_id], patients[doublon_id]
+
+        champs_modifies = []
+        for champ in CHAMPS_COMPLETES:
+            if not getattr(conserve, champ) and getattr(doublon, champ):
+                setattr(conserve, champ, getattr(doublon, champ))
+                champs_modifies.append(champ)
+        if champs_modifies:
+            # auto_now n'est écrit que s'il figure dans update_fields : sans lui, la
+            # synchronisation des sites distants ne verrait pas les champs complétés
+            conserve.save(update_fields=champs_modifies + ['date_mise_a_jour'])
+
+        dossier_doublon = DossierMedical.objects.filter(patient=doublon).first()
+        if dossier_doublon is not None:
+            dossier_conserve = DossierMedical.objects.filter(patient=conserve).first()
+            if dossier_conserve is None:
+                DossierMedical.objects.filter(pk=dossier_doublon.pk).update(
+                    patient=conserve, date_mise_a_jour=timezone.now())
+            else:
+                # update() ne renseigne pas auto_now : date_mise_a_jour explicite pour la synchronisation
+                AntecedentMedical.objects.filter(dossier=dossier_doublon).update(
+                    dossier=dossier_conserve, date_mise_a_jour=timezone.now())
+                for modele in (DocumentMedical, TeleversementDocument):
+                    modele.objects.filter(dossier=dossier_doublon).update(dossier=dossier_conserve)
+                # Textes libres : ceux du doublon sont ajoutés s'ils apportent quelque chose
+                for champ in CHAMPS_TEXTE_DOSSIER:
+                    texte_conserve = getattr(dossier_conserve, champ) or ''
+                    texte_doublon = (getattr(dossier_doublon, champ) or '').strip()
+                    if texte_doublon and texte_doublon not in texte_conserve:
+                        setattr(dossier_conserve, champ, f"{texte_conserve}\n{texte_doublon}".strip())
+                dossier_conserve.save()
+                dossier_doublon.delete()
+
+        Patient.objects.filter(pk=doublon.pk).update(est_actif=False, date_mise_a_jour=timezone.now())
+        DoublonPatient.objects.filter(
+            Q(patient_a=conserve, patient_b=doublon) | Q(patient_a=doublon, patient_b=conserve)
+        ).update(statut='fusionne', date_decision=timezone.now(), decideur=decideur)
+        # Les autres paires du doublon n'ont plus d'objet
+        DoublonPatient.objects.filter(Q(patient_a=doublon) | Q(patient_b=doublon), statut='en_attente').delete()
+
+        indexer_patient(conserve)
+        indexer_clinique([conserve_id, doublon_id])
+        # update() n'émet pas de signal : invalidation explicite des dossiers en cache
+        transaction.on_commit(lambda: (invalider_dossier_patient(conserve_id), invalider_dossier_patient(doublon_id)))
+    return conserve
+
+# Fichier: applications/patients/management/commands/detecter_doublons.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.patients.doublons import detecter_doublons
+
+class Command(BaseCommand):
+    help = "Recherche les patients en double par blocs (phonétique, année, téléphone) et remplit la table d'examen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seuil', type=float, default=None, help="Score minimal d'une paire retenue")
+        parser.add_argument('--travailleurs', type=int, default=None, help="Processus de notation")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        comparees, retenues = detecter_doublons(seuil=options['seuil'], travailleurs=options['travailleurs'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{comparees} paire(s) comparée(s), {retenues} doublon(s) probable(s) "
+            f"en {time.perf_counter() - debut:.1f} s"
+        ))
+
+# Fichier: applications/patients/tests.py
+import datetime
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from applications.utilisateurs.models import Utilisateur
+
+from .chargement import charger_dossier_patient
+from .doublons import cles_blocage, code_phonetique, fusionner_patients
+from .models import (Patient, DossierMedical, AntecedentMedical, DocumentMedical, CompteurDossier,
+                     TeleversementDocument)
+from .numerotation import AllocateurNumeroDossier
+from .similarite import score_paire
+from .synchronisation import lot_synchronisation
+from .televersement import (assembler_televersement, ecrire_partie, nettoyer_televersements,
+                            repertoire_televersement)
+
+def afficher_dossier(patient):
+    """Reproduit le rendu de la page du dossier : tous les __str__ sont évalués"""
+    dossier = patient.dossier_medical
+    return [str(patient)] + [str(antecedent) for antecedent in dossier.antecedents.all()] + [
+        f"{document} {document.auteur}" for document in dossier.documents.all()
+    ]
+
+class NumerotationConcurrenteTests(TransactionTestCase):
+    """Réservations depuis des transactions ouvertes, dans plusieurs threads"""
+    databases = {'default', 'numerotation'}
+
+    def test_reservation_hors_transaction_ouverte(self):
+        allocateur = AllocateurNumeroDossier(taille_bloc=2, format_numero='{annee}-{numero}')
+        numeros, erreurs = [], []
+        premier_attribue = threading.Event()
+        second_termine = threading.Event()
+
+        def poste(attendre, signaler, nombre):
+            try:
+                with transaction.atomic():
+                    if attendre:
+                        attendre.wait(10)
+                    for _ in range(nombre):
+                        numeros.append(allocateur.attribuer('test'))
+                    signaler.set()
+                    if not attendre:
+                        # Transaction laissée ouverte jusqu'à ce que l'autre poste ait réservé
+                        self.assertTrue(second_termine.wait(10), "Réservation bloquée par une transaction ouverte")
+            except Exception as exc:
+                erreurs.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=poste, args=(None, premier_attribue, 3)),
+            threading.Thread(target=poste, args=(premier_attribue, second_termine, 5)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        self.assertEqual(erreurs, [])
+        self.assertEqual(len(numeros), 8)
+        self.assertEqual(len(set(numeros)), 8)
+        # Blocs de 2 : trois réservations pour 3 + 5 numéros au plus, sans numéro jeté
+        self.assertLessEqual(CompteurDossier.objects.get(cle='test').dernier_numero, 10)
+
+class ChargementDossierPatientTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        auteur = Utilisateur.objects.create_user('medecin_test', password='secret', role='medecin')
+        cls.patient = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F')
+        dossier = DossierMedical.objects.create(patient=cls.patient, allergies='Pénicilline')
+        for numero in range(3):
+            AntecedentMedical.objects.create(dossier=dossier, type_antecedent='medical',
+                                             description=f"Antécédent {numero}")
+            DocumentMedical.objects.create(dossier=dossier, titre=f"Document {numero}", type_document='autre',
+                                           fichier=f'documents_patients/test_{numero}.pdf', auteur=auteur)
+        cls.dossier = dossier
+
+    def setUp(self):
+        cache.clear()
+
+    def test_chargement_complet_en_trois_requetes(self):
+        with self.assertNumQueries(3):
+            lignes = afficher_dossier(charger_dossier_patient(self.patient.pk, utiliser_cache=False))
+        self.assertEqual(len(lignes), 7)
+
+    def test_cache_chaud_une_seule_requete(self):
+        with self.assertNumQueries(4):
+            afficher_dossier(charger_dossier_patient(self.patient.pk))
+        with self.assertNumQueries(1):
+            lignes = afficher_dossier(charger_dossier_patient(self.patient.pk))
+        self.assertEqual(len(lignes), 7)
+
+    def test_modification_rend_le_cache_obsolete(self):
+        charger_dossier_patient(self.patient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            AntecedentMedical.objects.create(dossier=self.dossier, type_antecedent='familial', description="Asthme")
+        patient = charger_dossier_patient(self.patient.pk)
+        self.assertEqual(len(patient.dossier_medical.antecedents.all()), 4)
+
+    def test_enregistrement_complet_du_patient_rend_le_cache_obsolete(self):
+        charger_dossier_patient(self.patient.pk)
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.telephone = '+243810000000'
+        with self.captureOnCommitCallbacks(execute=True) as rappels:
+            patient.save()
+        # La version est renouvelée par pre_save : aucune invalidation différée en plus
+        self.assertEqual(len(rappels), 0)
+        self.assertEqual(charger_dossier_patient(self.patient.pk).telephone, '+243810000000')
+
+    def test_patient_inconnu(self):
+        with self.assertRaises(Patient.DoesNotExist):
+            charger_dossier_patient(0)
+
+class TeleversementTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        patient = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F')
+        self.televersement = TeleversementDocument.objects.create(
+            dossier=DossierMedical.objects.create(patient=patient), titre="Radiographie",
+            type_document='autre', nom_fichier='radio.pdf', taille_totale=4, taille_partie=4,
+            somme_controle='0' * 64, statut='en_traitement')
+
+    def test_assemblage_en_erreur_supprime_le_fichier_assemble(self):
+        ecrire_partie(self.televersement, 0, io.BytesIO(b'test'), 4)
+        # La connexion du test est dans une transaction : elle ne doit pas être fermée
+        with mock.patch('applications.patients.televersement.close_old_connections'):
+            assembler_televersement(self.televersement.pk)
+        self.televersement.refresh_from_db()
+        self.assertEqual(self.televersement.statut, 'erreur')
+        self.assertFalse(os.path.exists(os.path.join(repertoire_televersement(self.televersement), 'assemble.tmp')))
+
+    def test_assemblage_bloque_passe_en_erreur(self):
+        TeleversementDocument.objects.filter(pk=self.televersement.pk).update(
+            date_mise_a_jour=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(nettoyer_televersements(), 0)
+        self.televersement.refresh_from_db()
+        self.assertEqual(self.televersement.statut, 'erreur')
+
+    def test_assemblage_recent_conserve(self):
+        nettoyer_televersements()
+        self.televersement.refresh_from_db()
+        self.assertEqual(self.televersement.statut, 'en_traitement')
+
+class DoublonsTests(TestCase):
+    def test_code_phonetique(self):
+        self.assertEqual(code_phonetique('Tshibangu'), 'sbng')
+        self.assertEqual(code_phonetique('Chibango'), 'sbng')
+        self.assertEqual(code_phonetique('Kabongô-Mbuyi'), code_phonetique('Cabongo'))
+        self.assertEqual(code_phonetique('  '), '')
+
+    def test_cles_blocage_nom_prenom_inverses(self):
+        naissance = datetime.date(1980, 5, 1)
+        cles = cles_blocage('Kabongo', 'Marie', naissance, '812345678')
+        self.assertIn('t:812345678', cles)
+        self.assertIn(f"na:{code_phonetique('Kabongo')}|1980", cles)
+        inversees = cles_blocage('Marie', 'Kabongo', None, '')
+        self.assertEqual([cle for cle in inversees if cle.startswith('np:')],
+                         [cle for cle in cles if cle.startswith('np:')])
+
+    def test_score_paire(self):
+        fiche = ('kabongo', 'marie', '1980-05-01', '812345678', 'F')
+        score, raisons = score_paire(fiche, fiche)
+        self.assertGreaterEqual(score, 0.8)
+        self.assertIn("même date de naissance", raisons)
+        # Nom et prénom inversés : même score
+        self.assertEqual(score_paire(fiche, ('marie', 'kabongo', '1980-05-01', '812345678', 'F'))[0], score)
+        autre, _ = score_paire(fiche, ('mbuyi', 'jean', '1992-11-20', '', 'M'))
+        self.assertLess(autre, 0.5)
+
+    def test_fusion_deplace_antecedents_et_documents(self):
+        conserve = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F')
+        doublon = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F')
+        dossier_conserve = DossierMedical.objects.create(patient=conserve)
+        dossier_doublon = DossierMedical.objects.create(patient=doublon, allergies='Pénicilline')
+        antecedent = AntecedentMedical.objects.create(dossier=dossier_doublon, type_antecedent='medical',
+                                                      description="Paludisme")
+        document = DocumentMedical.objects.create(dossier=dossier_doublon, titre="Radiographie",
+                                                  type_document='autre', fichier='documents_patients/radio.pdf')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fusionner_patients(conserve.pk, doublon.pk)
+
+        antecedent.refresh_from_db()
+        document.refresh_from_db()
+        self.assertEqual(antecedent.dossier_id, dossier_conserve.pk)
+        self.assertEqual(document.dossier_id, dossier_conserve.pk)
+        self.assertFalse(DossierMedical.objects.filter(pk=dossier_doublon.pk).exists())
+        dossier_conserve.refresh_from_db()
+        self.assertIn('Pénicilline', dossier_conserve.allergies)
+        doublon.refresh_from_db()
+        self.assertFalse(doublon.est_actif)
+
+@override_settings(SYNCHRONISATION={'MARGE_SECONDES': 0})
+class SynchronisationFusionTests(TestCase):
+    def test_fusion_transmise_aux_sites_distants(self):
+        conserve = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F')
+        doublon = Patient.objects.create(nom='Kabongo', prenom='Marie', sexe='F', telephone='+243812345678',
+                                         date_naissance=datetime.date(1980, 5, 1))
+        DossierMedical.objects.create(patient=doublon, allergies='Pénicilline')
+        curseur = lot_synchronisation()['curseur']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fusionner_patients(conserve.pk, doublon.pk)
+        lot = lot_synchronisation(curseur)
+
+        patients = lot['flux']['patients']
+        lignes = {ligne[0]: dict(zip(patients['colonnes'], ligne)) for ligne in patients['lignes']}
+        # Patient conservé avec les champs complétés, doublon transmis désactivé
+        self.assertEqual(lignes[conserve.pk]['telephone'], '+243812345678')
+        self.assertEqual(lignes[conserve.pk]['date_naissance'], datetime.date(1980, 5, 1))
+        self.assertFalse(lignes[doublon.pk]['est_actif'])
+        dossiers = lot['flux']['dossiers']
+        self.assertEqual([dict(zip(dossiers['colonnes'], ligne))['patient_id'] for ligne in dossiers['lignes']],
+                         [conserve.pk])
+
+    def test_rien_de_nouveau(self):
+        Patient.objects.create(nom='Mbuyi', prenom='Jean', sexe='M')
+        lot = lot_synchronisation()
+        self.assertEqual(lot_synchronisation(lot['curseur'])['flux'], {})
 
 # Fichier: applications/patients/urls.py
 from django.urls import path
-from . import views
+from . import api, liste, telechargement, televersement, views
 
 urlpatterns = [
     # Gestion des patients
-    path('', views.liste_patients, name='liste_patients'),
+    path('', liste.liste_patients, name='liste_patients'),
     path('ajouter/', views.ajouter_patient, name='ajouter_patient'),
     path('<int:pk>/', views.detail_patient, name='detail_patient'),
     path('modifier/<int:pk>/', views.modifier_patient, name='modifier_patient'),
     path('desactiver/<int:pk>/', views.desactiver_patient, name='desactiver_patient'),
+    path('recherche/autocompletion/', api.autocompletion_patients, name='autocompletion_patients'),
+    path('recherche/clinique/', api.recherche_clinique, name='recherche_clinique'),
+    path('synchronisation/', api.synchronisation_patients, name='synchronisation_patients'),
     
     # Dossier médical
     path('<int:pk>/dossier/', views.dossier_medical, name='dossier_medical'),
     path('<int:pk>/dossier/modifier/', views.modifier_dossier, name='modifier_dossier'),
+    path('documents/<int:pk>/telecharger/', telechargement.telecharger_document, name='telecharger_document'),
+    
+    # Téléversement des documents par parties
+    path('<int:pk>/dossier/document/televersement/', televersement.demarrer_televersement, name='demarrer_televersement'),
+    path('televersements/<uuid:televersement_id>/', televersement.etat_televersement, name='etat_televersement'),
+    path('televersements/<uuid:televersement_id>/partie/<int:numero>/', televersement.envoyer_partie, name='envoyer_partie'),
+    path('televersements/<uuid:televersement_id>/terminer/', televersement.terminer_televersement, name='terminer_televersement'),
     
     # Antécédents médicaux
     path('<int:pk>/dossier/antecedent/ajouter/', views.ajouter_antecedent, name='ajouter_antecedent'),
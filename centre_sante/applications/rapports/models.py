@@ -0,0 +1,821 @@
+# Fichier: applications/rapports/models.py
+from django.db import models
+from applications.utilisateurs.models import Utilisateur
+
+# Cumuls pré-calculés des statistiques (voir statistiques.py). Les pages de rapports
+# lisent ces tables, de taille bornée par la période affichée, au lieu d'agréger
+# Patient et JournalActivite à chaque affichage.
+
+class StatInscriptionsJour(models.Model):
+    """Nombre de patients enregistrés par jour, sexe, groupe sanguin et tranche d'âge"""
+    jour = models.DateField()
+    sexe = models.CharField(max_length=1)
+    groupe_sanguin = models.CharField(max_length=20)
+    tranche_age = models.CharField(max_length=20)
+    nombre = models.PositiveIntegerField(default=0)
+
+    CLES = ('jour', 'sexe', 'groupe_sanguin', 'tranche_age')
+
+    class Meta:
+        unique_together = ('jour', 'sexe', 'groupe_sanguin', 'tranche_age')
+
+class StatUtilisateursActifsJour(models.Model):
+    """Nombre d'utilisateurs distincts actifs par jour et par rôle"""
+    jour = models.DateField()
+    role = models.CharField(max_length=20)
+    nombre = models.PositiveIntegerField(default=0)
+
+    CLES = ('jour', 'role')
+
+    class Meta:
+        unique_together = ('jour', 'role')
+
+class UtilisateurActifJour(models.Model):
+    """Utilisateurs déjà comptés comme actifs un jour donné (dédoublonnage des cumuls)"""
+    jour = models.DateField()
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('jour', 'utilisateur')
+
+class StatRequetesHeure(models.Model):
+    """Nombre de pages consultées par heure et par vue (ou chemin si la vue est inconnue)"""
+    heure = models.DateTimeField()
+    url = models.CharField(max_length=255)
+    nombre = models.PositiveIntegerField(default=0)
+
+    CLES = ('heure', 'url')
+
+    class Meta:
+        unique_together = ('heure', 'url')
+
+class StatPyramideAges(models.Model):
+    """Patients actifs par sexe et tranche d'âge actuelle, recalculés périodiquement"""
+    sexe = models.CharField(max_length=1)
+    tranche_age = models.CharField(max_length=20)
+    nombre = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('sexe', 'tranche_age')
+
+class FiligraneStatistiques(models.Model):
+    """Dernière ligne d'une table source déjà prise en compte dans les cumuls"""
+    source = models.CharField(max_length=50, unique=True)
+    dernier_id = models.BigIntegerField(default=0)
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} : {self.dernier_id}"
+
+# Fichier: applications/rapports/apps.py
+from django.apps import AppConfig
+
+class RapportsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'applications.rapports'
+
+# Fichier: applications/rapports/statistiques.py
+import datetime
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from applications.patients.models import Patient, TRANCHES_AGE, TRANCHE_INCONNUE
+from applications.utilisateurs.archivage import horizon_archivage
+from applications.utilisateurs.models import Utilisateur, JournalActivite
+
+from .models import (
+    StatInscriptionsJour, StatUtilisateursActifsJour, UtilisateurActifJour, StatRequetesHeure,
+    StatPyramideAges, FiligraneStatistiques,
+)
+
+# Mise à jour incrémentale des cumuls : chaque source (patients, journal) est lue par id
+# croissant à partir de son filigrane, par lots, et chaque lot est ajouté aux cumuls dans
+# la même transaction que l'avancée du filigrane. Les lignes de moins de MARGE_SECONDES
+# attendent le passage suivant, le temps que les transactions en cours soient validées.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLE_LOT': 5000,
+    'MARGE_SECONDES': 120,
+    'INTERVALLE_PYRAMIDE': 3600,  # Secondes entre deux recalculs de la pyramide des âges
+}
+
+def get_configuration():
+    """Retourne la configuration des statistiques fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'STATISTIQUES', {}))
+    return configuration
+
+def tranche_age(date_naissance, jour):
+    """Libellé de la tranche d'âge d'une personne née `date_naissance` au jour donné"""
+    if date_naissance is None:
+        return TRANCHE_INCONNUE
+    age = jour.year - date_naissance.year - ((jour.month, jour.day) < (date_naissance.month, date_naissance.day))
+    libelle = TRANCHES_AGE[0][1]
+    for minimum, nom in TRANCHES_AGE:
+        if age >= minimum:
+            libelle = nom
+    return libelle
+
+@lru_cache(maxsize=4096)
+def nom_vue(chemin):
+    """Nom de la vue servant un chemin, pour regrouper /patients/12/ et /patients/13/"""
+    try:
+        return resolve(chemin).view_name[:255]
+    except Resolver404:
+        return chemin[:255]
+
+def _heure(date_heure):
+    return timezone.localtime(date_heure).replace(minute=0, second=0, microsecond=0)
+
+def _incrementer(modele, compteurs):
+    """Ajoute les compteurs {valeurs de modele.CLES: nombre} aux lignes du cumul"""
+    for cle, nombre in compteurs.items():
+        filtre = dict(zip(modele.CLES, cle))
+        if not modele.objects.filter(**filtre).update(nombre=F('nombre') + nombre):
+            modele.objects.create(nombre=nombre, **filtre)
+
+def cumuler_patients(lignes):
+    compteurs = Counter()
+    for ligne in lignes:
+        jour = timezone.localdate(ligne['date_enregistrement'])
+        compteurs[(jour, ligne['sexe'], ligne['groupe_sanguin'], tranche_age(ligne['date_naissance'], jour))] += 1
+    _incrementer(StatInscriptionsJour, compteurs)
+
+def cumuler_journal(lignes):
+    requetes = Counter()
+    actifs = set()
+    for ligne in lignes:
+        if ligne['url_visitee']:
+            requetes[(_heure(ligne['date_heure']), nom_vue(ligne['url_visitee']))] += 1
+        if ligne['utilisateur_id']:
+            actifs.add((timezone.localdate(ligne['date_heure']), ligne['utilisateur_id']))
+    _incrementer(StatRequetesHeure, requetes)
+
+    # Seuls les utilisateurs pas encore comptés ce jour-là augmentent le cumul
+    if actifs:
+        jours = {jour for jour, _ in actifs}
+        utilisateurs = {utilisateur_id for _, utilisateur_id in actifs}
+        deja_comptes = set(
+            UtilisateurActifJour.objects.filter(jour__in=jours, utilisateur_id__in=utilisateurs)
+            .values_list('jour', 'utilisateur_id')
+        )
+        nouveaux = actifs - deja_comptes
+        roles = dict(Utilisateur.objects.filter(pk__in=utilisateurs).values_list('pk', 'role'))
+        nouveaux = {(jour, utilisateur_id) for jour, utilisateur_id in nouveaux if utilisateur_id in roles}
+        UtilisateurActifJour.objects.bulk_create(
+            [UtilisateurActifJour(jour=jour, utilisateur_id=utilisateur_id) for jour, utilisateur_id in nouveaux]
+        )
+        _incrementer(StatUtilisateursActifsJour, Counter(
+            (jour, roles[utilisateur_id]) for jour, utilisateur_id in nouveaux
+        ))
+
+# Sources : (nom du filigrane, queryset, champ de date, colonnes lues, fonction de cumul)
+SOURCES = [
+    ('patients', Patient.objects.all(), 'date_enregistrement',
+     ('pk', 'date_enregistrement', 'sexe', 'groupe_sanguin', 'date_naissance'), cumuler_patients),
+    ('journal', JournalActivite.objects.all(), 'date_heure',
+     ('pk', 'date_heure', 'utilisateur_id', 'url_visitee'), cumuler_journal),
+]
+
+def traiter_lot(source, queryset, champ_date, colonnes, cumuler, taille_lot, limite):
+    """Ajoute aux cumuls le lot suivant d'une source ; retourne le nombre de lignes traitées"""
+    with transaction.atomic():
+        # Verrou sur le filigrane : deux mises à jour simultanées ne comptent pas deux fois
+        FiligraneStatistiques.objects.get_or_create(source=source)
+        filigrane = FiligraneStatistiques.objects.select_for_update().get(source=source)
+        lignes = list(
+            queryset.filter(pk__gt=filigrane.dernier_id).order_by('pk').values(*colonnes)[:taille_lot]
+        )
+        # Arrêt à la première ligne trop récente : les ids suivants ne sont pas encore sûrs
+        for index, ligne in enumerate(lignes):
+            if ligne[champ_date] > limite:
+                lignes = lignes[:index]
+                break
+        if not lignes:
+            return 0
+        cumuler(lignes)
+        filigrane.dernier_id = lignes[-1]['pk']
+        filigrane.save(update_fields=['dernier_id', 'date_mise_a_jour'])
+    return len(lignes)
+
+def actualiser_pyramide_ages():
+    """Recalcule la pyramide des âges des patients actifs (histogramme_ages, une requête
+    agrégée) si elle date de plus de INTERVALLE_PYRAMIDE secondes ; retourne True si
+    elle a été recalculée. Les âges changent avec la date : pas de cumul incrémental."""
+    intervalle = datetime.timedelta(seconds=get_configuration()['INTERVALLE_PYRAMIDE'])
+    with transaction.atomic():
+        _, creee = FiligraneStatistiques.objects.get_or_create(source='pyramide')
+        filigrane = FiligraneStatistiques.objects.select_for_update().get(source='pyramide')
+        if not creee and filigrane.date_mise_a_jour > timezone.now() - intervalle:
+            return False
+        lignes = Patient.actifs.histogramme_ages(par='sexe')
+        tranches = [libelle for _, libelle in TRANCHES_AGE] + [TRANCHE_INCONNUE]
+        StatPyramideAges.objects.all().delete()
+        StatPyramideAges.objects.bulk_create([
+            StatPyramideAges(sexe=ligne['sexe'], tranche_age=tranche, nombre=ligne[tranche])
+            for ligne in lignes for tranche in tranches if ligne[tranche]
+        ])
+        filigrane.save(update_fields=['date_mise_a_jour'])
+    return True
+
+def mettre_a_jour_statistiques(taille_lot=None):
+    """Ajoute aux cumuls toutes les lignes nouvelles depuis les filigranes et recalcule
+    la pyramide des âges si besoin ; retourne le nombre de lignes traitées par source"""
+    configuration = get_configuration()
+    taille_lot = taille_lot or configuration['TAILLE_LOT']
+    limite = timezone.now() - datetime.timedelta(seconds=configuration['MARGE_SECONDES'])
+    traitees = {}
+    for source, queryset, champ_date, colonnes, cumuler in SOURCES:
+        traitees[source] = 0
+        while True:
+            nombre = traiter_lot(source, queryset, champ_date, colonnes, cumuler, taille_lot, limite)
+            traitees[source] += nombre
+            if nombre < taille_lot:
+                break
+    actualiser_pyramide_ages()
+    return traitees
+
+def debut_reconstruction_journal():
+    """Début du premier jour dont les cumuls du journal peuvent être recalculés : les jours
+    antérieurs à l'horizon d'archivage ont quitté JournalActivite (archiver_journal)"""
+    jour = timezone.localdate(horizon_archivage()) + datetime.timedelta(days=1)
+    return timezone.make_aware(datetime.datetime.combine(jour, datetime.time.min))
+
+def reinitialiser_statistiques():
+    """Prépare une reconstruction : vide les cumuls des patients et ceux du journal à partir
+    de debut_reconstruction_journal(), puis replace les filigranes en conséquence.
+    Les cumuls plus anciens du journal sont conservés, leurs lignes étant archivées.
+    Retourne le début de la période du journal recalculée."""
+    debut = debut_reconstruction_journal()
+    with transaction.atomic():
+        list(FiligraneStatistiques.objects.select_for_update())
+        StatInscriptionsJour.objects.all().delete()
+        StatUtilisateursActifsJour.objects.filter(jour__gte=debut.date()).delete()
+        UtilisateurActifJour.objects.filter(jour__gte=debut.date()).delete()
+        StatRequetesHeure.objects.filter(heure__gte=debut).delete()
+        # Pyramide recalculée au prochain passage
+        FiligraneStatistiques.objects.filter(source='pyramide').delete()
+
+        # Le journal reprend juste avant la première entrée de la période recalculée
+        journal = JournalActivite.objects.order_by()
+        premier_id = journal.filter(date_heure__gte=debut).aggregate(premier=Min('pk'))['premier']
+        if premier_id is None:
+            dernier_id = journal.aggregate(dernier=Max('pk'))['dernier'] or 0
+        else:
+            dernier_id = premier_id - 1
+        FiligraneStatistiques.objects.update_or_create(source='patients', defaults={'dernier_id': 0})
+        FiligraneStatistiques.objects.update_or_create(source='journal', defaults={'dernier_id': dernier_id})
+    return debut
+
+# Fichier: applications/rapports/urls.py
+from django.urls import path
+from . import impression, views
+
+urlpatterns = [
+    path('', views.liste_rapports, name='liste_rapports'),
+    
+    # Documents PDF rendus en arrière-plan
+    path('pdf/dossier/<int:pk>/', impression.generer_pdf_dossier, name='generer_pdf_dossier'),
+    path('pdf/mensuel/<int:annee>/<int:mois>/', impression.generer_pdf_mensuel, name='generer_pdf_mensuel'),
+    path('pdf/<str:type_document>/<str:empreinte>/etat/', impression.suivre_pdf, name='suivre_pdf'),
+    path('pdf/<str:type_document>/<str:empreinte>/', impression.telecharger_pdf, name='telecharger_pdf'),
+]
+
+# Fichier: applications/rapports/views.py
+import datetime
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Sum
+from django.shortcuts import render
+from django.utils import timezone
+
+from applications.patients.models import Patient, TRANCHES_AGE, TRANCHE_INCONNUE
+from applications.utilisateurs.models import Utilisateur
+
+from .models import (StatInscriptionsJour, StatUtilisateursActifsJour, StatRequetesHeure, StatPyramideAges,
+                     FiligraneStatistiques)
+
+ROLES_ACCES_RAPPORTS = ['admin', 'directeur']
+JOURS_AFFICHES = 30
+
+def peut_consulter_rapports(user):
+    """Vérifie si l'utilisateur a accès aux rapports"""
+    return user.role in ROLES_ACCES_RAPPORTS
+
+def _repartition(queryset, champ, libelles=None):
+    """[(libellé, total)] des inscriptions de la période, par valeur de `champ`"""
+    lignes = queryset.values(champ).annotate(total=Sum('nombre')).order_by('-total')
+    return [((libelles or {}).get(ligne[champ], ligne[champ]), ligne['total']) for ligne in lignes]
+
+@login_required
+@user_passes_test(peut_consulter_rapports)
+def liste_rapports(request):
+    """Statistiques des 30 derniers jours, lues dans les cumuls pré-calculés"""
+    aujourd_hui = timezone.localdate()
+    debut = aujourd_hui - datetime.timedelta(days=JOURS_AFFICHES - 1)
+    inscriptions = StatInscriptionsJour.objects.filter(jour__gte=debut)
+    roles = dict(Utilisateur.ROLES)
+
+    actifs_par_jour = {}
+    for ligne in StatUtilisateursActifsJour.objects.filter(jour__gte=debut).order_by('-jour', 'role'):
+        actifs_par_jour.setdefault(ligne.jour, []).append((roles.get(ligne.role, ligne.role), ligne.nombre))
+
+    # Pyramide des âges des patients actifs, recalculée par mettre_a_jour_statistiques
+    pyramide = {(ligne.sexe, ligne.tranche_age): ligne.nombre for ligne in StatPyramideAges.objects.all()}
+    codes_sexes = sorted({sexe for sexe, _ in pyramide})
+    sexes = dict(Patient.SEXES)
+    tranches = [libelle for _, libelle in TRANCHES_AGE] + [TRANCHE_INCONNUE]
+
+    return render(request, 'rapports/liste_rapports.html', {
+        'debut': debut,
+        'fin': aujourd_hui,
+        'inscriptions_par_jour': inscriptions.values('jour').annotate(total=Sum('nombre')).order_by('-jour'),
+        'inscriptions_par_sexe': _repartition(inscriptions, 'sexe', dict(Patient.SEXES)),
+        'inscriptions_par_groupe': _repartition(inscriptions, 'groupe_sanguin'),
+        'inscriptions_par_tranche': _repartition(inscriptions, 'tranche_age'),
+        'actifs_par_jour': sorted(actifs_par_jour.items(), reverse=True),
+        'pages_consultees': (
+            StatRequetesHeure.objects.filter(heure__gte=timezone.now() - datetime.timedelta(hours=24))
+            .values('url').annotate(total=Sum('nombre')).order_by('-total')[:20]
+        ),
+        'filigranes': FiligraneStatistiques.objects.order_by('source'),
+        'pyramide_sexes': [sexes.get(code, code) for code in codes_sexes],
+        'pyramide_ages': [(tranche, [pyramide.get((code, tranche), 0) for code in codes_sexes])
+                          for tranche in tranches],
+    })
+
+# Fichier: applications/rapports/management/commands/mettre_a_jour_statistiques.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.rapports.statistiques import mettre_a_jour_statistiques
+
+class Command(BaseCommand):
+    help = "Ajoute aux cumuls des rapports les lignes nouvelles depuis le dernier passage (à planifier, ex. chaque minute)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=None, help="Lignes traitées par transaction")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        traitees = mettre_a_jour_statistiques(options['taille_lot'])
+        details = ', '.join(f"{source} : {nombre}" for source, nombre in traitees.items())
+        self.stdout.write(f"Lignes ajoutées aux cumuls ({details}) en {time.perf_counter() - debut:.1f} s")
+
+# Fichier: applications/rapports/management/commands/reconstruire_statistiques.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.rapports.statistiques import mettre_a_jour_statistiques, reinitialiser_statistiques
+
+class Command(BaseCommand):
+    help = ("Recalcule les cumuls des rapports depuis Patient et JournalActivite ; les cumuls du "
+            "journal antérieurs à l'horizon d'archivage sont conservés")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=None, help="Lignes traitées par transaction")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        debut_journal = reinitialiser_statistiques()
+        traitees = mettre_a_jour_statistiques(options['taille_lot'])
+        details = ', '.join(f"{source} : {nombre}" for source, nombre in traitees.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Cumuls reconstruits ({details}, journal depuis le {debut_journal:%d/%m/%Y}) "
+            f"en {time.perf_counter() - debut:.1f} s"
+        ))
+
+# Fichier: applications/rapports/rendu_pdf.py
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Mise en page des PDF avec reportlab. Ce module n'importe pas Django : il est exécuté
+# dans les processus du pool de rendu (voir pdf.py), qui ne reçoivent que des données
+# déjà lues en base (dictionnaires, listes, chaînes).
+STYLES = getSampleStyleSheet()
+STYLE_TABLEAU = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+])
+
+def _paragraphe(texte, style='BodyText'):
+    # Les sauts de ligne saisis dans les champs texte sont conservés
+    return Paragraph(escape(str(texte or '')).replace('\n', '<br/>'), STYLES[style])
+
+def _tableau(entetes, lignes, largeurs=None):
+    donnees = [[_paragraphe(entete) for entete in entetes]]
+    donnees += [[_paragraphe(valeur) for valeur in ligne] for ligne in lignes]
+    tableau = Table(donnees, colWidths=largeurs, repeatRows=1)
+    tableau.setStyle(STYLE_TABLEAU)
+    return tableau
+
+def _section(titre, elements):
+    return [Spacer(1, 0.4 * cm), _paragraphe(titre, 'Heading2')] + elements
+
+def _dossier_patient(contenu):
+    patient, dossier = contenu['patient'], contenu['dossier']
+    elements = [_paragraphe(f"Dossier médical — {patient['prenom']} {patient['nom']}", 'Title')]
+    elements.append(_tableau(['Champ', 'Valeur'], patient['champs'], [5 * cm, 12 * cm]))
+    if dossier:
+        elements += _section("Dossier médical", [_tableau(['Rubrique', 'Contenu'], dossier, [5 * cm, 12 * cm])])
+    elements += _section("Antécédents", [
+        _tableau(['Type', 'Description', 'Début', 'Fin', 'Traitement'], contenu['antecedents'],
+                 [2.5 * cm, 6 * cm, 2 * cm, 2 * cm, 4.5 * cm])
+        if contenu['antecedents'] else _paragraphe("Aucun antécédent enregistré.")
+    ])
+    elements += _section("Documents", [
+        _tableau(['Titre', 'Type', 'Ajouté le', 'Auteur'], contenu['documents'],
+                 [6 * cm, 4 * cm, 3 * cm, 4 * cm])
+        if contenu['documents'] else _paragraphe("Aucun document.")
+    ])
+    return elements
+
+def _rapport_mensuel(contenu):
+    elements = [_paragraphe(f"Rapport mensuel — {contenu['periode']}", 'Title')]
+    for titre, entetes, lignes in contenu['tableaux']:
+        elements += _section(titre, [
+            _tableau(entetes, lignes) if lignes else _paragraphe("Aucune donnée.")
+        ])
+    return elements
+
+MISES_EN_PAGE = {
+    'dossier': _dossier_patient,
+    'mensuel': _rapport_mensuel,
+}
+
+def rendre_pdf(type_document, contenu, chemin):
+    """Écrit le PDF dans `chemin` (remplacement atomique) ; retourne le nombre de pages"""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(suffix='.pdf', dir=os.path.dirname(chemin))
+    os.close(descripteur)
+    try:
+        document = SimpleDocTemplate(temporaire, pagesize=A4, title=contenu.get('titre', ''),
+                                     leftMargin=2 * cm, rightMargin=2 * cm)
+        document.build(MISES_EN_PAGE[type_document](contenu))
+        # Un lecteur ne voit jamais de fichier partiellement écrit
+        os.replace(temporaire, chemin)
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+    return document.page
+
+# Fichier: applications/rapports/pdf.py
+import calendar
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+
+from applications.patients.chargement import requete_dossier_patient
+from applications.utilisateurs.models import Utilisateur
+
+from .models import StatInscriptionsJour, StatUtilisateursActifsJour, StatRequetesHeure
+from .rendu_pdf import rendre_pdf
+
+logger = logging.getLogger(__name__)
+
+# Génération des PDF (dossier patient, rapport mensuel) hors de la requête. Les données
+# sont lues en base dans le processus web, puis la mise en page reportlab est confiée à
+# un pool de processus. Le fichier est rangé sous MEDIA_ROOT/<REPERTOIRE>/<type>/ et
+# nommé d'après l'empreinte SHA-256 des données : tant qu'elles ne changent pas, le PDF
+# existant est resservi sans nouveau rendu. L'état d'un rendu est un fichier témoin posé
+# à côté du PDF (<empreinte>.en_cours, <empreinte>.erreur) : il est vu de tous les
+# processus web, et sa création exclusive garantit qu'un seul d'entre eux lance le rendu.
+CONFIGURATION_PAR_DEFAUT = {
+    'REPERTOIRE': 'pdf',
+    'TRAVAILLEURS': 2,
+    'VERSION_GABARIT': 1,       # À incrémenter quand la mise en page change
+    'DUREE_ETAT': 3600,         # Secondes au-delà desquelles un témoin est ignoré (rendu interrompu)
+}
+
+EMPREINTE = re.compile(r'^[0-9a-f]{64}$')
+
+def get_configuration():
+    """Retourne la configuration des PDF fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'PDF', {}))
+    return configuration
+
+_pool = None
+_pool_pid = None
+_verrou_pool = threading.Lock()
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _verrou_pool:
+        # Un processus issu d'un fork ne doit pas réutiliser le pool de son parent
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn : les processus de rendu ne partagent ni threads ni connexions du web
+            _pool = ProcessPoolExecutor(max_workers=get_configuration()['TRAVAILLEURS'],
+                                        mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+def _date(valeur):
+    return valeur.strftime('%d/%m/%Y') if valeur else ''
+
+def contenu_dossier_patient(pk):
+    """Données du dossier d'un patient, prêtes pour le rendu (lève Patient.DoesNotExist)"""
+    patient = requete_dossier_patient().get(pk=pk)
+    dossier = getattr(patient, 'dossier_medical', None)
+    contenu = {
+        'titre': f"Dossier médical {patient.numero_dossier}",
+        'patient': {
+            'nom': patient.nom,
+            'prenom': patient.prenom,
+            'champs': [
+                ["Numéro de dossier", patient.numero_dossier],
+                ["Date de naissance", _date(patient.date_naissance)],
+                ["Sexe", patient.get_sexe_display()],
+                ["Groupe sanguin", patient.groupe_sanguin],
+                ["Adresse", patient.adresse],
+                ["Téléphone", patient.telephone],
+                ["Email", patient.email],
+                ["Profession", patient.profession],
+                ["Personne à contacter", f"{patient.personne_contact or ''} {patient.telephone_contact or ''}".strip()],
+                ["Actif", "Oui" if patient.est_actif else "Non"],
+            ],
+        },
+        'dossier': [],
+        'antecedents': [],
+        'documents': [],
+    }
+    if dossier is not None:
+        contenu['dossier'] = [
+            ["Antécédents médicaux", dossier.antecedents_medicaux],
+            ["Allergies", dossier.allergies],
+            ["Maladies chroniques", dossier.maladies_chroniques],
+            ["Traitements en cours", dossier.traitements_en_cours],
+            ["Notes importantes", dossier.notes_importantes],
+        ]
+        contenu['antecedents'] = [
+            [antecedent.get_type_antecedent_display(), antecedent.description,
+             _date(antecedent.date_debut), _date(antecedent.date_fin), antecedent.traitement]
+            for antecedent in dossier.antecedents.all()
+        ]
+        contenu['documents'] = [
+            [document.titre, document.get_type_document_display(), _date(document.date_ajout),
+             document.auteur.get_full_name() if document.auteur else '']
+            for document in dossier.documents.all()
+        ]
+    return contenu
+
+def contenu_rapport_mensuel(annee, mois):
+    """Données du rapport d'un mois, lues dans les cumuls des statistiques"""
+    debut = datetime.date(annee, mois, 1)
+    fin = datetime.date(annee, mois, calendar.monthrange(annee, mois)[1])
+    inscriptions = StatInscriptionsJour.objects.filter(jour__range=(debut, fin))
+    roles = dict(Utilisateur.ROLES)
+
+    def repartition(champ):
+        return [[ligne[champ], ligne['total']]
+                for ligne in inscriptions.values(champ).annotate(total=Sum('nombre')).order_by(champ)]
+
+    return {
+        'titre': f"Rapport mensuel {mois:02d}/{annee}",
+        'periode': f"{mois:02d}/{annee}",
+        'tableaux': [
+            ("Inscriptions par jour", ["Jour", "Inscriptions"],
+             [[_date(ligne['jour']), ligne['total']]
+              for ligne in inscriptions.values('jour').annotate(total=Sum('nombre')).order_by('jour')]),
+            ("Inscriptions par sexe", ["Sexe", "Inscriptions"], repartition('sexe')),
+            ("Inscriptions par tranche d'âge", ["Tranche", "Inscriptions"], repartition('tranche_age')),
+            ("Inscriptions par groupe sanguin", ["Groupe", "Inscriptions"], repartition('groupe_sanguin')),
+            ("Utilisateurs actifs par jour et par rôle", ["Jour", "Rôle", "Utilisateurs"],
+             [[_date(ligne.jour), roles.get(ligne.role, ligne.role), ligne.nombre]
+              for ligne in StatUtilisateursActifsJour.objects.filter(jour__range=(debut, fin)).order_by('jour', 'role')]),
+            ("Pages les plus consultées", ["Vue", "Consultations"],
+             [[ligne['url'], ligne['total']]
+              for ligne in StatRequetesHeure.objects.filter(heure__date__range=(debut, fin))
+              .values('url').annotate(total=Sum('nombre')).order_by('-total')[:30]]),
+        ],
+    }
+
+def empreinte_contenu(type_document, contenu):
+    """SHA-256 du type, de la version de mise en page et des données"""
+    brut = json.dumps([type_document, get_configuration()['VERSION_GABARIT'], contenu],
+                      cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(brut.encode()).hexdigest()
+
+def chemin_pdf(type_document, empreinte):
+    return os.path.join(settings.MEDIA_ROOT, get_configuration()['REPERTOIRE'], type_document, f'{empreinte}.pdf')
+
+def _chemin_temoin(type_document, empreinte, etat):
+    return os.path.join(os.path.dirname(chemin_pdf(type_document, empreinte)), f'{empreinte}.{etat}')
+
+def _temoin_present(chemin):
+    """Vrai si le témoin existe et n'est pas périmé (un témoin périmé est supprimé)"""
+    try:
+        age = time.time() - os.path.getmtime(chemin)
+    except FileNotFoundError:
+        return False
+    if age <= get_configuration()['DUREE_ETAT']:
+        return True
+    _supprimer(chemin)
+    return False
+
+def _supprimer(chemin):
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
+
+def etat_pdf(type_document, empreinte):
+    """'pret', 'en_cours', 'erreur' ou 'inconnu'"""
+    if os.path.exists(chemin_pdf(type_document, empreinte)):
+        return 'pret'
+    for etat in ('en_cours', 'erreur'):
+        if _temoin_present(_chemin_temoin(type_document, empreinte, etat)):
+            return etat
+    return 'inconnu'
+
+def _rendu_termine(type_document, empreinte, future):
+    try:
+        pages = future.result()
+    except Exception as exc:
+        logger.exception("Échec du rendu PDF %s", empreinte)
+        with open(_chemin_temoin(type_document, empreinte, 'erreur'), 'w', encoding='utf-8') as temoin:
+            temoin.write(str(exc))
+    else:
+        logger.info("PDF %s rendu (%s pages)", empreinte, pages)
+    finally:
+        _supprimer(_chemin_temoin(type_document, empreinte, 'en_cours'))
+
+def demander_pdf(type_document, contenu):
+    """Lance le rendu si ce contenu n'a pas déjà de PDF ; retourne (empreinte, état)"""
+    empreinte = empreinte_contenu(type_document, contenu)
+    etat = etat_pdf(type_document, empreinte)
+    if etat in ('pret', 'en_cours'):
+        return empreinte, etat
+    if etat == 'erreur':
+        _supprimer(_chemin_temoin(type_document, empreinte, 'erreur'))  # Nouvelle tentative
+
+    temoin = _chemin_temoin(type_document, empreinte, 'en_cours')
+    os.makedirs(os.path.dirname(temoin), exist_ok=True)
+    try:
+        # O_EXCL : un seul processus web lance le rendu d'un même contenu
+        os.close(os.open(temoin, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return empreinte, 'en_cours'
+    future = _get_pool().submit(rendre_pdf, type_document, contenu, chemin_pdf(type_document, empreinte))
+    future.add_done_callback(lambda future: _rendu_termine(type_document, empreinte, future))
+    return empreinte, 'en_cours'
+
+# Fichier: applications/rapports/impression.py
+import os
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from applications.patients.models import Patient
+from applications.patients.telechargement import peut_consulter_documents
+
+from .pdf import EMPREINTE, chemin_pdf, contenu_dossier_patient, contenu_rapport_mensuel, demander_pdf, etat_pdf
+from .views import peut_consulter_rapports
+
+# Droits d'accès par type de PDF
+PERMISSIONS_PDF = {
+    'dossier': peut_consulter_documents,
+    'mensuel': peut_consulter_rapports,
+}
+
+def _reponse_etat(type_document, empreinte, etat):
+    statut = {'pret': 200, 'en_cours': 202, 'erreur': 500}.get(etat, 404)
+    return JsonResponse({
+        'empreinte': empreinte,
+        'etat': etat,
+        'url_etat': reverse('suivre_pdf', args=[type_document, empreinte]),
+        'url_telechargement': reverse('telecharger_pdf', args=[type_document, empreinte]) if etat == 'pret' else None,
+    }, status=statut)
+
+@login_required
+@user_passes_test(peut_consulter_documents)
+@require_POST
+def generer_pdf_dossier(request, pk):
+    """Demande le PDF du dossier d'un patient (JSON : état et URL de suivi)"""
+    try:
+        contenu = contenu_dossier_patient(pk)
+    except Patient.DoesNotExist:
+        raise Http404("Patient introuvable")
+    empreinte, etat = demander_pdf('dossier', contenu)
+    return _reponse_etat('dossier', empreinte, etat)
+
+@login_required
+@user_passes_test(peut_consulter_rapports)
+@require_POST
+def generer_pdf_mensuel(request, annee, mois):
+    """Demande le PDF du rapport d'un mois (JSON : état et URL de suivi)"""
+    if not 1 <= mois <= 12:
+        raise Http404("Mois invalide")
+    empreinte, etat = demander_pdf('mensuel', contenu_rapport_mensuel(annee, mois))
+    return _reponse_etat('mensuel', empreinte, etat)
+
+def _verifier_acces(request, type_document, empreinte):
+    permission = PERMISSIONS_PDF.get(type_document)
+    if permission is None or not EMPREINTE.match(empreinte):
+        raise Http404("PDF inconnu")
+    if not permission(request.user):
+        raise Http404("PDF inconnu")
+
+@login_required
+def suivre_pdf(request, type_document, empreinte):
+    """État d'un rendu PDF, à interroger jusqu'à 'pret' (JSON)"""
+    _verifier_acces(request, type_document, empreinte)
+    return _reponse_etat(type_document, empreinte, etat_pdf(type_document, empreinte))
+
+@login_required
+def telecharger_pdf(request, type_document, empreinte):
+    """Envoie un PDF rendu, en flux"""
+    _verifier_acces(request, type_document, empreinte)
+    chemin = chemin_pdf(type_document, empreinte)
+    if not os.path.exists(chemin):
+        raise Http404("PDF pas encore disponible")
+    response = FileResponse(open(chemin, 'rb'), content_type='application/pdf',
+                            filename=f'{type_document}_{empreinte[:12]}.pdf')
+    # Le contenu d'une empreinte ne change jamais, mais il reste médical
+    response['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response
+
+# Fichier: applications/rapports/management/commands/bench_pdf.py
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from applications.rapports.rendu_pdf import rendre_pdf
+
+def contenu_synthetique(numero, antecedents):
+    """Dossier fictif d'une taille comparable à un vrai dossier chargé"""
+    return {
+        'titre': f"Dossier {numero}",
+        'patient': {
+            'nom': f"Patient{numero}",
+            'prenom': "Test",
+            'champs': [[f"Champ {i}", f"Valeur {numero}-{i}"] for i in range(10)],
+        },
+        'dossier': [[f"Rubrique {i}", "Texte du dossier médical. " * 20] for i in range(5)],
+        'antecedents': [["Médical", "Description de l'antécédent. " * 5, "01/01/2020", "", "Traitement"]
+                        for _ in range(antecedents)],
+        'documents': [[f"Document {i}", "Ordonnance", "01/01/2024", "Dr Test"] for i in range(10)],
+    }
+
+class Command(BaseCommand):
+    help = "Mesure le débit de rendu des PDF (pages par seconde) selon le nombre de processus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=50, help="Dossiers rendus par mesure")
+        parser.add_argument('--antecedents', type=int, default=40, help="Antécédents par dossier")
+        parser.add_argument('--travailleurs', type=int, nargs='+', default=[1, 2, 4],
+                            help="Tailles de pool comparées")
+
+    def handle(self, *args, **options):
+        contenus = [contenu_synthetique(numero, options['antecedents']) for numero in range(options['documents'])]
+        with tempfile.TemporaryDirectory() as repertoire:
+            for travailleurs in options['travailleurs']:
+                with ProcessPoolExecutor(max_workers=travailleurs,
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    # Démarrage des processus hors mesure
+                    list(pool.map(rendre_pdf, ['dossier'], contenus[:1], [os.path.join(repertoire, 'chauffe.pdf')]))
+                    debut = time.perf_counter()
+                    pages = sum(pool.map(
+                        rendre_pdf,
+                        ['dossier'] * len(contenus),
+                        contenus,
+                        [os.path.join(repertoire, f'{travailleurs}_{numero}.pdf') for numero in range(len(contenus))],
+                    ))
+                    duree = time.perf_counter() - debut
+                self.stdout.write(f"{travailleurs} processus : {len(contenus)} PDF, {pages} pages en {duree:.2f} s, "
+                                  f"{pages / duree:.1f} pages/s")
@@ -22,6 +22,8 @@ class Utilisateur(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLES)
     est_actif = models.BooleanField(default=True)
     date_derniere_connexion = models.DateTimeField(null=True, blank=True)
+    # Écrite par lots par le suivi de présence (presence.py), jamais par save()
+    date_derniere_activite = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
     photo = models.ImageField(upload_to='photos_utilisateurs/', null=True, blank=True)
     
     def __str__(self):
@@ -34,18 +36,796 @@ class JournalActivite(models.Model):
     action = models.CharField(max_length=255)
     details = models.TextField(blank=True, null=True)
     adresse_ip = models.GenericIPAddressField(null=True, blank=True)
-    date_heure = models.DateTimeField(auto_now_add=True)
+    # Horodatage fixé à la création de l'objet (et non à l'insertion) pour les écritures différées
+    date_heure = models.DateTimeField(default=timezone.now, editable=False)
     url_visitee = models.CharField(max_length=255, blank=True, null=True)
     
     class Meta:
         ordering = ['-date_heure']
+        # InnoDB ajoute la clé primaire à chaque index secondaire : (date_heure) sert aussi (date_heure, id)
+        indexes = [
+            models.Index(fields=['date_heure']),
+            models.Index(fields=['utilisateur', 'date_heure']),
+        ]
         
     def __str__(self):
         return f"{self.nom_utilisateur} - {self.action} - {self.date_heure}"
 
-# Fichier: applications/utilisateurs/middleware.py
+# Fichier: applications/utilisateurs/apps.py
+from django.apps import AppConfig
+
+class UtilisateursConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'applications.utilisateurs'
+
+    def ready(self):
+        # Enregistre les récepteurs de signaux (miniatures, ...)
+        from . import signals  # noqa: F401
+        from .rendu import precompiler_templates
+        precompiler_templates()
+        # Vérification des bibliothèques tierces de base.html (vendoriser_statiques)
+        from centre_sante import statiques  # noqa: F401
+
+# Fichier: applications/utilisateurs/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentification import oublier_utilisateur
+from .miniatures import planifier_miniatures
+from .models import Utilisateur
+
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def oublier_utilisateur_modifie(sender, instance, **kwargs):
+    """Retire du cache d'authentification un compte modifié, désactivé ou supprimé"""
+    oublier_utilisateur(instance.pk)
+
+@receiver(post_save, sender=Utilisateur)
+def generer_miniatures_utilisateur(sender, instance, raw=False, **kwargs):
+    """Prépare les miniatures de la photo de l'utilisateur en arrière-plan"""
+    if not raw and instance.photo:
+        planifier_miniatures(instance.photo.name)
+
+# Fichier: applications/utilisateurs/miniatures.py
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Miniatures des photos (patients, utilisateurs) : carrés de taille fixe en WebP et JPEG,
+# rangés sous miniatures/<chemin de la photo>_<taille>.<format>. Elles sont générées
+# dans un pool de threads après l'enregistrement de la photo ; tant qu'elles n'existent
+# pas, la balise {% miniature %} renvoie la photo d'origine.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLES': {'mini': 64, 'moyenne': 256},
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITE': 80,
+    'TRAVAILLEURS': 2,
+    'REPERTOIRE': 'miniatures',
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+def get_configuration():
+    """Retourne la configuration des miniatures fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'MINIATURES', {}))
+    return configuration
+
+def nom_miniature(nom_photo, taille, format_image='webp'):
+    """Nom (dans le stockage) de la miniature d'une photo"""
+    racine, _ = os.path.splitext(nom_photo)
+    return f"{get_configuration()['REPERTOIRE']}/{racine}_{taille}.{EXTENSIONS[format_image]}"
+
+def generer_miniatures(nom_photo, forcer=False):
+    """Génère toutes les miniatures d'une photo ; retourne le nombre de fichiers écrits"""
+    configuration = get_configuration()
+    if not default_storage.exists(nom_photo):
+        return 0
+    date_photo = default_storage.get_modified_time(nom_photo)
+
+    a_generer = []
+    for taille in configuration['TAILLES'].values():
+        for format_image in configuration['FORMATS']:
+            nom = nom_miniature(nom_photo, taille, format_image)
+            if forcer or not default_storage.exists(nom) or default_storage.get_modified_time(nom) < date_photo:
+                a_generer.append((nom, taille, format_image))
+    if not a_generer:
+        return 0
+
+    with default_storage.open(nom_photo, 'rb') as fichier:
+        image = Image.open(fichier)
+        # Décodage JPEG réduit : inutile de décompresser une photo de 12 Mpx pour 256 px
+        image.draft('RGB', (max(taille for _, taille, _ in a_generer) * 2,) * 2)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for nom, taille, format_image in a_generer:
+        miniature = ImageOps.fit(image, (taille, taille), Image.LANCZOS)
+        tampon = io.BytesIO()
+        miniature.save(tampon, format=format_image.upper(), quality=configuration['QUALITE'], optimize=True)
+        if default_storage.exists(nom):
+            default_storage.delete(nom)
+        default_storage.save(nom, ContentFile(tampon.getvalue()))
+    return len(a_generer)
+
+_executeur = None
+_en_cours = set()
+_verrou = threading.Lock()
+
+def get_executeur():
+    """Pool de threads de génération des miniatures, créé à la première utilisation"""
+    global _executeur
+    if _executeur is None:
+        _executeur = ThreadPoolExecutor(
+            max_workers=get_configuration()['TRAVAILLEURS'], thread_name_prefix='miniatures'
+        )
+    return _executeur
+
+def _generer_en_arriere_plan(nom_photo):
+    try:
+        generer_miniatures(nom_photo)
+    except Exception:
+        logger.exception("Échec de la génération des miniatures de %s", nom_photo)
+    finally:
+        with _verrou:
+            _en_cours.discard(nom_photo)
+
+def planifier_miniatures(nom_photo):
+    """Planifie la génération des miniatures après validation de la transaction en cours"""
+    def soumettre():
+        with _verrou:
+            if nom_photo in _en_cours:
+                return
+            _en_cours.add(nom_photo)
+        get_executeur().submit(_generer_en_arriere_plan, nom_photo)
+    transaction.on_commit(soumettre)
+
+def url_miniature(fichier, taille='mini', format_image='webp'):
+    """URL de la miniature d'un FieldFile, ou de la photo d'origine si elle n'existe pas encore"""
+    if not fichier:
+        return ''
+    configuration = get_configuration()
+    nom = nom_miniature(fichier.name, configuration['TAILLES'][taille], format_image)
+    if default_storage.exists(nom):
+        return default_storage.url(nom)
+    # Repli : photo d'origine, et génération différée pour les affichages suivants
+    planifier_miniatures(fichier.name)
+    return fichier.url
+
+# Fichier: applications/utilisateurs/rendu.py
+import logging
+
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+
+from .models import Utilisateur
+
+logger = logging.getLogger(__name__)
+
+# Templates compilés au démarrage de chaque processus : avec le chargeur en cache
+# (django.template.loaders.cached), la première requête ne paie plus la compilation.
+TEMPLATES_COMMUNS = ['base.html', 'utilisateurs/login.html']
+
+def template_tableau_bord(role):
+    """Nom du template du tableau de bord d'un rôle"""
+    return f'tableaux_bord/{role}_tableau_bord.html'
+
+def precompiler_templates():
+    """Compile les templates communs et le tableau de bord de chaque rôle ; retourne leur nombre"""
+    noms = TEMPLATES_COMMUNS + [template_tableau_bord(role) for role, _ in Utilisateur.ROLES]
+    compiles = 0
+    for nom in noms:
+        try:
+            get_template(nom)
+            compiles += 1
+        except TemplateDoesNotExist:
+            logger.warning("Template introuvable lors de la précompilation : %s", nom)
+    return compiles
+
+# Fichier: applications/utilisateurs/authentification.py
+import copy
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+# Cache par processus des utilisateurs authentifiés : AuthenticationMiddleware ne charge
+# plus l'Utilisateur complet à chaque requête. Une entrée n'est servie que si la version du
+# compte n'a pas changé depuis son chargement ; signals.py la renouvelle à chaque
+# modification, quel que soit le processus. Les versions sont lues dans le cache
+# CACHE_VERSIONS_UTILISATEURS (aucune requête SQL), qui doit être commun à tous les
+# workers : cache fichier sur un seul serveur, Memcached ou Redis sur plusieurs.
+# CACHE_UTILISATEUR_DUREE borne seulement la durée de vie des entrées.
+_utilisateurs = {}
+_verrou = threading.Lock()
+
+def cache_versions():
+    """Cache des versions des comptes (le cache par défaut s'il n'est pas configuré)"""
+    alias = getattr(settings, 'CACHE_VERSIONS_UTILISATEURS', 'default')
+    return caches[alias if alias in settings.CACHES else 'default']
+
+def _cle_version(utilisateur_id):
+    return f'utilisateur:{utilisateur_id}:version'
+
+def _version(utilisateur_id):
+    cache, cle = cache_versions(), _cle_version(utilisateur_id)
+    cache.add(cle, uuid.uuid4().hex, None)
+    return cache.get(cle)
+
+def oublier_utilisateur(utilisateur_id):
+    """Rend obsolète l'utilisateur en cache dans ce processus et dans tous les autres"""
+    with _verrou:
+        _utilisateurs.pop(utilisateur_id, None)
+    cache_versions().set(_cle_version(utilisateur_id), uuid.uuid4().hex, None)
+
+class ModelBackendEnCache(ModelBackend):
+    """ModelBackend dont get_user() est servi depuis un cache mémoire vérifié à chaque requête"""
+
+    def _entree_valide(self, utilisateur_id, version):
+        return version is not None and cache_versions().get(_cle_version(utilisateur_id)) == version
+
+    def get_user(self, user_id):
+        duree = getattr(settings, 'CACHE_UTILISATEUR_DUREE', 30)
+        if not duree:
+            return super().get_user(user_id)
+
+        maintenant = time.monotonic()
+        with _verrou:
+            entree = _utilisateurs.get(user_id)
+        if entree is not None and entree[1] > maintenant and self._entree_valide(user_id, entree[2]):
+            # Copie : chaque requête peut modifier son request.user sans toucher au cache
+            return copy.copy(entree[0])
+
+        # Version lue avant le chargement : une modification concurrente rendra l'entrée obsolète
+        version = _version(user_id)
+        utilisateur = super().get_user(user_id)
+        with _verrou:
+            if utilisateur is None:
+                _utilisateurs.pop(user_id, None)
+            else:
+                _utilisateurs[user_id] = (copy.copy(utilisateur), maintenant + duree, version)
+        return utilisateur
+
+# Fichier: applications/utilisateurs/journal.py
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
 from .models import JournalActivite
 
+logger = logging.getLogger(__name__)
+
+# Valeurs utilisées pour les clés absentes de settings.JOURNAL_ACTIVITE
+CONFIGURATION_PAR_DEFAUT = {
+    'MODE': 'synchrone',                     # 'synchrone' ou 'tampon'
+    'TAILLE_LOT': 200,                       # Nombre d'entrées par bulk_create
+    'INTERVALLE_VIDAGE': 2.0,                # Délai maximal (en secondes) avant écriture
+    'TAILLE_MAX_FILE': 10000,                # Capacité de la file en mémoire
+    'POLITIQUE_DEBORDEMENT': 'abandonner',   # 'abandonner', 'bloquer' ou 'synchrone'
+    'DELAI_BLOCAGE': 0.5,                    # Attente maximale (en secondes) en mode 'bloquer'
+    'RETENTION_JOURS': 90,                   # Âge au-delà duquel les entrées sont archivées
+    'TAILLE_LOT_ARCHIVAGE': 5000,            # Lignes déplacées par transaction d'archivage
+    'REPERTOIRE_ARCHIVES': 'archives/journal_activite',  # Relatif à MEDIA_ROOT
+}
+
+def get_configuration():
+    """Retourne la configuration du journal d'activité fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'JOURNAL_ACTIVITE', {}))
+    return configuration
+
+class JournalTampon:
+    """File bornée d'entrées du journal, écrites par lots depuis un thread d'arrière-plan"""
+    POLITIQUES = ('abandonner', 'bloquer', 'synchrone')
+
+    def __init__(self, taille_lot=200, intervalle_vidage=2.0, taille_max_file=10000,
+                 politique_debordement='abandonner', delai_blocage=0.5):
+        if politique_debordement not in self.POLITIQUES:
+            raise ValueError(f"Politique de débordement inconnue : {politique_debordement}")
+        self.taille_lot = taille_lot
+        self.intervalle_vidage = intervalle_vidage
+        self.taille_max_file = taille_max_file
+        self.politique_debordement = politique_debordement
+        self.delai_blocage = delai_blocage
+        self.entrees_abandonnees = 0
+        self._verrou = threading.Lock()
+        self._verrou_vidage = threading.Lock()
+        self._initialiser()
+
+    def _initialiser(self):
+        """(Ré)initialise l'état propre au processus courant"""
+        self._pid = os.getpid()
+        self._file = queue.Queue(maxsize=self.taille_max_file)
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self):
+        """Démarre le thread d'écriture s'il ne tourne pas déjà dans ce processus"""
+        with self._verrou:
+            # Après un fork (gunicorn, uwsgi), le thread et la file du parent ne sont pas utilisables
+            if self._pid != os.getpid():
+                self._initialiser()
+            if self._thread is None or not self._thread.is_alive():
+                self._arret.clear()
+                self._thread = threading.Thread(
+                    target=self._boucle, name='journal-activite', daemon=True
+                )
+                self._thread.start()
+
+    def ajouter(self, entree):
+        """Place une entrée JournalActivite (non sauvegardée) dans la file"""
+        self.demarrer()
+        try:
+            if self.politique_debordement == 'bloquer':
+                self._file.put(entree, timeout=self.delai_blocage)
+            else:
+                self._file.put_nowait(entree)
+        except queue.Full:
+            if self.politique_debordement == 'synchrone':
+                # Contre-pression : la requête courante paie son insertion
+                entree.save()
+            else:
+                self.entrees_abandonnees += 1
+                if self.entrees_abandonnees == 1 or self.entrees_abandonnees % 1000 == 0:
+                    logger.warning("Journal d'activité saturé : %s entrée(s) abandonnée(s)",
+                                   self.entrees_abandonnees)
+            return
+        if self._file.qsize() >= self.taille_lot:
+            self._reveil.set()
+
+    def vider(self):
+        """Écrit toutes les entrées en attente par lots de taille_lot"""
+        with self._verrou_vidage:
+            while True:
+                lot = []
+                while len(lot) < self.taille_lot:
+                    try:
+                        lot.append(self._file.get_nowait())
+                    except queue.Empty:
+                        break
+                if not lot:
+                    return
+                try:
+                    JournalActivite.objects.bulk_create(lot, batch_size=self.taille_lot)
+                except Exception:
+                    logger.exception("Échec de l'écriture de %s entrée(s) du journal d'activité", len(lot))
+                if len(lot) < self.taille_lot:
+                    return
+
+    def _boucle(self):
+        """Vide la file à chaque intervalle ou dès qu'un lot complet est disponible"""
+        while not self._arret.is_set():
+            self._reveil.wait(self.intervalle_vidage)
+            self._reveil.clear()
+            close_old_connections()
+            self.vider()
+        close_old_connections()
+
+    def arreter(self, delai=5.0):
+        """Arrête le thread d'écriture et écrit les entrées restantes"""
+        if self._pid != os.getpid():
+            return
+        self._arret.set()
+        self._reveil.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(delai)
+        self.vider()
+
+_journal_tampon = None
+_verrou_journal = threading.Lock()
+
+def get_journal_tampon():
+    """Retourne le journal tampon du processus, créé à la première utilisation"""
+    global _journal_tampon
+    if _journal_tampon is None:
+        with _verrou_journal:
+            if _journal_tampon is None:
+                configuration = get_configuration()
+                _journal_tampon = JournalTampon(
+                    taille_lot=configuration['TAILLE_LOT'],
+                    intervalle_vidage=configuration['INTERVALLE_VIDAGE'],
+                    taille_max_file=configuration['TAILLE_MAX_FILE'],
+                    politique_debordement=configuration['POLITIQUE_DEBORDEMENT'],
+                    delai_blocage=configuration['DELAI_BLOCAGE'],
+                )
+                # Écrit les entrées restantes à l'arrêt du processus
+                atexit.register(_journal_tampon.arreter)
+    return _journal_tampon
+
+def enregistrer_activite(**champs):
+    """Enregistre une entrée du journal selon le mode configuré (synchrone ou tampon)"""
+    entree = JournalActivite(**champs)
+    if get_configuration()['MODE'] == 'tampon':
+        get_journal_tampon().ajouter(entree)
+    else:
+        entree.save()
+    return entree
+
+# Fichier: applications/utilisateurs/pagination.py
+import base64
+import binascii
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Pagination par curseur (keyset) sur (champ horodaté, id), du plus récent au plus ancien.
+# Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position dans la table.
+
+def encoder_curseur(valeur, pk):
+    """Encode la position (horodatage, id) du dernier élément d'une page"""
+    brut = f"{valeur.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip('=')
+
+def decoder_curseur(curseur):
+    """Décode un curseur ; retourne (horodatage, id) ou None s'il est absent ou invalide"""
+    if not curseur:
+        return None
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)).decode()
+        valeur, pk = brut.rsplit('|', 1)
+        valeur = parse_datetime(valeur)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if valeur is None:
+        return None
+    return valeur, pk
+
+def paginer_par_curseur(queryset, champ, curseur=None, taille_page=50):
+    """Retourne (éléments de la page, curseur de la page suivante ou None)"""
+    queryset = queryset.order_by(f'-{champ}', '-pk')
+    position = decoder_curseur(curseur)
+    if position:
+        valeur, pk = position
+        queryset = queryset.filter(Q(**{f'{champ}__lt': valeur}) | Q(**{champ: valeur, 'pk__lt': pk}))
+
+    # Un élément de plus pour savoir s'il existe une page suivante, sans COUNT(*)
+    elements = list(queryset[:taille_page + 1])
+    curseur_suivant = None
+    if len(elements) > taille_page:
+        elements = elements[:taille_page]
+        dernier = elements[-1]
+        curseur_suivant = encoder_curseur(getattr(dernier, champ), dernier.pk)
+    return elements, curseur_suivant
+
+def estimer_nombre(queryset, seuil=10000):
+    """Retourne (nombre, estimé) : sur MySQL, l'estimation de l'optimiseur (EXPLAIN) si
+    elle dépasse `seuil`, sinon le COUNT(*) exact"""
+    connexion = connections[queryset.db]
+    if connexion.vendor == 'mysql':
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connexion.cursor() as curseur:
+            curseur.execute(f'EXPLAIN {sql}', params)
+            colonnes = [description[0] for description in curseur.description]
+            plan = curseur.fetchone()
+        # rows : lignes parcourues, filtered : pourcentage conservé par les conditions
+        estimation = int((plan[colonnes.index('rows')] or 0) * (plan[colonnes.index('filtered')] or 100) / 100)
+        if estimation > seuil:
+            return estimation, True
+    return queryset.count(), False
+
+def parcourir_par_lots(queryset, champ, taille_lot=2000):
+    """Itère sur tout le queryset par lots bornés, sans le charger entièrement en mémoire"""
+    curseur = None
+    while True:
+        elements, curseur = paginer_par_curseur(queryset, champ, curseur, taille_lot)
+        yield from elements
+        if curseur is None:
+            return
+
+# Fichier: applications/utilisateurs/archivage.py
+import gzip
+import heapq
+import json
+import logging
+import os
+import time as horloge
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .journal import get_configuration
+from .models import JournalActivite
+
+logger = logging.getLogger(__name__)
+
+# Les lignes plus anciennes que l'horizon quittent la table pour des fichiers JSONL compressés,
+# un par mois : MEDIA_ROOT/<REPERTOIRE_ARCHIVES>/journal_activite_AAAA-MM.jsonl.gz.
+# Chaque lot est écrit puis supprimé dans sa propre transaction courte.
+CHAMPS_ARCHIVES = ['id', 'utilisateur_id', 'nom_utilisateur', 'action', 'details',
+                   'adresse_ip', 'date_heure', 'url_visitee']
+
+def horizon_archivage(maintenant=None):
+    """Date avant laquelle les entrées du journal sont archivées"""
+    maintenant = maintenant or timezone.now()
+    return maintenant - timedelta(days=get_configuration()['RETENTION_JOURS'])
+
+def repertoire_archives():
+    return os.path.join(settings.MEDIA_ROOT, get_configuration()['REPERTOIRE_ARCHIVES'])
+
+def chemin_archive(annee, mois):
+    return os.path.join(repertoire_archives(), f'journal_activite_{annee:04d}-{mois:02d}.jsonl.gz')
+
+def mois_archives():
+    """Liste triée des (année, mois) disponibles en archive"""
+    repertoire = repertoire_archives()
+    if not os.path.isdir(repertoire):
+        return []
+    resultat = []
+    for nom in os.listdir(repertoire):
+        if nom.startswith('journal_activite_') and nom.endswith('.jsonl.gz'):
+            annee, mois = nom[len('journal_activite_'):-len('.jsonl.gz')].split('-')
+            resultat.append((int(annee), int(mois)))
+    return sorted(resultat)
+
+def archiver_lot(horizon, taille_lot):
+    """Archive le lot le plus ancien antérieur à l'horizon ; retourne le nombre de lignes déplacées"""
+    with transaction.atomic():
+        lignes = list(
+            JournalActivite.objects.filter(date_heure__lt=horizon)
+            .order_by('date_heure', 'id')
+            .values(*CHAMPS_ARCHIVES)[:taille_lot]
+        )
+        if not lignes:
+            return 0
+
+        par_mois = {}
+        for ligne in lignes:
+            date_locale = timezone.localtime(ligne['date_heure'])
+            par_mois.setdefault((date_locale.year, date_locale.month), []).append(ligne)
+
+        os.makedirs(repertoire_archives(), exist_ok=True)
+        for (annee, mois), lignes_mois in par_mois.items():
+            # Chaque ajout forme un membre gzip distinct, relu d'un seul tenant par gzip.open
+            with gzip.open(chemin_archive(annee, mois), 'at', encoding='utf-8') as fichier:
+                for ligne in lignes_mois:
+                    fichier.write(json.dumps(ligne, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+                fichier.flush()
+                os.fsync(fichier.fileno())
+
+        # Si la suppression échoue, le lot sera réécrit au prochain passage : les doublons
+        # éventuels sont éliminés à la lecture (clé id)
+        JournalActivite.objects.filter(id__in=[ligne['id'] for ligne in lignes]).delete()
+    return len(lignes)
+
+def archiver_journal(horizon=None, taille_lot=None, duree_max=None, pause=0):
+    """Archive toutes les entrées antérieures à l'horizon par lots bornés.
+
+    Appelable depuis un planificateur : s'arrête proprement après duree_max secondes
+    et reprend au lot suivant lors de l'appel suivant.
+    """
+    horizon = horizon or horizon_archivage()
+    taille_lot = taille_lot or get_configuration()['TAILLE_LOT_ARCHIVAGE']
+    debut = horloge.monotonic()
+    total = 0
+    while True:
+        deplacees = archiver_lot(horizon, taille_lot)
+        total += deplacees
+        if deplacees < taille_lot:
+            break
+        if duree_max is not None and horloge.monotonic() - debut >= duree_max:
+            break
+        if pause:
+            horloge.sleep(pause)
+    logger.info("Archivage du journal d'activité : %s entrée(s) antérieures au %s", total, horizon)
+    return total
+
+def _lire_lignes(annee, mois):
+    """Itère sur les entrées d'un mois archivé, dans l'ordre chronologique d'archivage.
+    Un lot réécrit après un échec de suppression (archiver_lot) n'est rendu qu'une fois."""
+    chemin = chemin_archive(annee, mois)
+    if not os.path.exists(chemin):
+        return
+    ids_lus = set()
+    with gzip.open(chemin, 'rt', encoding='utf-8') as fichier:
+        for ligne in fichier:
+            donnees = json.loads(ligne)
+            if donnees['id'] in ids_lus:
+                continue
+            ids_lus.add(donnees['id'])
+            donnees['date_heure'] = parse_datetime(donnees['date_heure'])
+            yield JournalActivite(**donnees)
+
+def _mois_concernes(debut, fin):
+    """Mois archivés recoupant [debut, fin[, du plus récent au plus ancien"""
+    borne_debut = (timezone.localtime(debut).year, timezone.localtime(debut).month) if debut else None
+    borne_fin = (timezone.localtime(fin).year, timezone.localtime(fin).month) if fin else None
+    return [
+        mois for mois in reversed(mois_archives())
+        if (borne_debut is None or mois >= borne_debut) and (borne_fin is None or mois <= borne_fin)
+    ]
+
+def _correspond(activite, debut, fin, utilisateur_id):
+    if debut and activite.date_heure < debut:
+        return False
+    if fin and activite.date_heure >= fin:
+        return False
+    if utilisateur_id and activite.utilisateur_id != utilisateur_id:
+        return False
+    return True
+
+def lire_archives(debut=None, fin=None, utilisateur_id=None, avant=None, limite=50):
+    """Retourne au plus `limite` entrées archivées, les plus récentes d'abord.
+
+    `avant` est une position (date_heure, id) de pagination par curseur : seules les
+    entrées strictement plus anciennes sont retournées.
+    """
+    if avant:
+        borne = avant[0] + timedelta(microseconds=1)
+        fin = min(fin, borne) if fin else borne
+    resultat = []
+    for annee, mois in _mois_concernes(debut, fin):
+        # Tas borné des entrées les plus récentes du mois : la mémoire reste en O(limite)
+        capacite = limite - len(resultat)
+        tas = []
+        ids_retenus = set()
+        for activite in _lire_lignes(annee, mois):
+            cle = (activite.date_heure, activite.id)
+            if avant and cle >= avant:
+                continue
+            if activite.id in ids_retenus or not _correspond(activite, debut, fin, utilisateur_id):
+                continue
+            if len(tas) < capacite:
+                heapq.heappush(tas, (cle, activite))
+            elif cle > tas[0][0]:
+                _, ecartee = heapq.heapreplace(tas, (cle, activite))
+                ids_retenus.discard(ecartee.id)
+            else:
+                continue
+            ids_retenus.add(activite.id)
+        resultat.extend(activite for _, activite in sorted(tas, key=lambda element: element[0], reverse=True))
+        if len(resultat) >= limite:
+            break
+    return resultat[:limite]
+
+def parcourir_archives(debut=None, fin=None, utilisateur_id=None):
+    """Itère sur toutes les entrées archivées de la période, mois par mois (le plus récent d'abord).
+
+    À l'intérieur d'un mois, l'ordre est celui de l'archivage (chronologique) afin de ne
+    jamais charger un mois entier en mémoire.
+    """
+    for annee, mois in _mois_concernes(debut, fin):
+        for activite in _lire_lignes(annee, mois):
+            if _correspond(activite, debut, fin, utilisateur_id):
+                yield activite
+
+# Fichier: applications/utilisateurs/presence.py
+import atexit
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Utilisateur
+
+logger = logging.getLogger(__name__)
+
+# Suivi de présence : chaque requête authentifiée note l'heure d'activité de l'utilisateur
+# dans un dictionnaire en mémoire (une entrée par utilisateur, la plus récente gagne).
+# Un thread écrit périodiquement toutes les entrées en un seul bulk_update limité à la
+# colonne date_derniere_activite, sans réécrire le reste de la ligne Utilisateur.
+CONFIGURATION_PAR_DEFAUT = {
+    'INTERVALLE_VIDAGE': 30,            # Secondes entre deux écritures
+    'FENETRE_EN_LIGNE_MINUTES': 5,      # Activité récente considérée comme « en ligne »
+}
+
+def get_configuration():
+    """Retourne la configuration du suivi de présence fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'PRESENCE', {}))
+    return configuration
+
+class SuiviPresence:
+    """Dernières activités en attente d'écriture, regroupées par utilisateur"""
+
+    def __init__(self, intervalle_vidage=30):
+        self.intervalle_vidage = intervalle_vidage
+        self._verrou = threading.Lock()
+        self._initialiser()
+
+    def _initialiser(self):
+        self._pid = os.getpid()
+        self._activites = {}
+        self._arret = threading.Event()
+        self._thread = None
+
+    def _demarrer(self):
+        # Appelé sous self._verrou
+        if self._pid != os.getpid():
+            self._initialiser()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._boucle, name='presence', daemon=True)
+            self._thread.start()
+
+    def signaler(self, utilisateur_id, moment=None):
+        """Note l'activité d'un utilisateur (aucun accès à la base)"""
+        with self._verrou:
+            self._demarrer()
+            self._activites[utilisateur_id] = moment or timezone.now()
+
+    def vider(self):
+        """Écrit les activités en attente ; retourne le nombre d'utilisateurs mis à jour"""
+        with self._verrou:
+            activites, self._activites = self._activites, {}
+        if not activites:
+            return 0
+        utilisateurs = [
+            Utilisateur(pk=utilisateur_id, date_derniere_activite=moment)
+            for utilisateur_id, moment in activites.items()
+        ]
+        try:
+            Utilisateur.objects.bulk_update(utilisateurs, ['date_derniere_activite'], batch_size=500)
+        except Exception:
+            logger.exception("Échec de l'écriture de la présence de %s utilisateur(s)", len(utilisateurs))
+            return 0
+        return len(utilisateurs)
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle_vidage):
+            close_old_connections()
+            self.vider()
+        close_old_connections()
+
+    def arreter(self):
+        """Arrête le thread d'écriture et écrit les activités restantes"""
+        if self._pid != os.getpid():
+            return
+        self._arret.set()
+        self.vider()
+
+suivi_presence = SuiviPresence(intervalle_vidage=get_configuration()['INTERVALLE_VIDAGE'])
+atexit.register(suivi_presence.arreter)
+
+def signaler_activite(utilisateur):
+    """Note l'activité de l'utilisateur connecté"""
+    suivi_presence.signaler(utilisateur.pk)
+
+def utilisateurs_en_ligne_par_role(minutes=None):
+    """Nombre d'utilisateurs actifs récemment, par rôle : {'medecin': 3, ...}
+
+    Une seule requête agrégée sur Utilisateur (indexée sur date_derniere_activite),
+    sans parcourir le journal d'activité.
+    """
+    minutes = minutes or get_configuration()['FENETRE_EN_LIGNE_MINUTES']
+    depuis = timezone.now() - timedelta(minutes=minutes)
+    lignes = (
+        Utilisateur.objects.filter(date_derniere_activite__gte=depuis, is_active=True)
+        .values('role').annotate(nombre=Count('id')).order_by('role')
+    )
+    return {ligne['role']: ligne['nombre'] for ligne in lignes}
+
+# Fichier: applications/utilisateurs/middleware.py
+from .journal import enregistrer_activite
+from .presence import signaler_activite
+
 class JournalActiviteMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -55,7 +835,7 @@ class JournalActiviteMiddleware:
         
         # Enregistre l'activité uniquement pour les utilisateurs connectés
         if request.user.is_authenticated:
-            JournalActivite.objects.create(
+            enregistrer_activite(
                 utilisateur=request.user,
                 nom_utilisateur=request.user.username,
                 action=f"Accès à {request.path}",
@@ -73,6 +853,17 @@ class JournalActiviteMiddleware:
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+class PresenceMiddleware:
+    """Note l'activité des utilisateurs connectés pour le suivi de présence"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.user.is_authenticated:
+            signaler_activite(request.user)
+        return response
+
 # Fichier: applications/utilisateurs/forms.py
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
@@ -98,6 +889,44 @@ class CreationUtilisateurForm(UserCreationForm):
         for field_name in self.fields:
             self.fields[field_name].widget.attrs.update({'class': 'form-control'})
 
+# Fichier: applications/utilisateurs/tests.py
+from django.test import TestCase, override_settings
+
+from .authentification import ModelBackendEnCache, _cle_version, _utilisateurs, cache_versions
+from .models import Utilisateur
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'versions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-versions'},
+}, CACHE_UTILISATEUR_DUREE=30)
+class ModelBackendEnCacheTests(TestCase):
+    def setUp(self):
+        _utilisateurs.clear()
+        cache_versions().clear()
+        self.utilisateur = Utilisateur.objects.create_user('infirmier_test', password='secret', role='infirmier')
+        self.backend = ModelBackendEnCache()
+
+    def test_utilisateur_en_cache_sans_requete(self):
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.utilisateur.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.utilisateur.pk).username, 'infirmier_test')
+
+    def test_desactivation_rend_l_entree_obsolete(self):
+        self.backend.get_user(self.utilisateur.pk)
+        self.utilisateur.is_active = False
+        self.utilisateur.save()
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.backend.get_user(self.utilisateur.pk))
+
+    def test_modification_par_un_autre_processus(self):
+        self.backend.get_user(self.utilisateur.pk)
+        # Un autre worker ne touche que le cache des versions partagé
+        Utilisateur.objects.filter(pk=self.utilisateur.pk).update(role='medecin')
+        cache_versions().set(_cle_version(self.utilisateur.pk), 'autre-version', None)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.backend.get_user(self.utilisateur.pk).role, 'medecin')
+
 # Fichier: applications/utilisateurs/urls.py
 from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
@@ -116,17 +945,38 @@ urlpatterns = [
     path('utilisateurs/modifier/<int:pk>/', views.modifier_utilisateur, name='modifier_utilisateur'),
     path('utilisateurs/desactiver/<int:pk>/', views.desactiver_utilisateur, name='desactiver_utilisateur'),
     path('journal-activite/', views.journal_activite, name='journal_activite'),
+    path('journal-activite/export/<str:format_export>/', views.exporter_journal_activite, name='exporter_journal_activite'),
     path('mon-profil/', views.mon_profil, name='mon_profil'),
+    path('connexions-bd/', views.statistiques_connexions, name='statistiques_connexions'),
+    path('performances/', views.statistiques_performances, name='statistiques_performances'),
 ]
 
 # Fichier: applications/utilisateurs/views.py
+import csv
+import itertools
+import json
+import os
+from datetime import datetime, time, timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from .models import Utilisateur, JournalActivite
 from .forms import CreationUtilisateurForm
+from centre_sante.bd.pool import statistiques_pools
+from centre_sante.instrumentation import statistiques_requetes
+from .archivage import horizon_archivage, lire_archives, parcourir_archives
+from .pagination import decoder_curseur, encoder_curseur, paginer_par_curseur, parcourir_par_lots
+from .presence import utilisateurs_en_ligne_par_role
+from .rendu import template_tableau_bord
 from django.utils import timezone
 
+TAILLE_PAGE_JOURNAL = 50
+CHAMPS_EXPORT_JOURNAL = ['id', 'date_heure', 'nom_utilisateur', 'action', 'details', 'adresse_ip', 'url_visitee']
+
 def est_admin(user):
     """Vérifie si l'utilisateur est administrateur"""
     return user.role == 'admin'
@@ -138,19 +988,24 @@ def est_direction(user):
 @login_required
 def tableau_bord(request):
     """Affiche le tableau de bord adapté au rôle de l'utilisateur"""
-    # Mise à jour de la date de dernière connexion
+    # Mise à jour de la date de dernière connexion : seule cette colonne est écrite,
+    # sans écraser une modification concurrente du compte (modifier_utilisateur)
     if not request.session.get('connexion_enregistree'):
         request.user.date_derniere_connexion = timezone.now()
-        request.user.save()
+        Utilisateur.objects.filter(pk=request.user.pk).update(
+            date_derniere_connexion=request.user.date_derniere_connexion
+        )
         request.session['connexion_enregistree'] = True
         
     # Redirection vers le tableau de bord spécifique selon le rôle
-    role = request.user.role
-    template_name = f'tableaux_bord/{role}_tableau_bord.html'
-    
-    return render(request, template_name, {
+    template_name = template_tableau_bord(request.user.role)
+    contexte = {
         'utilisateur': request.user
-    })
+    }
+    if est_direction(request.user):
+        contexte['utilisateurs_en_ligne'] = utilisateurs_en_ligne_par_role()
+    
+    return render(request, template_name, contexte)
 
 @login_required
 @user_passes_test(est_admin)
@@ -237,31 +1092,143 @@ def desactiver_utilisateur(request, pk):
     
     return redirect('liste_utilisateurs')
 
-@login_required
-@user_passes_test(est_admin)
-def journal_activite(request):
-    """Affiche le journal des activités"""
-    activites = JournalActivite.objects.all().order_by('-date_heure')
+def _debut_journee(valeur):
+    """Convertit une date 'AAAA-MM-JJ' en datetime de début de journée, ou None si invalide"""
+    try:
+        jour = parse_date(valeur or '')
+    except ValueError:
+        return None
+    if jour is None:
+        return None
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+def criteres_journal(parametres):
+    """Extrait (début, fin exclue, utilisateur_id) des filtres du journal passés dans request.GET"""
+    utilisateur_id = parametres.get('utilisateur')
+    utilisateur_id = int(utilisateur_id) if utilisateur_id and utilisateur_id.isdigit() else None
+    
+    # Intervalle semi-ouvert [début, fin + 1 jour[ sur la colonne brute, pour que l'index
+    # sur date_heure soit utilisable (contrairement à DATE(date_heure))
+    debut = _debut_journee(parametres.get('date_debut'))
+    fin = _debut_journee(parametres.get('date_fin'))
+    if fin:
+        fin += timedelta(days=1)
+    return debut, fin, utilisateur_id
+
+def filtrer_journal(parametres):
+    """Applique les filtres du journal d'activité (utilisateur, période) à partir de request.GET"""
+    debut, fin, utilisateur_id = criteres_journal(parametres)
+    activites = JournalActivite.objects.all()
     
     # Filtrage par utilisateur si demandé
-    utilisateur_id = request.GET.get('utilisateur')
     if utilisateur_id:
         activites = activites.filter(utilisateur_id=utilisateur_id)
     
     # Filtrage par date si demandé
-    date_debut = request.GET.get('date_debut')
-    date_fin = request.GET.get('date_fin')
+    if debut:
+        activites = activites.filter(date_heure__gte=debut)
+    if fin:
+        activites = activites.filter(date_heure__lt=fin)
+    
+    return activites
+
+def _inclut_archives(debut):
+    """Indique si la période demandée remonte au-delà de l'horizon d'archivage"""
+    return debut is None or debut < horizon_archivage()
+
+def paginer_journal(parametres, curseur, taille_page):
+    """Page du journal couvrant la table active puis, au-delà de l'horizon, les archives"""
+    activites, curseur_suivant = paginer_par_curseur(
+        filtrer_journal(parametres), 'date_heure', curseur=curseur, taille_page=taille_page
+    )
+    debut, fin, utilisateur_id = criteres_journal(parametres)
+    if curseur_suivant is None and _inclut_archives(debut):
+        if activites:
+            position = (activites[-1].date_heure, activites[-1].pk)
+        else:
+            position = decoder_curseur(curseur)
+        # Une entrée de plus pour savoir s'il existe une page suivante
+        activites += lire_archives(debut, fin, utilisateur_id, avant=position,
+                                   limite=taille_page - len(activites) + 1)
+        if len(activites) > taille_page:
+            activites = activites[:taille_page]
+            curseur_suivant = encoder_curseur(activites[-1].date_heure, activites[-1].pk)
+    return activites, curseur_suivant
+
+@login_required
+@user_passes_test(est_admin)
+def journal_activite(request):
+    """Affiche le journal des activités, paginé par curseur"""
+    activites, curseur_suivant = paginer_journal(
+        request.GET, request.GET.get('curseur'), TAILLE_PAGE_JOURNAL
+    )
     
-    if date_debut:
-        activites = activites.filter(date_heure__date__gte=date_debut)
-    if date_fin:
-        activites = activites.filter(date_heure__date__lte=date_fin)
+    # Filtres courants, réutilisés dans les liens de pagination et d'export
+    filtres = request.GET.copy()
+    filtres.pop('curseur', None)
     
     return render(request, 'utilisateurs/journal_activite.html', {
         'activites': activites,
-        'utilisateurs': Utilisateur.objects.all()
+        'curseur_suivant': curseur_suivant,
+        'est_premiere_page': not request.GET.get('curseur'),
+        'filtres': filtres.urlencode(),
+        'utilisateurs': Utilisateur.objects.only('id', 'username', 'role').order_by('username')
     })
 
+class _Echo:
+    """Pseudo-fichier pour csv.writer : retourne la ligne au lieu de l'écrire"""
+    def write(self, valeur):
+        return valeur
+
+def _lignes_csv(activites):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CHAMPS_EXPORT_JOURNAL)
+    for activite in activites:
+        yield writer.writerow([getattr(activite, champ) for champ in CHAMPS_EXPORT_JOURNAL])
+
+def _lignes_json(activites):
+    yield '['
+    separateur = ''
+    for activite in activites:
+        ligne = {champ: getattr(activite, champ) for champ in CHAMPS_EXPORT_JOURNAL}
+        yield separateur + json.dumps(ligne, cls=DjangoJSONEncoder, ensure_ascii=False)
+        separateur = ',\n'
+    yield ']\n'
+
+@login_required
+@user_passes_test(est_admin)
+def exporter_journal_activite(request, format_export):
+    """Exporte le journal filtré en CSV ou JSON, en flux et par lots bornés"""
+    if format_export == 'csv':
+        generateur, type_contenu = _lignes_csv, 'text/csv; charset=utf-8'
+    elif format_export == 'json':
+        generateur, type_contenu = _lignes_json, 'application/json; charset=utf-8'
+    else:
+        raise Http404("Format d'export inconnu")
+    
+    activites = parcourir_par_lots(
+        filtrer_journal(request.GET).only(*CHAMPS_EXPORT_JOURNAL), 'date_heure'
+    )
+    debut, fin, utilisateur_id = criteres_journal(request.GET)
+    if _inclut_archives(debut):
+        activites = itertools.chain(activites, parcourir_archives(debut, fin, utilisateur_id))
+    response = StreamingHttpResponse(generateur(activites), content_type=type_contenu)
+    nom_fichier = f"journal_activite_{timezone.now():%Y%m%d_%H%M}.{format_export}"
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return response
+
+@login_required
+@user_passes_test(est_admin)
+def statistiques_connexions(request):
+    """Compteurs des pools de connexions à la base de ce processus (JSON)"""
+    return JsonResponse({'pid': os.getpid(), 'pools': statistiques_pools()})
+
+@login_required
+@user_passes_test(est_admin)
+def statistiques_performances(request):
+    """Centiles de durée des pages de ce processus, par nom d'URL (JSON)"""
+    return JsonResponse({'pid': os.getpid(), 'pages': statistiques_requetes()})
+
 @login_required
 def mon_profil(request):
     """Affiche et permet de modifier son propre profil"""
@@ -283,4 +1250,668 @@ def mon_profil(request):
     
     return render(request, 'utilisateurs/mon_profil.html', {
         'utilisateur': utilisateur
-    })
\ No newline at end of file
+    })
+
+# Fichier: applications/utilisateurs/templatetags/miniatures.py
+from django import template
+
+from applications.utilisateurs.miniatures import url_miniature
+
+register = template.Library()
+
+@register.simple_tag
+def miniature(fichier, taille='mini', format_image='webp'):
+    """URL de la miniature d'une photo : {% miniature user.photo 'mini' %}"""
+    return url_miniature(fichier, taille, format_image)
+
+# Fichier: applications/utilisateurs/management/commands/archiver_journal.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from applications.utilisateurs.archivage import archiver_journal, horizon_archivage
+from applications.utilisateurs.models import JournalActivite
+
+class Command(BaseCommand):
+    help = "Archive les entrées anciennes du journal d'activité dans des fichiers mensuels compressés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, help="Horizon de rétention en jours (par défaut : RETENTION_JOURS)")
+        parser.add_argument('--taille-lot', type=int, help="Nombre de lignes déplacées par transaction")
+        parser.add_argument('--duree-max', type=float, help="Durée maximale d'exécution en secondes")
+        parser.add_argument('--pause', type=float, default=0, help="Pause entre deux lots, en secondes")
+        parser.add_argument('--simulation', action='store_true', help="Affiche le nombre de lignes concernées sans rien déplacer")
+
+    def handle(self, *args, **options):
+        if options['jours'] is not None:
+            horizon = timezone.now() - timedelta(days=options['jours'])
+        else:
+            horizon = horizon_archivage()
+
+        if options['simulation']:
+            nombre = JournalActivite.objects.filter(date_heure__lt=horizon).count()
+            self.stdout.write(f"{nombre} entrée(s) antérieures au {horizon:%d/%m/%Y %H:%M} seraient archivées.")
+            return
+
+        total = archiver_journal(
+            horizon=horizon,
+            taille_lot=options['taille_lot'],
+            duree_max=options['duree_max'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{total} entrée(s) archivée(s)."))
+
+# Fichier: applications/utilisateurs/management/commands/generer_miniatures.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from applications.utilisateurs.miniatures import generer_miniatures
+
+# Modèles et champs dont les photos ont des miniatures
+CHAMPS_PHOTOS = [
+    ('utilisateurs.Utilisateur', 'photo'),
+    ('patients.Patient', 'photo'),
+]
+
+class Command(BaseCommand):
+    help = "Génère en parallèle les miniatures manquantes des photos existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--travailleurs', type=int, default=4, help="Nombre de threads de génération")
+        parser.add_argument('--forcer', action='store_true', help="Régénère même les miniatures à jour")
+
+    def handle(self, *args, **options):
+        noms = set()
+        for modele, champ in CHAMPS_PHOTOS:
+            noms.update(
+                apps.get_model(modele).objects.exclude(**{f'{champ}__isnull': True}).exclude(**{champ: ''})
+                .values_list(champ, flat=True).iterator()
+            )
+
+        ecrites = erreurs = 0
+        with ThreadPoolExecutor(max_workers=options['travailleurs']) as executeur:
+            taches = {executeur.submit(generer_miniatures, nom, options['forcer']): nom for nom in noms}
+            for tache in as_completed(taches):
+                try:
+                    ecrites += tache.result()
+                except Exception as exc:
+                    erreurs += 1
+                    self.stderr.write(f"{taches[tache]} : {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(noms)} photo(s) traitée(s), {ecrites} miniature(s) écrite(s), {erreurs} erreur(s)."
+        ))
+
+# Fichier: applications/utilisateurs/management/commands/bench_tableau_bord.py
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from applications.utilisateurs.models import Utilisateur
+from applications.utilisateurs.rendu import template_tableau_bord
+
+class Command(BaseCommand):
+    help = "Mesure le temps de rendu et les allocations du tableau de bord pour chaque rôle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Rendus mesurés par rôle")
+
+    def _requete(self, utilisateur):
+        request = RequestFactory().get('/')
+        request.user = utilisateur
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(f"{'Rôle':<22}{'moyenne (ms)':>14}{'p95 (ms)':>12}{'alloué (Ko)':>14}{'pic (Ko)':>12}")
+        for role, _ in Utilisateur.ROLES:
+            # Utilisateur non enregistré : aucune écriture en base
+            utilisateur = Utilisateur(username=f'bench_{role}', first_name='Bench', role=role)
+            request = self._requete(utilisateur)
+            template = template_tableau_bord(role)
+            contexte = {'utilisateur': utilisateur}
+
+            # Premier rendu hors mesure : compilation et remplissage du cache de fragments
+            render_to_string(template, contexte, request)
+
+            durees = []
+            for _ in range(iterations):
+                debut = time.perf_counter()
+                render_to_string(template, contexte, request)
+                durees.append((time.perf_counter() - debut) * 1000)
+
+            tracemalloc.start()
+            avant = tracemalloc.take_snapshot()
+            render_to_string(template, contexte, request)
+            apres = tracemalloc.take_snapshot()
+            _, pic = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            alloue = sum(stat.size_diff for stat in apres.compare_to(avant, 'filename') if stat.size_diff > 0)
+
+            p95 = statistics.quantiles(durees, n=20)[-1] if len(durees) >= 2 else durees[0]
+            self.stdout.write(f"{role:<22}{statistics.mean(durees):>14.3f}{p95:>12.3f}"
+                              f"{alloue / 1024:>14.1f}{pic / 1024:>12.1f}")
+
+# Fichier: applications/utilisateurs/management/commands/bench_requetes_session.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from applications.utilisateurs.models import Utilisateur
+
+# Configurations comparées : (libellé, SESSION_ENGINE, AUTHENTICATION_BACKENDS)
+CONFIGURATIONS = [
+    ("Avant : sessions en base, ModelBackend",
+     'django.contrib.sessions.backends.db',
+     ['django.contrib.auth.backends.ModelBackend']),
+    ("Après : sessions en cache + base, utilisateur en cache",
+     'django.contrib.sessions.backends.cached_db',
+     ['applications.utilisateurs.authentification.ModelBackendEnCache']),
+    ("Après : sessions en cookie signé, utilisateur en cache",
+     'django.contrib.sessions.backends.signed_cookies',
+     ['applications.utilisateurs.authentification.ModelBackendEnCache']),
+]
+
+class Command(BaseCommand):
+    help = "Compte les requêtes SQL par page selon le mode de session et d'authentification"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Utilisateur existant utilisé pour la mesure")
+        parser.add_argument('--url', default=None, help="Page mesurée (par défaut : tableau de bord)")
+        parser.add_argument('--requetes', type=int, default=20, help="Pages demandées par configuration")
+
+    def handle(self, *args, **options):
+        try:
+            utilisateur = Utilisateur.objects.get(username=options['username'])
+        except Utilisateur.DoesNotExist:
+            raise CommandError(f"Utilisateur {options['username']} introuvable")
+        url = options['url'] or reverse('tableau_bord')
+
+        for libelle, moteur, backends in CONFIGURATIONS:
+            with override_settings(SESSION_ENGINE=moteur, AUTHENTICATION_BACKENDS=backends,
+                                   ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']):
+                client = Client()
+                client.force_login(utilisateur, backend=backends[0])
+                # Première page hors mesure : remplissage des caches
+                client.get(url)
+                with CaptureQueriesContext(connection) as requetes:
+                    for _ in range(options['requetes']):
+                        client.get(url)
+            self.stdout.write(f"{libelle} : {len(requetes) / options['requetes']:.2f} requête(s) SQL par page")
+
+# Fichier: applications/utilisateurs/management/commands/verifier_routage_replique.py
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import override_settings
+
+from applications.utilisateurs.models import JournalActivite
+from centre_sante.bd.routage import (
+    ALIAS_REPLIQUE, get_configuration, lectures_sur_replique, reinitialiser_etat, replique_configuree,
+)
+
+class Command(BaseCommand):
+    help = ("Vérifie le routage primaire / réplique. Avec BD_LOCALE=sqlite, la réplique est une "
+            "copie du fichier primaire : une écriture ultérieure n'y est visible que sur la primaire.")
+
+    def handle(self, *args, **options):
+        if not replique_configuree():
+            raise CommandError("Aucune base 'replica' configurée (BD_REPLIQUE_HOTE ou BD_LOCALE=sqlite)")
+        sqlite = all(connections[alias].vendor == 'sqlite' for alias in (DEFAULT_DB_ALIAS, ALIAS_REPLIQUE))
+        if sqlite:
+            # « Réplication » instantanée : copie du fichier primaire
+            connections[ALIAS_REPLIQUE].close()
+            shutil.copyfile(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+                            connections[ALIAS_REPLIQUE].settings_dict['NAME'])
+
+        echecs = 0
+        reinitialiser_etat()
+        entree = None
+        try:
+            echecs += self.verifier("Lecture hors vue de rapport", DEFAULT_DB_ALIAS)
+
+            with lectures_sur_replique():
+                echecs += self.verifier("Lecture autorisée", ALIAS_REPLIQUE)
+                with transaction.atomic():
+                    echecs += self.verifier("Lecture dans une transaction", DEFAULT_DB_ALIAS)
+                with override_settings(ROUTAGE_REPLIQUE={**get_configuration(), 'RETARD_MAX': -1,
+                                                         'INTERVALLE_VERIFICATION': 0}):
+                    echecs += self.verifier("Lecture avec réplique en retard", DEFAULT_DB_ALIAS)
+                entree = JournalActivite.objects.create(nom_utilisateur='verification_routage',
+                                                        action="Vérification du routage")
+                echecs += self.verifier("Lecture après une écriture", DEFAULT_DB_ALIAS, entree)
+
+            if sqlite:
+                with lectures_sur_replique():
+                    visible = JournalActivite.objects.filter(pk=entree.pk).exists()
+                echecs += self.rapporter("Écriture absente de la réplique non répliquée", not visible)
+        finally:
+            if entree is not None:
+                entree.delete()
+            reinitialiser_etat()
+
+        if echecs:
+            raise CommandError(f"{echecs} vérification(s) en échec")
+        self.stdout.write(self.style.SUCCESS("Routage conforme"))
+
+    def verifier(self, libelle, alias_attendu, entree=None):
+        queryset = JournalActivite.objects.all()
+        if entree is not None:
+            queryset = queryset.filter(pk=entree.pk)
+        alias = queryset.db
+        if entree is not None and not queryset.exists():
+            return self.rapporter(f"{libelle} (écriture introuvable sur {alias})", False)
+        return self.rapporter(f"{libelle} → {alias}", alias == alias_attendu)
+
+    def rapporter(self, libelle, succes):
+        self.stdout.write(f"{'OK   ' if succes else 'ÉCHEC'} {libelle}")
+        return 0 if succes else 1
+
+# Fichier: applications/utilisateurs/management/commands/vendoriser_statiques.py
+import os
+import re
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from centre_sante.statiques import RESSOURCES_TIERCES
+
+# Les cartes de sources ne sont pas copiées : la référence est retirée pour que
+# collectstatic ne cherche pas un fichier absent
+REFERENCE_CARTE_SOURCE = re.compile(rb'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)\s*$')
+
+class Command(BaseCommand):
+    help = "Copie sous static/vendor/ les bibliothèques tierces (Bootstrap, Font Awesome, jQuery) de base.html"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcer', action='store_true', help="Retélécharge les fichiers déjà présents")
+
+    def handle(self, *args, **options):
+        racine = settings.STATICFILES_DIRS[0]
+        copies = 0
+        for url, chemin_relatif in RESSOURCES_TIERCES:
+            chemin = os.path.join(racine, *chemin_relatif.split('/'))
+            if os.path.exists(chemin) and not options['forcer']:
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as reponse:
+                    contenu = reponse.read()
+            except OSError as erreur:
+                raise CommandError(f"Téléchargement impossible de {url} : {erreur}")
+            if chemin.endswith(('.css', '.js')):
+                contenu = REFERENCE_CARTE_SOURCE.sub(b'\n', contenu)
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            with open(chemin, 'wb') as fichier:
+                fichier.write(contenu)
+            copies += 1
+            self.stdout.write(f"{chemin_relatif} ({len(contenu)} octets)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{copies} fichier(s) copié(s). Lancer ensuite collectstatic pour les empreintes et la compression."
+        ))
+
+# Fichier: applications/utilisateurs/management/commands/generer_hopital_synthetique.py
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from applications.patients.import_export import inserer_lot
+from applications.patients.models import Patient, DossierMedical, AntecedentMedical, DocumentMedical
+from applications.patients.recherche_clinique import indexer_clinique
+from applications.utilisateurs.models import Utilisateur, JournalActivite
+
+# Données fictives reconnaissables : utilisateurs synth_<rôle>_<n>, dossiers SOS-SYNTH-...
+PREFIXE_UTILISATEURS = 'synth_'
+ANNEE_NUMEROS = 'SYNTH'
+NOMS = ['Kabongo', 'Mbuyi', 'Tshibangu', 'Ilunga', 'Mukendi', 'Kasongo', 'Lukusa', 'Ngoy', 'Kalala',
+        'Mutombo', 'Banza', 'Kazadi', 'Nkulu', 'Mwamba', 'Dupont', 'Martin', 'Bernard', 'Lambert']
+PRENOMS = ['Jean', 'Marie', 'Joseph', 'Grâce', 'Patrick', 'Esther', 'Didier', 'Chantal', 'Pierre',
+           'Ruth', 'Emmanuel', 'Sarah', 'Olivier', 'Rebecca', 'Alain', 'Josée']
+ALLERGIES = ['', '', '', 'Pénicilline', 'Arachides', 'Sulfamides', 'Aspirine']
+MALADIES = ['', '', 'Hypertension artérielle', 'Diabète de type 2', 'Drépanocytose', 'Asthme']
+PAGES = ['/utilisateurs/', '/patients/', '/patients/{patient}/', '/patients/{patient}/dossier/',
+         '/patients/recherche/autocompletion/', '/utilisateurs/journal-activite/', '/rapports/']
+
+class Command(BaseCommand):
+    help = ("Crée un hôpital fictif reproductible (utilisateurs de chaque rôle, patients avec dossier, "
+            "antécédents et documents, journal d'activité) pour les mesures de charge")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=10000)
+        parser.add_argument('--utilisateurs-par-role', type=int, default=3)
+        parser.add_argument('--journal', type=int, default=200000, help="Entrées du journal d'activité")
+        parser.add_argument('--jours', type=int, default=90, help="Période couverte par le journal")
+        parser.add_argument('--graine', type=int, default=42, help="Graine du générateur (données reproductibles)")
+        parser.add_argument('--mot-de-passe', default='synthetique', help="Mot de passe des utilisateurs fictifs")
+        parser.add_argument('--supprimer', action='store_true', help="Supprime les données fictives et s'arrête")
+
+    def handle(self, *args, **options):
+        if options['supprimer']:
+            self.supprimer()
+            return
+        aleatoire = random.Random(options['graine'])
+        utilisateurs = self.creer_utilisateurs(options['utilisateurs_par_role'], options['mot_de_passe'])
+        patients = self.creer_patients(aleatoire, options['patients'])
+        self.creer_journal(aleatoire, options['journal'], options['jours'], utilisateurs, patients)
+
+    def creer_utilisateurs(self, par_role, mot_de_passe):
+        # Un seul hachage (coûteux) partagé par tous les comptes fictifs
+        hachage = make_password(mot_de_passe)
+        existants = set(Utilisateur.objects.filter(username__startswith=PREFIXE_UTILISATEURS)
+                        .values_list('username', flat=True))
+        nouveaux = [
+            Utilisateur(username=f'{PREFIXE_UTILISATEURS}{role}_{numero}', password=hachage, role=role,
+                        first_name=role.replace('_', ' ').title(), last_name=f'Fictif {numero}')
+            for role, _ in Utilisateur.ROLES
+            for numero in range(par_role)
+            if f'{PREFIXE_UTILISATEURS}{role}_{numero}' not in existants
+        ]
+        Utilisateur.objects.bulk_create(nouveaux)
+        self.stdout.write(f"Utilisateurs fictifs créés : {len(nouveaux)}")
+        return list(Utilisateur.objects.filter(username__startswith=PREFIXE_UTILISATEURS).values_list('pk', 'username'))
+
+    def creer_patients(self, aleatoire, nombre, taille_lot=1000):
+        prefixe = f'SOS-{ANNEE_NUMEROS}-'
+        existants = Patient.objects.filter(numero_dossier__startswith=prefixe).count()
+        maintenant = timezone.now()
+        for debut in range(existants, nombre, taille_lot):
+            taille = min(taille_lot, nombre - debut)
+            patients = [
+                Patient(
+                    nom=aleatoire.choice(NOMS), prenom=aleatoire.choice(PRENOMS),
+                    date_naissance=datetime.date(1935, 1, 1) + datetime.timedelta(days=aleatoire.randint(0, 32000)),
+                    sexe=aleatoire.choice('MF'),
+                    groupe_sanguin=aleatoire.choice([groupe for groupe, _ in Patient.GROUPES_SANGUINS]),
+                    telephone=f'+2438{aleatoire.randint(10000000, 99999999)}',
+                )
+                for _ in range(taille)
+            ]
+            dossiers = [
+                DossierMedical(allergies=aleatoire.choice(ALLERGIES), maladies_chroniques=aleatoire.choice(MALADIES),
+                               notes_importantes="Dossier fictif")
+                for _ in range(taille)
+            ]
+            inserer_lot(patients, dossiers, ANNEE_NUMEROS)
+            dossiers_par_patient = dict(
+                DossierMedical.objects.filter(patient__in=patients).values_list('patient_id', 'pk')
+            )
+            antecedents, documents = [], []
+            for patient in patients:
+                dossier_id = dossiers_par_patient[patient.pk]
+                for _ in range(aleatoire.randint(0, 5)):
+                    antecedents.append(AntecedentMedical(
+                        dossier_id=dossier_id, type_antecedent=aleatoire.choice(AntecedentMedical.TYPES)[0],
+                        description=aleatoire.choice(MALADIES[2:]) + " (antécédent fictif)",
+                        date_debut=maintenant.date() - datetime.timedelta(days=aleatoire.randint(30, 7000)),
+                    ))
+                for numero in range(aleatoire.randint(0, 3)):
+                    documents.append(DocumentMedical(
+                        dossier_id=dossier_id, titre=f"Document fictif {numero + 1}",
+                        type_document=aleatoire.choice(DocumentMedical.TYPES)[0],
+                        fichier=f'documents_patients/synthetique/{patient.numero_dossier}_{numero}.pdf',
+                    ))
+            with transaction.atomic():
+                AntecedentMedical.objects.bulk_create(antecedents)
+                DocumentMedical.objects.bulk_create(documents)
+                # Antécédents insérés sans signal : index clinique du lot reconstruit
+                indexer_clinique([patient.pk for patient in patients])
+            self.stdout.write(f"Patients fictifs : {debut + taille}/{nombre}")
+        return list(Patient.objects.filter(numero_dossier__startswith=prefixe).values_list('pk', flat=True))
+
+    def creer_journal(self, aleatoire, nombre, jours, utilisateurs, patients, taille_lot=10000):
+        existants = JournalActivite.objects.filter(nom_utilisateur__startswith=PREFIXE_UTILISATEURS).count()
+        if not utilisateurs or not patients:
+            return
+        maintenant = timezone.now()
+        for debut in range(existants, nombre, taille_lot):
+            entrees = []
+            for _ in range(min(taille_lot, nombre - debut)):
+                utilisateur_id, nom_utilisateur = aleatoire.choice(utilisateurs)
+                url = aleatoire.choice(PAGES).format(patient=aleatoire.choice(patients))
+                entrees.append(JournalActivite(
+                    utilisateur_id=utilisateur_id, nom_utilisateur=nom_utilisateur,
+                    action=f"Accès à {url}", url_visitee=url,
+                    adresse_ip=f'10.0.{aleatoire.randint(0, 255)}.{aleatoire.randint(1, 254)}',
+                    date_heure=maintenant - datetime.timedelta(seconds=aleatoire.randint(0, jours * 86400)),
+                ))
+            JournalActivite.objects.bulk_create(entrees)
+            self.stdout.write(f"Journal fictif : {debut + len(entrees)}/{nombre}")
+
+    def supprimer(self):
+        journal = JournalActivite.objects.filter(nom_utilisateur__startswith=PREFIXE_UTILISATEURS).delete()[0]
+        patients = Patient.objects.filter(numero_dossier__startswith=f'SOS-{ANNEE_NUMEROS}-').delete()[0]
+        utilisateurs = Utilisateur.objects.filter(username__startswith=PREFIXE_UTILISATEURS).delete()[0]
+        self.stdout.write(f"Supprimé : {journal} entrée(s) de journal, {patients} objet(s) patients, "
+                          f"{utilisateurs} objet(s) utilisateurs")
+
+# Fichier: applications/utilisateurs/management/commands/charge_clinique.py
+import datetime
+import http.cookiejar
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.patients.models import Patient
+from applications.utilisateurs.models import Utilisateur
+
+from .generer_hopital_synthetique import ANNEE_NUMEROS, PREFIXE_UTILISATEURS
+
+# Parcours rejoués, avec leur poids dans le mélange et les rôles qui les effectuent.
+# Chaque client simulé se connecte une fois puis enchaîne des parcours tirés au sort.
+PARCOURS = {
+    'tableau_bord': (3, ['medecin', 'infirmier', 'receptionniste', 'directeur']),
+    'recherche_patient': (4, ['receptionniste', 'medecin', 'infirmier_titulaire']),
+    'detail_patient': (3, ['medecin', 'infirmier_titulaire']),
+    'journal_activite': (1, ['admin']),
+}
+SQL_SERVER_TIMING = re.compile(r'sql;dur=[\d.]+;desc="(\d+)')
+
+def centile(valeurs_triees, centile):
+    if not valeurs_triees:
+        return None
+    index = min(len(valeurs_triees) - 1, int(round(centile / 100 * (len(valeurs_triees) - 1))))
+    return round(valeurs_triees[index] * 1000, 2)
+
+def resume(mesures, duree):
+    """Centiles (ms), débit (requêtes/s) et requêtes SQL moyennes d'une série de mesures"""
+    latences = sorted(mesure['latence'] for mesure in mesures)
+    sql = [mesure['sql'] for mesure in mesures if mesure['sql'] is not None]
+    return {
+        'requetes': len(mesures),
+        'erreurs': sum(1 for mesure in mesures if mesure['statut'] >= 400 or mesure['statut'] == 0),
+        'debit_rps': round(len(mesures) / duree, 2) if duree else None,
+        'p50_ms': centile(latences, 50),
+        'p95_ms': centile(latences, 95),
+        'p99_ms': centile(latences, 99),
+        'sql_par_requete': round(sum(sql) / len(sql), 2) if sql else None,
+    }
+
+class ClientSimule:
+    """Navigateur minimal : cookies de session, jeton CSRF, mesure de chaque requête"""
+
+    def __init__(self, base, mesures, verrou):
+        self.base = base.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.navigateur = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.mesures = mesures
+        self.verrou = verrou
+
+    def requete(self, etape, chemin, donnees=None):
+        entetes = {'Referer': self.base + chemin}
+        corps = None
+        if donnees is not None:
+            corps = urllib.parse.urlencode(donnees).encode()
+            entetes['X-CSRFToken'] = self.jeton_csrf()
+        requete = urllib.request.Request(self.base + chemin, data=corps, headers=entetes)
+        debut = time.perf_counter()
+        statut, server_timing = 0, ''
+        try:
+            with self.navigateur.open(requete, timeout=30) as reponse:
+                reponse.read()
+                statut, server_timing = reponse.status, reponse.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as erreur:
+            statut, server_timing = erreur.code, erreur.headers.get('Server-Timing', '')
+        except OSError:
+            pass
+        latence = time.perf_counter() - debut
+        correspondance = SQL_SERVER_TIMING.search(server_timing)
+        with self.verrou:
+            self.mesures.append({
+                'etape': etape, 'latence': latence, 'statut': statut,
+                'sql': int(correspondance.group(1)) if correspondance else None,
+            })
+        return statut
+
+    def jeton_csrf(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def connexion(self, username, mot_de_passe):
+        self.requete('connexion', '/utilisateurs/login/')
+        return self.requete('connexion', '/utilisateurs/login/', {
+            'username': username, 'password': mot_de_passe, 'csrfmiddlewaretoken': self.jeton_csrf(),
+        })
+
+class Command(BaseCommand):
+    help = ("Rejoue des parcours cliniques avec des clients simultanés contre un serveur local et écrit "
+            "les centiles de latence, le débit et les requêtes SQL par page (JSON comparable entre commits). "
+            "Lancer le serveur avec INSTRUMENTATION=1 pour compter les requêtes SQL.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Serveur mesuré")
+        parser.add_argument('--clients', type=int, default=20, help="Clients simultanés")
+        parser.add_argument('--duree', type=float, default=60, help="Durée de la mesure en secondes")
+        parser.add_argument('--pause', type=float, default=0.0, help="Temps de réflexion entre deux parcours (s)")
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--mot-de-passe', default='synthetique', help="Mot de passe des utilisateurs fictifs")
+        parser.add_argument('--sortie', default=None, help="Fichier JSON du résultat (sinon sortie standard)")
+        parser.add_argument('--comparer', default=None, help="Résultat JSON précédent à comparer")
+
+    def handle(self, *args, **options):
+        comptes = {}
+        for username, role in Utilisateur.objects.filter(username__startswith=PREFIXE_UTILISATEURS).values_list('username', 'role'):
+            comptes.setdefault(role, []).append(username)
+        patients = list(Patient.objects.filter(numero_dossier__startswith=f'SOS-{ANNEE_NUMEROS}-')
+                        .values_list('pk', 'nom')[:5000])
+        utilisateurs_journal = list(Utilisateur.objects.filter(username__startswith=PREFIXE_UTILISATEURS)
+                                    .values_list('pk', flat=True))
+        if not comptes or not patients:
+            raise CommandError("Aucune donnée fictive : lancer d'abord generer_hopital_synthetique")
+
+        mesures = []
+        verrou = threading.Lock()
+        fin = time.monotonic() + options['duree']
+        parcours = [nom for nom, (poids, roles) in PARCOURS.items() if any(role in comptes for role in roles)]
+        poids = [PARCOURS[nom][0] for nom in parcours]
+
+        def client(numero):
+            aleatoire = random.Random(options['graine'] + numero)
+            nom_parcours = aleatoire.choices(parcours, poids)[0]
+            role = aleatoire.choice([role for role in PARCOURS[nom_parcours][1] if role in comptes])
+            navigateur = ClientSimule(options['url'], mesures, verrou)
+            navigateur.connexion(aleatoire.choice(comptes[role]), options['mot_de_passe'])
+            navigateur.requete('tableau_bord', '/utilisateurs/')
+            while time.monotonic() < fin:
+                if nom_parcours == 'tableau_bord':
+                    navigateur.requete('tableau_bord', '/utilisateurs/')
+                elif nom_parcours == 'recherche_patient':
+                    _, nom = aleatoire.choice(patients)
+                    terme = nom[:aleatoire.randint(2, len(nom))]
+                    navigateur.requete('recherche_patient', '/patients/recherche/autocompletion/?' + urllib.parse.urlencode({'q': terme}))
+                    navigateur.requete('liste_patients', '/patients/?' + urllib.parse.urlencode({'terme': terme}))
+                elif nom_parcours == 'detail_patient':
+                    pk, _ = aleatoire.choice(patients)
+                    navigateur.requete('detail_patient', f'/patients/{pk}/')
+                    navigateur.requete('dossier_medical', f'/patients/{pk}/dossier/')
+                else:
+                    jour = timezone.localdate() - datetime.timedelta(days=aleatoire.randint(0, 30))
+                    navigateur.requete('journal_activite', '/utilisateurs/journal-activite/?' + urllib.parse.urlencode({
+                        'utilisateur': aleatoire.choice(utilisateurs_journal),
+                        'date_debut': jour.isoformat(), 'date_fin': jour.isoformat(),
+                    }))
+                if options['pause']:
+                    time.sleep(options['pause'])
+                # Le client change de parcours de temps en temps, sans se reconnecter
+                if aleatoire.random() < 0.2:
+                    nom_parcours = aleatoire.choices(parcours, poids)[0]
+                    if role not in PARCOURS[nom_parcours][1]:
+                        nom_parcours = 'tableau_bord'
+
+        debut = time.monotonic()
+        threads = [threading.Thread(target=client, args=(numero,)) for numero in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.monotonic() - debut
+
+        resultat = {
+            'commit': self.commit_courant(),
+            'date': timezone.now().isoformat(),
+            'parametres': {cle: options[cle] for cle in ('url', 'clients', 'duree', 'pause', 'graine')},
+            'global': resume(mesures, duree),
+            'etapes': {
+                etape: resume([mesure for mesure in mesures if mesure['etape'] == etape], duree)
+                for etape in sorted({mesure['etape'] for mesure in mesures})
+            },
+        }
+        texte = json.dumps(resultat, indent=2, ensure_ascii=False)
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                fichier.write(texte + '\n')
+            self.stdout.write(f"Résultat écrit dans {options['sortie']}")
+        else:
+            self.stdout.write(texte)
+        if options['comparer']:
+            self.comparer(options['comparer'], resultat)
+
+    def commit_courant(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def comparer(self, chemin, resultat):
+        with open(chemin, encoding='utf-8') as fichier:
+            reference = json.load(fichier)
+        self.stdout.write(f"Comparaison avec {reference.get('commit') or chemin} :")
+        lignes = [('global', reference['global'], resultat['global'])] + [
+            (etape, reference['etapes'][etape], mesure)
+            for etape, mesure in resultat['etapes'].items() if etape in reference['etapes']
+        ]
+        for etape, avant, apres in lignes:
+            ecarts = []
+            for cle in ('p50_ms', 'p95_ms', 'p99_ms', 'debit_rps', 'sql_par_requete'):
+                if avant.get(cle) and apres.get(cle) is not None:
+                    ecarts.append(f"{cle} {avant[cle]} → {apres[cle]} ({(apres[cle] - avant[cle]) / avant[cle]:+.0%})")
+            self.stdout.write(f"  {etape} : " + ', '.join(ecarts))
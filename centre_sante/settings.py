@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'centre_sante.instrumentation.InstrumentationMiddleware',  # Mesures (si INSTRUMENTATION['ACTIVE'])
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,7 +46,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'centre_sante.bd.routage.RoutageRepliqueMiddleware',  # Lectures sur la réplique (si configurée)
     'applications.utilisateurs.middleware.JournalActiviteMiddleware',  # Journal d'activité
+    'applications.utilisateurs.middleware.PresenceMiddleware',  # Suivi de présence
 ]
 
 ROOT_URLCONF = 'centre_sante.urls'
@@ -54,7 +57,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -62,6 +64,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates compilés une seule fois par processus (précompilés au démarrage,
+            # voir applications/utilisateurs/rendu.py) ; un redémarrage les recharge
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -69,9 +79,11 @@ TEMPLATES = [
 WSGI_APPLICATION = 'centre_sante.wsgi.application'
 
 # Configuration de la base de données MySQL
+# Moteur avec pool de connexions (centre_sante/bd) : CONN_MAX_AGE reste à 0, la
+# connexion est rendue au pool à la fin de chaque requête au lieu d'être fermée
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'centre_sante.bd.mysql',
         'NAME': 'centre_sante_sos',
         'USER': 'utilisateur_bd',
         'PASSWORD': 'mot_de_passe_bd',
@@ -80,7 +92,52 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        'POOL': {
+            'TAILLE_MAX': 10,
+            'DUREE_VIE_MAX': 1800,
+            'DELAI_ATTENTE': 10,
+            'VALIDATION_APRES': 5,
+        },
+    }
+}
+
+# Réplique en lecture optionnelle (rapports, journal d'activité, liste des patients)
+if os.environ.get('BD_REPLIQUE_HOTE'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['BD_REPLIQUE_HOTE'],
+        'PORT': os.environ.get('BD_REPLIQUE_PORT', '3306'),
+        # En test, la réplique est la base primaire
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Essais locaux : deux fichiers SQLite tiennent lieu de primaire et de réplique
+if os.environ.get('BD_LOCALE') == 'sqlite':
+    DATABASES = {
+        alias: {
+            'ENGINE': 'centre_sante.bd.sqlite3',
+            'NAME': BASE_DIR / f'{nom}.sqlite3',
+            **({'TEST': {'MIRROR': 'default'}} if alias == 'replica' else {}),
+        }
+        for alias, nom in (('default', 'primaire'), ('replica', 'replique'))
     }
+
+# Connexion dédiée à la réservation des numéros de dossier, en autocommit : le compteur
+# n'est verrouillé que le temps de son UPDATE, hors de la transaction de l'appelant
+DATABASES['numerotation'] = {
+    **DATABASES['default'],
+    'ATOMIC_REQUESTS': False,
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['centre_sante.bd.routage.RouteurReplique']
+
+ROUTAGE_REPLIQUE = {
+    'VUES': ['journal_activite', 'exporter_journal_activite', 'liste_patients'],
+    'MODULES': ['applications.rapports'],
+    'RETARD_MAX': 5,
+    'INTERVALLE_VERIFICATION': 10,
+    'DUREE_COLLANTE': 10,
 }
 
 # Password validation
@@ -102,6 +159,20 @@ AUTH_PASSWORD_VALIDATORS = [
 # Utiliser notre modèle Utilisateur personnalisé
 AUTH_USER_MODEL = 'utilisateurs.Utilisateur'
 
+# Authentification : utilisateur connecté gardé en mémoire CACHE_UTILISATEUR_DUREE secondes
+# par processus, revérifié à chaque requête (0 pour le recharger à chaque requête)
+AUTHENTICATION_BACKENDS = ['applications.utilisateurs.authentification.ModelBackendEnCache']
+CACHE_UTILISATEUR_DUREE = 30
+
+# Sessions : 'cache_db' (cache avec écriture en base), 'cookie' (cookie signé, aucune
+# table) ou 'db' (moteur par défaut de Django)
+MODES_SESSIONS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = MODES_SESSIONS[os.environ.get('MODE_SESSIONS', 'cache_db')]
+
 # URLs de redirection après connexion/déconnexion
 LOGIN_REDIRECT_URL = 'tableau_bord'
 LOGOUT_REDIRECT_URL = 'login'
@@ -119,22 +190,156 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Bibliothèques tierces copiées sous static/vendor/ (commande vendoriser_statiques) ;
+# collectstatic ajoute une empreinte aux noms et écrit les variantes .gz/.br (centre_sante/statiques.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'centre_sante.statiques.StockageStatiquesCompresses'},
+}
+# Sans serveur frontal (Nginx gzip_static/brotli_static), Django sert STATIC_ROOT lui-même
+STATIQUES_PAR_DJANGO = os.environ.get('STATIQUES_PAR_DJANGO', '') == '1'
+
 # Configuration des fichiers média
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Miniatures des photos (patients et utilisateurs), en pixels
+MINIATURES = {
+    'TAILLES': {'mini': 64, 'moyenne': 256},
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITE': 80,
+    'TRAVAILLEURS': 2,
+}
+
+# Téléchargement des documents médicaux
+# ENVOI_PAR_SERVEUR : None (flux Django), 'x-accel-redirect' (Nginx) ou 'x-sendfile' (Apache)
+DOCUMENTS_MEDICAUX = {
+    'ENVOI_PAR_SERVEUR': None,
+    'PREFIXE_INTERNE': '/media-protege/',  # location interne Nginx pointant vers MEDIA_ROOT
+}
+
+# Téléversement des documents médicaux par parties
+TELEVERSEMENT_DOCUMENTS = {
+    'TAILLE_PARTIE': 5 * 1024 * 1024,   # 5 Mo par partie
+    'TAILLE_MAX': 200 * 1024 * 1024,    # 200 Mo par document
+    'EXPIRATION_HEURES': 24,            # Téléversements inachevés supprimés ensuite
+    'DELAI_ASSEMBLAGE_MINUTES': 30,     # Assemblage bloqué passé en erreur ensuite
+    'REPERTOIRE': 'televersements',     # Relatif à MEDIA_ROOT
+    'TRAVAILLEURS': 2,
+    'TRAITEMENTS': [],
+}
+
 # Configuration par défaut pour les champs de PRIMARY KEY
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Configuration pour crispy forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
+# Configuration du cache
+# Les dossiers patients en cache restent exacts d'un processus à l'autre même avec
+# LocMemCache (version relue en base) ; un cache partagé (Memcached, Redis) évite de
+# recalculer les mêmes entrées dans chaque worker.
+# KEY_PREFIX change à chaque déploiement : les fragments de templates en cache
+# (navigation par rôle, ...) de la version précédente ne sont plus utilisés
+# 'versions' : versions des comptes lues à chaque requête par ModelBackendEnCache. Elles
+# doivent être communes à tous les workers : le cache fichier convient sur un seul
+# serveur ; avec plusieurs serveurs, pointer CACHE_VERSIONS_UTILISATEURS vers un cache
+# Memcached ou Redis partagé.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'centre-sante-sos',
+        'KEY_PREFIX': os.environ.get('VERSION_DEPLOIEMENT', 'dev'),
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('REPERTOIRE_CACHE_VERSIONS', str(BASE_DIR / 'cache' / 'versions')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+CACHE_VERSIONS_UTILISATEURS = 'versions'
+
+# Durée (en secondes) de conservation des dossiers patients complets en cache
+CACHE_DOSSIER_PATIENT_DUREE = 300
+
+# Configuration du journal d'activité
+# MODE 'synchrone' : une insertion par requête ; MODE 'tampon' : insertions par lots en arrière-plan
+JOURNAL_ACTIVITE = {
+    'MODE': 'tampon',
+    'TAILLE_LOT': 200,
+    'INTERVALLE_VIDAGE': 2.0,
+    'TAILLE_MAX_FILE': 10000,
+    'POLITIQUE_DEBORDEMENT': 'abandonner',  # 'abandonner', 'bloquer' ou 'synchrone'
+    'DELAI_BLOCAGE': 0.5,
+    # Archivage : entrées plus anciennes que RETENTION_JOURS déplacées sous MEDIA_ROOT
+    'RETENTION_JOURS': 90,
+    'TAILLE_LOT_ARCHIVAGE': 5000,
+    'REPERTOIRE_ARCHIVES': 'archives/journal_activite',
+}
+
+# Instrumentation des requêtes : en-tête Server-Timing, histogrammes par URL et
+# journal des requêtes lentes (logger centre_sante.instrumentation)
+INSTRUMENTATION = {
+    'ACTIVE': os.environ.get('INSTRUMENTATION', '') == '1',
+    'SEUIL_LENT_MS': 500,
+    'TAILLE_HISTOGRAMME': 1000,
+    'SQL_AFFICHEES': 5,
+    'SEUIL_DOUBLONS': 3,
+}
+
+# Suivi de présence des utilisateurs (dernière activité écrite par lots)
+PRESENCE = {
+    'INTERVALLE_VIDAGE': 30,
+    'FENETRE_EN_LIGNE_MINUTES': 5,
+}
+
+# Numérotation des dossiers patients (compteur annuel, blocs réservés par processus)
+NUMERO_DOSSIER = {
+    'FORMAT': 'SOS-{annee}-{numero:06d}',
+    'TAILLE_BLOC': 20,
+}
+
+# Cumuls des rapports, mis à jour par la commande mettre_a_jour_statistiques (planifiée)
+STATISTIQUES = {
+    'TAILLE_LOT': 5000,
+    'MARGE_SECONDES': 120,  # Délai laissé aux transactions en cours avant comptage
+    'INTERVALLE_PYRAMIDE': 3600,  # Recalcul de la pyramide des âges (page des rapports)
+}
+
+# Documents PDF (dossier patient, rapport mensuel) rendus par un pool de processus
+PDF = {
+    'REPERTOIRE': 'pdf',        # Relatif à MEDIA_ROOT
+    'TRAVAILLEURS': 2,
+    'VERSION_GABARIT': 1,
+    'DUREE_ETAT': 3600,
+}
+
+# Import en masse des patients (commande importer_patients, administration)
+IMPORT_PATIENTS = {
+    'TAILLE_LOT': 500,
+    'TAILLE_MAX_ADMIN': 2 * 1024 * 1024,  # Fichiers importés depuis l'administration
+}
+
+# Synchronisation incrémentale des sites distants (patients/synchronisation/)
+SYNCHRONISATION = {
+    'TAILLE_LOT': 500,
+    'MARGE_SECONDES': 5,
+}
+
+# Détection des patients en double (commande detecter_doublons, examen dans l'administration)
+DOUBLONS_PATIENTS = {
+    'SEUIL': 0.8,
+    'TRAVAILLEURS': 4,
+}
+
 # Fichier: centre_sante/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from centre_sante.statiques import servir_statique
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('utilisateurs/', include('applications.utilisateurs.urls')),
@@ -150,4 +355,851 @@ urlpatterns = [
 
 # Servir les fichiers média en développement
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Fichiers statiques collectés, précompressés et mis en cache longue durée
+if settings.STATIQUES_PAR_DJANGO:
+    urlpatterns += [
+        re_path(r'^%s(?P<chemin>.+)$' % settings.STATIC_URL.lstrip('/'), servir_statique),
+    ]
+
+# Fichier: centre_sante/statiques.py
+import gzip
+import mimetypes
+import posixpath
+import re
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+
+try:
+    import brotli
+except ImportError:  # Variantes .br omises sans le paquet Brotli
+    brotli = None
+
+# Fichiers statiques : bibliothèques tierces copiées sous static/vendor/ (commande
+# vendoriser_statiques), noms avec empreinte via le manifeste de collectstatic, et
+# variantes .gz/.br écrites à côté de chaque fichier compressible. Nginx les sert avec
+# gzip_static/brotli_static ; sans serveur frontal, servir_statique fait de même.
+# Un nom avec empreinte ne change jamais de contenu : il est mis en cache un an.
+RESSOURCES_TIERCES = [
+    ('https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+     'vendor/bootstrap/5.1.3/css/bootstrap.min.css'),
+    ('https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+     'vendor/bootstrap/5.1.3/js/bootstrap.bundle.min.js'),
+    ('https://code.jquery.com/jquery-3.6.0.min.js',
+     'vendor/jquery/3.6.0/jquery.min.js'),
+    ('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+     'vendor/fontawesome/6.0.0/css/all.min.css'),
+] + [
+    # Polices référencées par all.min.css (../webfonts/) : requises par le manifeste
+    (f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/webfonts/{police}.{extension}',
+     f'vendor/fontawesome/6.0.0/webfonts/{police}.{extension}')
+    for police in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+    for extension in ('woff2', 'ttf')
+]
+
+EXTENSIONS_COMPRESSIBLES = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.ttf', '.eot')
+EMPREINTE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+DUREE_IMMUABLE = 365 * 24 * 3600
+VARIANTES = [('.br', 'br'), ('.gz', 'gzip')]
+
+@register(Tags.staticfiles)
+def verifier_ressources_tierces(app_configs=None, **kwargs):
+    """Bibliothèques de base.html absentes de static/vendor/ : collectstatic ne peut pas les
+    inscrire au manifeste et chaque page lèverait une erreur 500"""
+    manquantes = [chemin for _, chemin in RESSOURCES_TIERCES if not finders.find(chemin)]
+    if not manquantes:
+        return []
+    return [Error(
+        f"{len(manquantes)} bibliothèque(s) tierce(s) absente(s) de static/vendor/ : {', '.join(manquantes)}",
+        hint="Lancer « python manage.py vendoriser_statiques » puis versionner static/vendor/.",
+        id='statiques.E001',
+    )]
+
+def encodages_acceptes(entete):
+    """{encodage: q} d'un en-tête Accept-Encoding ; q vaut 1 par défaut"""
+    acceptes = {}
+    for element in entete.split(','):
+        nom, _, parametres = element.partition(';')
+        nom = nom.strip().lower()
+        if not nom:
+            continue
+        qualite = 1.0
+        for parametre in parametres.split(';'):
+            cle, _, valeur = parametre.partition('=')
+            if cle.strip().lower() == 'q':
+                try:
+                    qualite = min(max(float(valeur), 0.0), 1.0)
+                except ValueError:
+                    qualite = 0.0
+        acceptes[nom] = qualite
+    return acceptes
+
+def compresser(contenu):
+    """Variantes compressées (suffixe, octets) qui réduisent vraiment la taille"""
+    variantes = [('.gz', gzip.compress(contenu, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append(('.br', brotli.compress(contenu, quality=11)))
+    return [(suffixe, compresse) for suffixe, compresse in variantes if len(compresse) < len(contenu) * 0.95]
+
+class StockageStatiquesCompresses(ManifestStaticFilesStorage):
+    """Stockage de collectstatic : noms avec empreinte et variantes .gz/.br précompressées"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        noms_haches = set()
+        for nom, nom_hache, traite in super().post_process(paths, dry_run, **options):
+            if nom_hache and not isinstance(traite, Exception):
+                noms_haches.add(nom_hache)
+            yield nom, nom_hache, traite
+        if dry_run:
+            return
+        for nom in sorted(noms_haches):
+            if nom.endswith(EXTENSIONS_COMPRESSIBLES):
+                self.ecrire_variantes(nom)
+
+    def ecrire_variantes(self, nom):
+        with self.open(nom) as fichier:
+            contenu = fichier.read()
+        for suffixe, compresse in compresser(contenu):
+            if self.exists(nom + suffixe):
+                self.delete(nom + suffixe)
+            self._save(nom + suffixe, ContentFile(compresse))
+
+def servir_statique(request, chemin):
+    """Sert un fichier collecté, dans sa variante compressée acceptée par le client"""
+    nom = posixpath.normpath(chemin).lstrip('/')
+    try:
+        if not staticfiles_storage.exists(nom):
+            raise Http404("Fichier statique introuvable")
+    except SuspiciousFileOperation:
+        raise Http404("Fichier statique introuvable")
+
+    # Variante de meilleure qualité (q) acceptée ; à égalité, l'ordre de VARIANTES.
+    # q=0 refuse l'encodage, '*' couvre ceux qui ne sont pas cités.
+    acceptes = encodages_acceptes(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    fichier, encodage, meilleure = nom, None, 0.0
+    for suffixe, nom_encodage in VARIANTES:
+        qualite = acceptes.get(nom_encodage, acceptes.get('*', 0.0))
+        if qualite > meilleure and staticfiles_storage.exists(nom + suffixe):
+            fichier, encodage, meilleure = nom + suffixe, nom_encodage, qualite
+
+    response = FileResponse(staticfiles_storage.open(fichier),
+                            content_type=mimetypes.guess_type(nom)[0] or 'application/octet-stream')
+    if encodage:
+        response['Content-Encoding'] = encodage
+    response['Vary'] = 'Accept-Encoding'
+    if EMPREINTE.search(nom):
+        response['Cache-Control'] = f'public, max-age={DUREE_IMMUABLE}, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+# Fichier: centre_sante/tests.py
+from django.test import SimpleTestCase
+
+from centre_sante.statiques import encodages_acceptes
+
+class EncodagesAcceptesTests(SimpleTestCase):
+    def test_qualites(self):
+        self.assertEqual(encodages_acceptes('gzip, deflate, br'), {'gzip': 1.0, 'deflate': 1.0, 'br': 1.0})
+        self.assertEqual(encodages_acceptes('br;q=0, gzip;q=0.8'), {'br': 0.0, 'gzip': 0.8})
+        self.assertEqual(encodages_acceptes(' GZIP ; Q=0.5 ,*;q=0.1'), {'gzip': 0.5, '*': 0.1})
+
+    def test_valeurs_invalides(self):
+        self.assertEqual(encodages_acceptes('br;q=abc, gzip;q=2'), {'br': 0.0, 'gzip': 1.0})
+        self.assertEqual(encodages_acceptes(''), {})
+
+# Fichier: centre_sante/bd/pool.py
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Pool de connexions par processus et par alias de base de données.
+# Django ouvre une connexion par requête (CONN_MAX_AGE = 0) : avec les moteurs de
+# centre_sante.bd, « ouvrir » prend une connexion libre du pool (validée si elle est
+# restée inactive) et « fermer » l'y remet. Le nombre de connexions est borné par
+# TAILLE_MAX ; au-delà, les threads attendent au plus DELAI_ATTENTE secondes.
+CONFIGURATION_PAR_DEFAUT = {
+    'TAILLE_MAX': 10,               # Connexions ouvertes au plus par processus
+    'DUREE_VIE_MAX': 1800,          # Secondes avant recyclage d'une connexion
+    'DELAI_ATTENTE': 10,            # Secondes d'attente d'une connexion libre
+    'VALIDATION_APRES': 5,          # Validation au retrait après N secondes d'inactivité
+}
+
+class PoolEpuise(Exception):
+    """Aucune connexion libre dans le délai d'attente"""
+
+class PoolConnexions:
+    """Connexions ouvertes réutilisables, avec compteurs d'utilisation"""
+
+    def __init__(self, alias, creer, valider, fermer, configuration=None):
+        self.alias = alias
+        self._creer = creer
+        self._valider = valider
+        self._fermer = fermer
+        configuration = {**CONFIGURATION_PAR_DEFAUT, **(configuration or {})}
+        self.taille_max = configuration['TAILLE_MAX']
+        self.duree_vie_max = configuration['DUREE_VIE_MAX']
+        self.delai_attente = configuration['DELAI_ATTENTE']
+        self.validation_apres = configuration['VALIDATION_APRES']
+        self._condition = threading.Condition()
+        self._libres = deque()  # (connexion, date de création, date de retour)
+        self._dates_creation = {}
+        self._ouvertes = 0
+        self.compteurs = {
+            'retraits': 0,
+            'attentes': 0,
+            'temps_attente': 0.0,
+            'delais_depasses': 0,
+            'connexions_creees': 0,
+            'connexions_cassees': 0,
+            'connexions_recyclees': 0,
+        }
+
+    def _fermer_sans_erreur(self, connexion):
+        try:
+            self._fermer(connexion)
+        except Exception:
+            pass
+
+    def prendre(self):
+        """Retire une connexion valide du pool, en crée une ou attend qu'une se libère"""
+        debut_attente = None
+        entree = None
+        with self._condition:
+            while True:
+                if self._libres:
+                    entree = self._libres.pop()
+                    break
+                if self._ouvertes < self.taille_max:
+                    self._ouvertes += 1
+                    break
+                if debut_attente is None:
+                    debut_attente = time.monotonic()
+                    self.compteurs['attentes'] += 1
+                restant = self.delai_attente - (time.monotonic() - debut_attente)
+                if restant <= 0:
+                    self.compteurs['delais_depasses'] += 1
+                    raise PoolEpuise(f"Pool '{self.alias}' épuisé ({self.taille_max} connexions)")
+                self._condition.wait(restant)
+            if debut_attente is not None:
+                self.compteurs['temps_attente'] += time.monotonic() - debut_attente
+            self.compteurs['retraits'] += 1
+
+        # Validation et création hors du verrou : elles font des allers-retours réseau
+        maintenant = time.monotonic()
+        if entree is not None:
+            connexion, creation, retour = entree
+            if maintenant - creation > self.duree_vie_max:
+                self._compter('connexions_recyclees', connexion)
+                self._fermer_sans_erreur(connexion)
+            elif maintenant - retour >= self.validation_apres and not self._est_valide(connexion):
+                self._compter('connexions_cassees', connexion)
+                self._fermer_sans_erreur(connexion)
+            else:
+                return connexion
+
+        try:
+            connexion = self._creer()
+        except Exception:
+            with self._condition:
+                self._ouvertes -= 1
+                self._condition.notify()
+            raise
+        self._compter('connexions_creees')
+        with self._condition:
+            self._dates_creation[id(connexion)] = time.monotonic()
+        return connexion
+
+    def _est_valide(self, connexion):
+        try:
+            self._valider(connexion)
+            return True
+        except Exception:
+            return False
+
+    def _compter(self, compteur, connexion_retiree=None):
+        with self._condition:
+            self.compteurs[compteur] += 1
+            if connexion_retiree is not None:
+                self._dates_creation.pop(id(connexion_retiree), None)
+
+    def rendre(self, connexion, cassee=False):
+        """Remet une connexion dans le pool (ou la ferme si elle est cassée)"""
+        with self._condition:
+            creation = self._dates_creation.get(id(connexion), time.monotonic())
+            if cassee:
+                self._dates_creation.pop(id(connexion), None)
+                self._ouvertes -= 1
+                self.compteurs['connexions_cassees'] += 1
+            else:
+                self._libres.append((connexion, creation, time.monotonic()))
+            self._condition.notify()
+        if cassee:
+            self._fermer_sans_erreur(connexion)
+
+    def statistiques(self):
+        with self._condition:
+            return {
+                **self.compteurs,
+                'temps_attente': round(self.compteurs['temps_attente'], 6),
+                'ouvertes': self._ouvertes,
+                'libres': len(self._libres),
+                'taille_max': self.taille_max,
+            }
+
+_pools = {}
+_pid = os.getpid()
+_verrou_pools = threading.Lock()
+
+def obtenir_pool(alias, creer, valider, fermer, configuration=None):
+    """Pool du processus courant pour un alias, créé à la première connexion"""
+    global _pid
+    with _verrou_pools:
+        if _pid != os.getpid():
+            # Après un fork, les connexions du parent ne doivent pas être partagées
+            _pools.clear()
+            _pid = os.getpid()
+        if alias not in _pools:
+            _pools[alias] = PoolConnexions(alias, creer, valider, fermer, configuration)
+        return _pools[alias]
+
+def statistiques_pools():
+    """Compteurs de tous les pools du processus, par alias"""
+    with _verrou_pools:
+        pools = list(_pools.values())
+    return {pool.alias: pool.statistiques() for pool in pools}
+
+class MixinPool:
+    """À combiner avec un DatabaseWrapper Django pour passer par le pool"""
+
+    def _pool(self, conn_params=None):
+        parent = super()
+        return obtenir_pool(
+            self.alias,
+            creer=lambda: parent.get_new_connection(conn_params),
+            valider=self._valider_connexion,
+            fermer=lambda connexion: connexion.close(),
+            configuration=self.settings_dict.get('POOL'),
+        )
+
+    def _valider_connexion(self, connexion):
+        curseur = connexion.cursor()
+        try:
+            curseur.execute('SELECT 1')
+            curseur.fetchall()
+        finally:
+            curseur.close()
+
+    def get_new_connection(self, conn_params):
+        return self._pool(conn_params).prendre()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        cassee = False
+        try:
+            # Aucune transaction ne doit survivre au retour dans le pool
+            self.connection.rollback()
+        except Exception:
+            cassee = True
+        self._pool().rendre(self.connection, cassee=cassee)
+
+# Fichier: centre_sante/bd/mysql/base.py
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from centre_sante.bd.pool import MixinPool
+
+class DatabaseWrapper(MixinPool, MySQLDatabaseWrapper):
+    """Moteur MySQL avec pool de connexions (ENGINE = 'centre_sante.bd.mysql')"""
+
+    def _valider_connexion(self, connexion):
+        # ping() de mysqlclient : un aller-retour, sans curseur
+        connexion.ping()
+
+# Fichier: centre_sante/bd/sqlite3/base.py
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+from centre_sante.bd.pool import MixinPool
+
+class DatabaseWrapper(MixinPool, SQLiteDatabaseWrapper):
+    """Moteur SQLite avec pool de connexions, pour les essais locaux (base sur fichier
+    uniquement : chaque connexion à :memory: est une base distincte)"""
+
+# Fichier: centre_sante/bd/routage.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Lectures des rapports et du journal sur la base réplique (alias 'replica', optionnel).
+# Une lecture ne part sur la réplique que si elle a été autorisée (vue listée dans
+# ROUTAGE_REPLIQUE ou bloc lectures_sur_replique()), hors transaction, avant toute
+# écriture de la requête en cours, et si la réplique a moins de RETARD_MAX secondes
+# de retard. Un client qui vient d'écrire reste sur la primaire DUREE_COLLANTE secondes.
+ALIAS_REPLIQUE = 'replica'
+# Même base que 'default', connexion séparée (numérotation des dossiers)
+ALIAS_NUMEROTATION = 'numerotation'
+COOKIE_COLLANT = 'bd_primaire'
+
+CONFIGURATION_PAR_DEFAUT = {
+    'VUES': [],                     # Noms d'URL lus sur la réplique
+    'MODULES': [],                  # Modules de vues lus sur la réplique
+    'RETARD_MAX': 5,                # Secondes de retard de réplication tolérées
+    'INTERVALLE_VERIFICATION': 10,  # Secondes entre deux mesures du retard
+    'DUREE_COLLANTE': 10,           # Secondes sur la primaire après une écriture
+}
+
+def get_configuration():
+    """Retourne la configuration du routage fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'ROUTAGE_REPLIQUE', {}))
+    return configuration
+
+def replique_configuree():
+    return ALIAS_REPLIQUE in settings.DATABASES
+
+_etat = threading.local()
+_mesure_retard = {'retard': None, 'date': 0.0}
+_verrou_retard = threading.Lock()
+
+def _mesurer_retard():
+    """Retard de la réplique en secondes (None si inconnu ou réplication arrêtée)"""
+    connexion = connections[ALIAS_REPLIQUE]
+    if connexion.vendor != 'mysql':
+        # Bases locales de test : pas de réplication à surveiller
+        return 0
+    with connexion.cursor() as curseur:
+        for requete, colonne in (('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+                                 ('SHOW SLAVE STATUS', 'Seconds_Behind_Master')):
+            try:
+                curseur.execute(requete)
+            except Exception:
+                continue
+            ligne = curseur.fetchone()
+            if ligne is None:
+                return None
+            colonnes = [description[0] for description in curseur.description]
+            return ligne[colonnes.index(colonne)]
+    return None
+
+def retard_replique():
+    """Dernier retard mesuré, remesuré au plus toutes les INTERVALLE_VERIFICATION secondes"""
+    intervalle = get_configuration()['INTERVALLE_VERIFICATION']
+    with _verrou_retard:
+        if time.monotonic() - _mesure_retard['date'] < intervalle:
+            return _mesure_retard['retard']
+        # Les autres threads gardent l'ancienne mesure pendant celle-ci
+        _mesure_retard['date'] = time.monotonic()
+    try:
+        retard = _mesurer_retard()
+    except Exception:
+        logger.warning("Mesure du retard de la réplique impossible", exc_info=True)
+        retard = None
+    with _verrou_retard:
+        _mesure_retard['retard'] = retard
+    return retard
+
+def replique_a_jour():
+    retard = retard_replique()
+    return retard is not None and retard <= get_configuration()['RETARD_MAX']
+
+def lecture_sur_replique_possible():
+    """Vrai si la prochaine lecture peut aller sur la réplique"""
+    return (
+        replique_configuree()
+        and getattr(_etat, 'replique_autorisee', False)
+        and not getattr(_etat, 'ecriture', False)
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        and replique_a_jour()
+    )
+
+@contextmanager
+def lectures_sur_replique():
+    """Autorise les lectures sur la réplique dans le bloc (utilisable en décorateur)"""
+    precedent = (getattr(_etat, 'replique_autorisee', False), getattr(_etat, 'ecriture', False))
+    _etat.replique_autorisee, _etat.ecriture = True, False
+    try:
+        yield
+    finally:
+        _etat.replique_autorisee, _etat.ecriture = precedent
+
+def reinitialiser_etat():
+    _etat.replique_autorisee = False
+    _etat.ecriture = False
+
+class RouteurReplique:
+    """Routeur : lectures autorisées sur la réplique, tout le reste sur la primaire"""
+
+    def db_for_read(self, model, **hints):
+        if lecture_sur_replique_possible():
+            return ALIAS_REPLIQUE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Les lectures suivantes de la requête doivent voir cette écriture. L'alias est
+        # explicite : un objet lu sur la réplique ne doit pas y être enregistré.
+        _etat.ecriture = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS_REPLIQUE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit son schéma par la réplication ; la connexion de numérotation
+        # pointe sur la base primaire
+        if db in (ALIAS_REPLIQUE, ALIAS_NUMEROTATION):
+            return False
+        return None
+
+class RoutageRepliqueMiddleware:
+    """Autorise la réplique pour les vues de ROUTAGE_REPLIQUE et garde sur la primaire
+    les clients qui viennent d'écrire"""
+
+    def __init__(self, get_response):
+        if not replique_configuree():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reinitialiser_etat()
+        try:
+            response = self.get_response(request)
+            ecriture = getattr(_etat, 'ecriture', False)
+        finally:
+            reinitialiser_etat()
+        # Seules les écritures demandées par le client (POST...) le rendent collant, pas
+        # celles du suivi d'activité sur une simple consultation
+        duree_collante = get_configuration()['DUREE_COLLANTE']
+        if ecriture and duree_collante and request.method not in ('GET', 'HEAD'):
+            response.set_cookie(COOKIE_COLLANT, '1', max_age=duree_collante, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or COOKIE_COLLANT in request.COOKIES:
+            return None
+        configuration = get_configuration()
+        nom_url = request.resolver_match.url_name if request.resolver_match else None
+        module = getattr(view_func, '__module__', '')
+        if nom_url in configuration['VUES'] or any(
+                module == prefixe or module.startswith(prefixe + '.') for prefixe in configuration['MODULES']):
+            _etat.replique_autorisee = True
+        return None
+
+# Fichier: centre_sante/bd/tests.py
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from applications.utilisateurs.models import JournalActivite, Utilisateur
+from centre_sante.bd import routage
+from centre_sante.bd.routage import (ALIAS_REPLIQUE, COOKIE_COLLANT, RoutageRepliqueMiddleware, RouteurReplique,
+                                     lectures_sur_replique)
+
+@override_settings(ROUTAGE_REPLIQUE={'VUES': ['liste_rapports'], 'RETARD_MAX': 5, 'DUREE_COLLANTE': 10})
+class RoutageRepliqueTests(SimpleTestCase):
+    """Routage sans base réelle : réplique déclarée et retard de réplication simulés"""
+
+    def setUp(self):
+        self.routeur = RouteurReplique()
+        self.retard = self.simuler('retard_replique', 0)
+        self.simuler('replique_configuree', True)
+        routage.reinitialiser_etat()
+        self.addCleanup(routage.reinitialiser_etat)
+
+    def simuler(self, fonction, valeur):
+        patcher = mock.patch.object(routage, fonction, return_value=valeur)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def traiter(self, requete, nom_url, ecrire=False):
+        """Fait passer la requête par le middleware ; retourne (réponse, alias de la lecture)"""
+        lectures = []
+
+        def vue(request):
+            if ecrire:
+                self.routeur.db_for_write(JournalActivite)
+            lectures.append(self.routeur.db_for_read(JournalActivite))
+            return HttpResponse()
+
+        def get_response(request):
+            middleware.process_view(request, vue, (), {})
+            return vue(request)
+
+        middleware = RoutageRepliqueMiddleware(get_response)
+        requete.resolver_match = SimpleNamespace(url_name=nom_url)
+        return middleware(requete), lectures[0]
+
+    def test_lecture_sur_primaire_par_defaut(self):
+        self.assertEqual(self.routeur.db_for_read(JournalActivite), 'default')
+
+    def test_lecture_autorisee_sur_replique(self):
+        with lectures_sur_replique():
+            self.assertEqual(self.routeur.db_for_read(JournalActivite), ALIAS_REPLIQUE)
+        self.assertEqual(self.routeur.db_for_read(JournalActivite), 'default')
+
+    def test_ecriture_sur_primaire(self):
+        with lectures_sur_replique():
+            self.assertEqual(self.routeur.db_for_write(JournalActivite), 'default')
+            # Les lectures suivantes doivent voir l'écriture
+            self.assertEqual(self.routeur.db_for_read(JournalActivite), 'default')
+
+    def test_retard_trop_important(self):
+        for retard in (60, None):
+            self.retard.return_value = retard
+            with lectures_sur_replique():
+                self.assertEqual(self.routeur.db_for_read(JournalActivite), 'default')
+
+    def test_pas_de_migration_sur_replique(self):
+        self.assertIs(self.routeur.allow_migrate(ALIAS_REPLIQUE, 'utilisateurs'), False)
+        self.assertIsNone(self.routeur.allow_migrate('default', 'utilisateurs'))
+
+    def test_middleware_vue_listee_sur_replique(self):
+        _, alias = self.traiter(RequestFactory().get('/rapports/'), 'liste_rapports')
+        self.assertEqual(alias, ALIAS_REPLIQUE)
+        # État remis à zéro après la requête
+        self.assertFalse(routage.lecture_sur_replique_possible())
+
+    def test_middleware_vue_non_listee_sur_primaire(self):
+        _, alias = self.traiter(RequestFactory().get('/utilisateurs/'), 'liste_utilisateurs')
+        self.assertEqual(alias, 'default')
+
+    def test_middleware_retard_trop_important(self):
+        self.retard.return_value = 60
+        _, alias = self.traiter(RequestFactory().get('/rapports/'), 'liste_rapports')
+        self.assertEqual(alias, 'default')
+
+    def test_cookie_collant_apres_ecriture(self):
+        reponse, alias = self.traiter(RequestFactory().post('/rapports/'), 'liste_rapports', ecrire=True)
+        self.assertEqual(alias, 'default')
+        self.assertIn(COOKIE_COLLANT, reponse.cookies)
+
+        requete = RequestFactory().get('/rapports/')
+        requete.COOKIES[COOKIE_COLLANT] = reponse.cookies[COOKIE_COLLANT].value
+        _, alias = self.traiter(requete, 'liste_rapports')
+        self.assertEqual(alias, 'default')
+
+    def test_pas_de_cookie_pour_ecriture_pendant_consultation(self):
+        # Journal d'activité écrit pendant un GET : le client n'est pas rendu collant
+        reponse, _ = self.traiter(RequestFactory().get('/rapports/'), 'liste_rapports', ecrire=True)
+        self.assertNotIn(COOKIE_COLLANT, reponse.cookies)
+
+# Sous la configuration BD_LOCALE=sqlite : la réplique est un miroir de la base de test.
+# TransactionTestCase : dans la transaction d'un TestCase, tout resterait sur la primaire.
+@skipUnless(ALIAS_REPLIQUE in settings.DATABASES and settings.DATABASES[ALIAS_REPLIQUE]['ENGINE'].endswith('sqlite3'),
+            "Réplique SQLite locale requise (BD_LOCALE=sqlite)")
+class RoutageRepliqueBasesTests(TransactionTestCase):
+    """Alias réellement interrogé par les lectures du journal d'activité"""
+    databases = {'default', ALIAS_REPLIQUE}
+
+    def setUp(self):
+        routage._mesure_retard.update(retard=None, date=0.0)
+        self.addCleanup(routage._mesure_retard.update, retard=None, date=0.0)
+        routage.reinitialiser_etat()
+        self.addCleanup(routage.reinitialiser_etat)
+
+    def alias_interroges(self, fonction):
+        """Alias sur lesquels `fonction` a lu la table du journal"""
+        with CaptureQueriesContext(connections['default']) as primaire, \
+                CaptureQueriesContext(connections[ALIAS_REPLIQUE]) as replique:
+            fonction()
+        return {
+            alias for alias, requetes in (('default', primaire), (ALIAS_REPLIQUE, replique))
+            if any(requete['sql'].startswith('SELECT') and 'utilisateurs_journalactivite' in requete['sql']
+                   for requete in requetes)
+        }
+
+    def compter_journal(self):
+        return JournalActivite.objects.count()
+
+    def test_vue_listee_lue_sur_replique(self):
+        client = Client()
+        client.force_login(Utilisateur.objects.create_user('admin_test', password='secret', role='admin'))
+        reponse = []
+        alias = self.alias_interroges(lambda: reponse.append(client.get(reverse('journal_activite'))))
+        self.assertEqual(reponse[0].status_code, 200)
+        self.assertEqual(alias, {ALIAS_REPLIQUE})
+
+    def test_lecture_hors_bloc_sur_primaire(self):
+        self.assertEqual(self.alias_interroges(self.compter_journal), {'default'})
+
+    def test_lecture_dans_une_transaction_sur_primaire(self):
+        def lire():
+            with lectures_sur_replique(), transaction.atomic():
+                self.compter_journal()
+        self.assertEqual(self.alias_interroges(lire), {'default'})
+
+    def test_lecture_apres_ecriture_sur_primaire(self):
+        def ecrire_puis_lire():
+            with lectures_sur_replique():
+                JournalActivite.objects.create(nom_utilisateur='test', action="Essai")
+                self.assertEqual(self.compter_journal(), 1)
+        self.assertEqual(self.alias_interroges(ecrire_puis_lire), {'default'})
+
+    def test_replique_en_retard_evitee(self):
+        def lire():
+            with lectures_sur_replique():
+                self.compter_journal()
+        with mock.patch.object(routage, '_mesurer_retard', return_value=60):
+            self.assertEqual(self.alias_interroges(lire), {'default'})
+        routage._mesure_retard.update(retard=None, date=0.0)
+        self.assertEqual(self.alias_interroges(lire), {ALIAS_REPLIQUE})
+
+# Fichier: centre_sante/instrumentation.py
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation des requêtes (activée par INSTRUMENTATION['ACTIVE']) : durée totale,
+# nombre et durée des requêtes SQL, requêtes SQL répétées (motif N+1). Les mesures sont
+# renvoyées dans l'en-tête Server-Timing, cumulées par nom d'URL dans un histogramme
+# glissant en mémoire, et les requêtes lentes sont journalisées avec leurs pires SQL.
+CONFIGURATION_PAR_DEFAUT = {
+    'ACTIVE': False,
+    'SEUIL_LENT_MS': 500,           # Au-delà, la requête est journalisée
+    'TAILLE_HISTOGRAMME': 1000,     # Dernières mesures conservées par nom d'URL
+    'SQL_AFFICHEES': 5,             # Requêtes SQL les plus lentes dans le journal
+    'SEUIL_DOUBLONS': 3,            # Répétitions d'un même SQL signalées comme doublon
+}
+
+def get_configuration():
+    """Retourne la configuration de l'instrumentation fusionnée avec les valeurs par défaut"""
+    configuration = dict(CONFIGURATION_PAR_DEFAUT)
+    configuration.update(getattr(settings, 'INSTRUMENTATION', {}))
+    return configuration
+
+class CollecteurSQL:
+    """execute_wrapper notant le texte et la durée de chaque requête SQL"""
+
+    def __init__(self):
+        self.requetes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.requetes.append((sql, time.perf_counter() - debut))
+
+    def duree_totale(self):
+        return sum(duree for _, duree in self.requetes)
+
+    def doublons(self, seuil):
+        """SQL (au texte identique, paramètres exclus) exécutés au moins `seuil` fois"""
+        compteur = Counter(sql for sql, _ in self.requetes)
+        return [(sql, nombre) for sql, nombre in compteur.most_common() if nombre >= seuil]
+
+class Histogrammes:
+    """Dernières durées de réponse par nom d'URL, avec centiles calculés à la demande"""
+
+    def __init__(self, taille):
+        self.taille = taille
+        self._mesures = {}
+        self._verrou = threading.Lock()
+
+    def ajouter(self, nom, duree_ms, nombre_sql):
+        with self._verrou:
+            if nom not in self._mesures:
+                self._mesures[nom] = deque(maxlen=self.taille)
+            self._mesures[nom].append((duree_ms, nombre_sql))
+
+    def statistiques(self):
+        with self._verrou:
+            mesures = {nom: list(valeurs) for nom, valeurs in self._mesures.items()}
+        resultat = {}
+        for nom, valeurs in mesures.items():
+            durees = sorted(duree for duree, _ in valeurs)
+            resultat[nom] = {
+                'nombre': len(durees),
+                'p50_ms': round(_centile(durees, 50), 2),
+                'p95_ms': round(_centile(durees, 95), 2),
+                'p99_ms': round(_centile(durees, 99), 2),
+                'max_ms': round(durees[-1], 2),
+                'sql_moyen': round(sum(nombre for _, nombre in valeurs) / len(valeurs), 2),
+            }
+        return resultat
+
+def _centile(valeurs_triees, centile):
+    index = min(len(valeurs_triees) - 1, int(round(centile / 100 * (len(valeurs_triees) - 1))))
+    return valeurs_triees[index]
+
+histogrammes = Histogrammes(get_configuration()['TAILLE_HISTOGRAMME'])
+
+def statistiques_requetes():
+    """Centiles de durée et nombre moyen de SQL par nom d'URL, pour ce processus"""
+    return histogrammes.statistiques()
+
+class InstrumentationMiddleware:
+    """Mesure durée, SQL et doublons de chaque requête (à placer en tête de MIDDLEWARE)"""
+
+    def __init__(self, get_response):
+        configuration = get_configuration()
+        if not configuration['ACTIVE']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.seuil_lent_ms = configuration['SEUIL_LENT_MS']
+        self.sql_affichees = configuration['SQL_AFFICHEES']
+        self.seuil_doublons = configuration['SEUIL_DOUBLONS']
+
+    def __call__(self, request):
+        collecteur = CollecteurSQL()
+        debut = time.perf_counter()
+        with ExitStack() as pile:
+            for alias in connections:
+                pile.enter_context(connections[alias].execute_wrapper(collecteur))
+            response = self.get_response(request)
+        duree_ms = (time.perf_counter() - debut) * 1000
+
+        correspondance = getattr(request, 'resolver_match', None)
+        nom_vue = (correspondance.view_name if correspondance else None) or 'non_resolue'
+        sql_ms = collecteur.duree_totale() * 1000
+        doublons = collecteur.doublons(self.seuil_doublons)
+
+        histogrammes.ajouter(nom_vue, duree_ms, len(collecteur.requetes))
+        response['Server-Timing'] = ', '.join([
+            f'app;dur={duree_ms:.1f}',
+            f'sql;dur={sql_ms:.1f};desc="{len(collecteur.requetes)} requetes"',
+            f'dup;desc="{sum(nombre for _, nombre in doublons)} repetees"',
+        ])
+
+        if duree_ms >= self.seuil_lent_ms:
+            plus_lentes = sorted(collecteur.requetes, key=lambda requete: requete[1], reverse=True)
+            details = [f"  {duree * 1000:.1f} ms : {sql[:300]}" for sql, duree in plus_lentes[:self.sql_affichees]]
+            details += [f"  répétée {nombre} fois : {sql[:300]}" for sql, nombre in doublons]
+            logger.warning(
+                "Requête lente %s %s (%s) : %.1f ms, %s SQL en %.1f ms\n%s",
+                request.method, request.path, nom_vue, duree_ms,
+                len(collecteur.requetes), sql_ms, '\n'.join(details),
+            )
+        return response